@@ -0,0 +1,123 @@
+"""Coleta de tickets parados e de canais fechados
+
+Monta um servidor com tickets fechados há mais tempo que a retenção,
+tickets abertos parados, tickets abertos ativos e muitos tickets com
+prazos ainda distantes. Roda ciclos do loop de coleta até não sobrar nada
+vencido e confere que os fechados viraram transcrição e sumiram, que os
+parados foram fechados (o canal fica até vencer a retenção) e que os
+ativos ficaram. Mede também um ciclo sem nada vencido, que não deve
+depender do total de tickets. As exclusões seguem o limite local de
+`channel.delete`, então o tempo total é dominado por ele.
+
+Uso: python benchmarks/bench_coleta.py [vencidos] [distantes]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+PASTA = tempfile.mkdtemp(prefix="bench-coleta-")
+os.environ.setdefault('BOT_STATE', 'memoria')
+os.environ.setdefault('TICKETS_DB', os.path.join(PASTA, "tickets.db"))
+os.environ.setdefault('TRANSCRIPTS_DIR', os.path.join(PASTA, "transcripts"))
+
+import discord  # noqa: E402
+from fake_discord import FakeChannel, FakeGuild, FakeUser, rede  # noqa: E402
+
+import main  # noqa: E402
+
+def criar(guild, nome, status, criado, fechado=None, ultima_mensagem=None):
+    channel = FakeChannel(guild, nome, historico=50)
+    guild.channels[channel.id] = channel
+    if ultima_mensagem is not None:
+        channel.last_message_id = discord.utils.time_snowflake(ultima_mensagem)
+    ticket = {
+        'guild_id': guild.id, 'user_id': FakeUser(nome).id, 'user_name': nome,
+        'status': status, 'criado_em': str(criado),
+    }
+    if fechado is not None:
+        ticket['fechado_em'] = str(fechado)
+    main.tickets.add(channel.id, ticket)
+    return channel
+
+async def ciclo():
+    inicio = time.perf_counter()
+    await main.coletar_tickets()
+    return time.perf_counter() - inicio
+
+async def rodar(vencidos, distantes):
+    await main.journal.open()
+    rede.configurar(latencia=0.005)
+    guild = FakeGuild("Loja")
+    main.bot.get_guild = {guild.id: guild}.get
+    main.painel_config.load({str(guild.id): {
+        'inatividade_horas': 48, 'retencao_horas': 24, 'transcrever_antes': True,
+    }})
+    agora = datetime.now()
+    antigo = agora - timedelta(days=10)
+
+    fechados = [
+        criar(guild, f"fechado-{i}", main.FECHADO, antigo, fechado=antigo)
+        for i in range(vencidos)
+    ]
+    parados = [
+        criar(guild, f"parado-{i}", main.ABERTO, antigo, ultima_mensagem=antigo)
+        for i in range(vencidos)
+    ]
+    ativos = [
+        criar(guild, f"ativo-{i}", main.ABERTO, antigo, ultima_mensagem=agora)
+        for i in range(vencidos)
+    ]
+    # Prazos dos tickets antigos: a coleta chegou antes deles (com ela chegando
+    # agora, a referência seria o deploy e nada venceria ainda)
+    await main.coletor.seed(antigo.timestamp() - 1)
+    for i in range(distantes):
+        channel = criar(guild, f"recente-{i}", main.ABERTO, agora)
+        main.agendar_coleta(
+            channel.id, main.tickets[channel.id], main.INATIVO, time.time()
+        )
+
+    ciclos = []
+    while True:
+        ciclos.append(await ciclo())
+        if not await main.coletor.due(time.time(), 1):
+            break
+    ocioso = await ciclo()
+
+    falhas = []
+    if any(c.id in guild.channels for c in fechados):
+        falhas.append("canais fechados vencidos não foram apagados")
+    if any(main.tickets[c.id]['status'] != main.FECHADO for c in parados):
+        falhas.append("tickets parados não foram fechados")
+    if any(
+        c.id not in guild.channels or main.tickets[c.id]['status'] != main.ABERTO
+        for c in ativos
+    ):
+        falhas.append("ticket ativo foi coletado")
+    transcricoes = sum(
+        len(arquivos) for _, _, arquivos in os.walk(main.TRANSCRIPTS_DIR)
+    )
+
+    total = 3 * vencidos + distantes
+    print(f"{total} tickets ({distantes} com prazo distante), "
+          f"{len(guild.channels)} canais restantes")
+    print(f"{len(ciclos)} ciclo(s) de até {main.COLETA_LOTE}: {sum(ciclos):.2f}s; "
+          f"ciclo ocioso: {ocioso * 1000:.2f} ms")
+    print(f"Transcrições: {transcricoes}, chamadas REST: {dict(rede.chamadas)}")
+    for falha in falhas:
+        print(f"FALHA {falha}")
+    print("OK" if not falhas else f"{len(falhas)} falha(s)")
+    return not falhas
+
+if __name__ == "__main__":
+    vencidos = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    distantes = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    ok = asyncio.run(rodar(vencidos, distantes))
+    main.transcricoes.close()
+    main.journal.close()
+    sys.exit(0 if ok else 1)
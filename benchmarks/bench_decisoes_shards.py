@@ -0,0 +1,170 @@
+"""Resumo de pagamentos com dois processos de shards
+
+Carrega `main.py` duas vezes, como dois processos com BOT_SHARD_COUNT=2:
+um com o shard 0 e outro com o shard 1, compartilhando o journal, o
+backend de estado e o arquivo de configuração. O servidor da loja é do
+shard 1; o dono é registrado nele e o outro processo vê a alteração pelo
+arquivo. Os clientes clicam "Já Comprei" no processo do shard 1, e as
+interações do resumo (DM) chegam ao processo do shard 0, como no Discord.
+Confere que a paginação mostra a fila do journal, que as decisões são
+aplicadas pelo processo dono do servidor (cada cliente ganha o cargo uma
+única vez) e que a fila termina vazia nos dois processos.
+
+Uso: python benchmarks/bench_decisoes_shards.py [clientes]
+"""
+import asyncio
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+PASTA = tempfile.mkdtemp(prefix="bench-decisoes-")
+os.chdir(PASTA)  # painel_config.json fica na pasta de trabalho
+os.environ.setdefault('BOT_STATE', 'sqlite')
+os.environ.setdefault('TICKETS_DB', os.path.join(PASTA, "tickets.db"))
+os.environ.setdefault('TRANSCRIPTS_DIR', os.path.join(PASTA, "transcripts"))
+os.environ['BOT_SHARD_COUNT'] = '2'
+
+from fake_discord import (  # noqa: E402
+    FakeChannel,
+    FakeClient,
+    FakeGuild,
+    FakeInteraction,
+    FakeUser,
+    rede,
+)
+
+def carregar_processo(shard_id):
+    """Uma cópia independente de `main`, como um processo com só esse shard"""
+    os.environ['BOT_SHARD_IDS'] = str(shard_id)
+    spec = importlib.util.spec_from_file_location(
+        f"main_shard{shard_id}", os.path.join(RAIZ, "main.py")
+    )
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+async def esperar(processo, interaction):
+    tarefa = processo.tarefas_interacao.get(interaction.id)
+    if tarefa is not None:
+        await tarefa
+    return interaction.respostas[-1] if interaction.respostas else None
+
+async def rodar(clientes):
+    shard0, shard1 = carregar_processo(0), carregar_processo(1)
+    rede.configurar(latencia=0.01, jitter=0.005, seed=0)
+    cliente_discord = FakeClient()
+
+    guild = FakeGuild("Loja")
+    guild.id = (1 << 22) | 1  # (guild_id >> 22) % 2 == 1: servidor do shard 1
+    dono = FakeUser("dono", user_id=1)
+    cliente_discord.users[dono.id] = dono
+    for processo in (shard0, shard1):
+        await processo.journal.open()
+        await processo.painel_config.load_file(processo.CONFIG_FILE)
+        processo.resolver.client = cliente_discord
+        processo.bot.get_partial_messageable = cliente_discord.get_partial_messageable
+    shard0.bot.get_guild = {}.get
+    shard1.bot.get_guild = {guild.id: guild}.get
+
+    falhas = []
+    # /registrar_dono roda no shard do servidor; o outro processo lê do arquivo
+    shard1.painel_config.update(guild.id, owner_id=dono.id)
+    await shard1.config_writer.flush()
+    await shard0.painel_config.refresh()
+    if shard0.dono_do_servidor(guild.id) != dono.id:
+        falhas.append("shard 0 não viu o dono registrado pelo shard 1")
+
+    compradores = []
+    for i in range(clientes):
+        user = FakeUser(f"cliente{i}")
+        guild.members[user.id] = user
+        cliente_discord.users[user.id] = user
+        channel = FakeChannel(guild, f"compra-{i}")
+        shard1.tickets.add(channel.id, {
+            'guild_id': guild.id, 'user_id': user.id, 'user_name': user.name,
+            'cargo_name': "VIP", 'meses': 1, 'status': shard1.ABERTO,
+        })
+        compradores.append((user, channel))
+
+    interacoes = [
+        FakeInteraction(guild, user, channel) for user, channel in compradores
+    ]
+    view = shard1.PixTicketView()
+    await asyncio.gather(
+        *(view.ja_comprei.callback(interaction) for interaction in interacoes)
+    )
+    await asyncio.gather(*(esperar(shard1, interaction) for interaction in interacoes))
+    await shard1.atualizar_resumos()
+    await shard1.journal.checkpoint()
+
+    # O dono pagina o resumo: a interação (DM) chega ao shard 0, que não tem a fila
+    pagina = FakeInteraction(None, dono)
+    await shard0.PaginaPagamentosButton(guild.id, 1).callback(pagina)
+    campos = pagina.edicoes[-1]['embed'].fields if pagina.edicoes else []
+    esperados = min(
+        max(clientes - shard1.pagamentos_pendentes.por_pagina, 0),
+        shard1.pagamentos_pendentes.por_pagina
+    )
+    sem_usuario = esperados and not campos[0].value.startswith("<@")
+    if len(campos) != max(esperados, 1) or sem_usuario:
+        falhas.append(f"página 2 montada no shard 0 com {len(campos)} item(ns), "
+                      f"esperado {esperados}")
+
+    # O dono aprova página por página; o shard 0 só registra, o shard 1 aplica
+    paginas = 0
+    inicio = time.perf_counter()
+    while shard1.pagamentos_pendentes.count(guild.id):
+        itens, _, _ = shard1.pagamentos_pendentes.page(guild.id, 0)
+        de, ate = itens[0][1]['pedido_ms'], itens[-1][1]['pedido_ms']
+        interaction = FakeInteraction(None, dono)
+        botao = shard0.PagamentoLoteButton('aprovar', guild.id, de, ate)
+        await botao.callback(interaction)
+        resposta = await esperar(shard0, interaction)
+        if not resposta or not resposta.startswith("⏳"):
+            falhas.append(f"página {paginas + 1}: {resposta}")
+            break
+        pendentes = shard1.pagamentos_pendentes.count(guild.id)
+        # O shard 0 não aplica decisões de servidores do shard 1
+        await shard0.aplicar_decisoes()
+        await shard1.aplicar_decisoes()
+        paginas += 1
+        if shard1.pagamentos_pendentes.count(guild.id) >= pendentes:
+            falhas.append(f"página {paginas}: decisão não aplicada pelo shard 1")
+            break
+    aprovar = time.perf_counter() - inicio
+    await asyncio.sleep(0.5)  # DMs de aprovação saem em segundo plano
+
+    cargo = shard1.cargos.get(guild, "VIP")
+    for user, _ in compradores:
+        if cargo is None or user.roles.count(cargo) != 1:
+            falhas.append(f"{user.name}: cargos {user.roles}")
+        if len(user.dms) != 1:
+            falhas.append(f"{user.name}: {len(user.dms)} DMs")
+    if len(shard0.pagamentos_pendentes) or len(shard1.pagamentos_pendentes):
+        falhas.append("fila não terminou vazia")
+    if await shard1.journal.take_decisions():
+        falhas.append("decisão esquecida no journal")
+    if await shard1.journal.payments():
+        falhas.append("pagamento esquecido no journal")
+    edicoes = sum(message.edicoes for message in dono.dms)
+
+    print(f"{clientes} clientes no servidor do shard 1; resumo decidido pelo shard 0")
+    print(f"Aprovação: {paginas} página(s) em {aprovar:.2f}s; "
+          f"DMs ao dono: {len(dono.dms)}, edições do resumo: {edicoes}")
+    print(f"Chamadas REST: {dict(rede.chamadas)}")
+    for falha in falhas[:10]:
+        print(f"FALHA {falha}")
+    print("OK" if not falhas else f"{len(falhas)} falha(s)")
+    for processo in (shard0, shard1):
+        processo.journal.close()
+    return not falhas
+
+if __name__ == "__main__":
+    clientes = int(sys.argv[1]) if len(sys.argv) > 1 else 15
+    sys.exit(0 if asyncio.run(rodar(clientes)) else 1)
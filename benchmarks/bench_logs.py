@@ -0,0 +1,122 @@
+"""Tempestade de erros: print síncrono contra a fila de logs estruturados
+
+Simula uma rajada de erros iguais (como uma rota do Discord fora do ar)
+escrevendo em uma saída lenta (um pipe/terminal que leva `atraso_ms` por
+escrita). Mede quanto tempo o event loop fica preso por erro com `print`
+e com `structured_log` (QueueHandler no loop, escrita na thread do
+QueueListener), quantas linhas a amostragem deixou passar, e confere os
+campos do JSON emitido por um handler que falha durante uma interação.
+
+Uso: python benchmarks/bench_logs.py [erros] [atraso_ms]
+"""
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_discord import FakeChannel, FakeGuild, FakeInteraction, FakeUser
+
+import structured_log
+
+class SaidaLenta(io.StringIO):
+    """Stream cuja escrita bloqueia, como stdout preso em um pipe cheio"""
+
+    def __init__(self, atraso):
+        super().__init__()
+        self.atraso = atraso
+        self.escritas = 0
+
+    def write(self, texto):
+        time.sleep(self.atraso)
+        self.escritas += 1
+        return super().write(texto)
+
+def erro_de_rede(i):
+    try:
+        raise ConnectionResetError(f"conexão {i} encerrada")
+    except ConnectionResetError as e:
+        return e
+
+async def com_print(erros, saida):
+    inicio = time.perf_counter()
+    for i in range(erros):
+        print(f"Erro ao enviar mensagem: {erro_de_rede(i)}", file=saida)
+        await asyncio.sleep(0)
+    return time.perf_counter() - inicio
+
+async def com_fila(erros, log):
+    inicio = time.perf_counter()
+    for i in range(erros):
+        log.error("Erro ao enviar mensagem", exc_info=erro_de_rede(i))
+        await asyncio.sleep(0)
+    return time.perf_counter() - inicio
+
+async def handler_com_erro():
+    guild = FakeGuild("Loja")
+    interaction = FakeInteraction(
+        guild, FakeUser("cliente"), FakeChannel(guild, "ticket"), "btn_ja_comprei"
+    )
+
+    @structured_log.handler('btn_ja_comprei')
+    async def callback(_interaction):
+        await asyncio.sleep(0.002)
+        raise KeyError('user_id')
+
+    with contextlib.suppress(KeyError):
+        await callback(interaction)
+    return interaction
+
+async def rodar(erros, atraso):
+    saida_print = SaidaLenta(atraso)
+    tempo_print = await com_print(erros, saida_print)
+
+    saida_fila = SaidaLenta(atraso)
+    listener = structured_log.configurar(
+        'INFO', stream=saida_fila, limite=5, janela=60.0
+    )
+    log = logging.getLogger('bench')
+    tempo_fila = await com_fila(erros, log)
+    interaction = await handler_com_erro()
+    listener.stop()
+
+    linhas = [json.loads(linha) for linha in saida_fila.getvalue().splitlines()]
+    do_handler = next(
+        (linha for linha in linhas if linha.get('handler') == 'btn_ja_comprei'), {}
+    )
+    esperado = {
+        'guild_id': interaction.guild.id, 'user_id': interaction.user.id,
+        'channel_id': interaction.channel.id, 'custom_id': 'btn_ja_comprei',
+        'excecao': 'KeyError',
+    }
+
+    print(f"{erros} erros iguais, saída com {atraso * 1000:.1f} ms por escrita")
+    amostradas = sum(1 for linha in linhas if linha['logger'] == 'bench')
+    campos = {k: do_handler.get(k) for k in (*esperado, 'latencia_ms')}
+    print(f"print: {tempo_print * 1000:.1f} ms no loop "
+          f"({tempo_print / erros * 1e6:.1f} µs/erro), {saida_print.escritas} escritas")
+    print(f"fila:  {tempo_fila * 1000:.1f} ms no loop "
+          f"({tempo_fila / erros * 1e6:.1f} µs/erro), "
+          f"{amostradas} linha(s) após a amostragem")
+    print(f"Linha do handler: {json.dumps(campos, ensure_ascii=False)}")
+    falhas = []
+    if tempo_fila >= tempo_print:
+        falhas.append("a fila não tirou a escrita do loop")
+    contexto = all(do_handler.get(chave) == valor for chave, valor in esperado.items())
+    if not contexto or 'latencia_ms' not in do_handler:
+        falhas.append("linha do handler sem os campos de contexto")
+    for falha in falhas:
+        print(f"FALHA {falha}")
+    print("OK" if not falhas else f"{len(falhas)} falha(s)")
+    return not falhas
+
+if __name__ == "__main__":
+    erros = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    atraso = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.2 / 1000
+    sys.exit(0 if asyncio.run(rodar(erros, atraso)) else 1)
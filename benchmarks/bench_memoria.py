@@ -0,0 +1,133 @@
+"""Memória dos caches do discord.py por perfil de execução (BOT_PERFIL)
+
+Cada perfil roda em um processo próprio: cria um cliente discord.py com os
+intents e as opções do perfil, recebe pelo `FakeGateway` um servidor
+grande sintético (membros, canais, cargos) e um fluxo de mensagens nos
+canais, e mede a memória que o cliente passa a reter (tracemalloc, sem
+contar os payloads sintéticos). O perfil `membros` não é um perfil do
+bot: é a alternativa de ligar o intent de membros para que
+`guild.get_member` ache a equipe, e serve de comparação com a busca sob
+demanda pelo `MemberLoader`, que também é conferida (a equipe entra no
+cache com uma consulta só).
+
+Uso: python benchmarks/bench_memoria.py [membros] [mensagens]
+"""
+import asyncio
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import discord
+from fake_discord import FakeGateway
+
+from gateway_profile import PERFIS, opcoes_do_perfil
+from member_loader import MemberLoader
+
+CANAIS = 500
+CARGOS = 200
+EQUIPE = 10
+
+def opcoes(perfil):
+    if perfil == 'membros':
+        intents, extras = opcoes_do_perfil('padrao')
+        intents.members = True
+        return intents, extras
+    return opcoes_do_perfil(perfil)
+
+async def medir(perfil, membros, mensagens):
+    intents, extras = opcoes(perfil)
+    tracemalloc.start()
+    client = discord.Client(intents=intents, **extras)
+    client._connection.loop = asyncio.get_running_loop()
+    gateway = FakeGateway(client)
+    data = gateway.servidor(membros, CANAIS, CARGOS)
+    gc.collect()
+    base = tracemalloc.get_traced_memory()[0]
+    inicio = time.perf_counter()
+    guild, channel_ids, user_ids = gateway.guild_create(data)
+    del data
+    conteudo = "mensagem de teste no ticket " * 8
+    for i in range(mensagens):
+        gateway.message_create(
+            guild.id, channel_ids[i % len(channel_ids)],
+            user_ids[(i * 7919) % len(user_ids)], conteudo
+        )
+
+    # Staff: a equipe precisa estar em `guild.get_member` para os overwrites
+    equipe = user_ids[1:EQUIPE + 1]
+    loader = MemberLoader()
+    await loader.get_many(guild, equipe)
+    pedidos_equipe = gateway.pedidos
+    await loader.get_many(guild, equipe)
+    equipe_ok = all(guild.get_member(user_id) is not None for user_id in equipe)
+    duracao = time.perf_counter() - inicio
+
+    gc.collect()
+    atual, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'perfil': perfil,
+        'retido_mb': (atual - base) / 2**20,
+        'pico_mb': (pico - base) / 2**20,
+        'membros_cache': len(guild._members),
+        'mensagens_cache': len(client.cached_messages),
+        'usuarios_cache': len(client._connection._users),
+        'consultas_equipe': pedidos_equipe,
+        'consultas_repetidas': gateway.pedidos - pedidos_equipe,
+        'equipe_ok': equipe_ok,
+        'segundos': duracao,
+    }
+
+def rodar(membros, mensagens):
+    resultados = []
+    for perfil in (*PERFIS, 'membros'):
+        saida = subprocess.run(
+            [sys.executable, __file__, '--perfil', perfil,
+             str(membros), str(mensagens)],
+            capture_output=True, text=True, check=True
+        )
+        resultados.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+
+    print(f"Servidor sintético: {membros} membros, {CANAIS} canais, {CARGOS} cargos, "
+          f"{mensagens} mensagens")
+    print(f"{'perfil':<10} {'retido':>9} {'pico':>9} {'membros':>8} {'mensagens':>9} "
+          f"{'usuários':>8} {'consultas':>9} {'tempo':>7}")
+    for r in resultados:
+        print(f"{r['perfil']:<10} {r['retido_mb']:>7.2f}MB {r['pico_mb']:>7.2f}MB "
+              f"{r['membros_cache']:>8} {r['mensagens_cache']:>9} "
+              f"{r['usuarios_cache']:>8} {r['consultas_equipe']:>9} "
+              f"{r['segundos']:>6.2f}s")
+
+    por_perfil = {r['perfil']: r for r in resultados}
+    economico, padrao = por_perfil['economico'], por_perfil['padrao']
+    falhas = []
+    if economico['retido_mb'] >= padrao['retido_mb']:
+        falhas.append("perfil econômico não usa menos memória que o padrão")
+    if economico['mensagens_cache'] or economico['membros_cache'] > EQUIPE + 1:
+        falhas.append("perfil econômico guardou mensagens ou membros além da equipe")
+    uma_consulta = (economico['consultas_equipe'] == 1
+                    and not economico['consultas_repetidas'])
+    if not economico['equipe_ok'] or not uma_consulta:
+        falhas.append("equipe não foi carregada com uma única consulta")
+    for falha in falhas:
+        print(f"FALHA {falha}")
+    print("OK" if not falhas else f"{len(falhas)} falha(s)")
+    return not falhas
+
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    if argumentos[:1] == ['--perfil']:
+        perfil, argumentos = argumentos[1], argumentos[2:]
+        membros, mensagens = int(argumentos[0]), int(argumentos[1])
+        print(json.dumps(asyncio.run(medir(perfil, membros, mensagens))))
+        sys.exit(0)
+    membros = int(argumentos[0]) if argumentos else 50_000
+    mensagens = int(argumentos[1]) if len(argumentos) > 1 else 5_000
+    sys.exit(0 if rodar(membros, mensagens) else 1)
@@ -0,0 +1,128 @@
+"""Fila de pagamentos PIX durante uma promoção
+
+Cada cliente clica várias vezes em "Já Comprei"; depois o dono aprova a
+fila pelo resumo, uma página por vez. Mostra quantas DMs o dono recebeu
+(antes era uma por clique), quantas edições o resumo levou e quanto tempo
+os lotes de aprovação demoraram (limitados pelo orçamento de
+`member.add_roles` do agendador REST, ajustável por REST_LIMITES), e
+confere que cada cliente ganhou o cargo uma única vez e que a fila
+terminou vazia.
+
+Uso: python benchmarks/bench_pagamentos.py [clientes] [cliques_por_cliente]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+PASTA = tempfile.mkdtemp(prefix="bench-pagamentos-")
+os.environ.setdefault('BOT_STATE', 'memoria')
+os.environ.setdefault('TICKETS_DB', os.path.join(PASTA, "tickets.db"))
+os.environ.setdefault('TRANSCRIPTS_DIR', os.path.join(PASTA, "transcripts"))
+
+from fake_discord import (  # noqa: E402
+    FakeChannel,
+    FakeClient,
+    FakeGuild,
+    FakeInteraction,
+    FakeUser,
+    rede,
+)
+
+import main  # noqa: E402
+
+async def esperar(interaction):
+    tarefa = main.tarefas_interacao.get(interaction.id)
+    if tarefa is not None:
+        await tarefa
+    return interaction.respostas[-1] if interaction.respostas else None
+
+async def rodar(clientes, cliques):
+    await main.journal.open()
+    rede.configurar(latencia=0.02, jitter=0.01, seed=0)
+    cliente_discord = FakeClient()
+    main.resolver.client = cliente_discord
+
+    guild = FakeGuild("Loja")
+    dono = FakeUser("dono", user_id=1)
+    cliente_discord.users[dono.id] = dono
+    main.painel_config.load({str(guild.id): {'owner_id': dono.id}})
+    main.bot.get_guild = {guild.id: guild}.get
+    main.bot.get_partial_messageable = cliente_discord.get_partial_messageable
+
+    compradores = []
+    for i in range(clientes):
+        user = FakeUser(f"cliente{i}")
+        guild.members[user.id] = user
+        cliente_discord.users[user.id] = user
+        channel = FakeChannel(guild, f"compra-{i}")
+        main.tickets.add(channel.id, {
+            'guild_id': guild.id, 'user_id': user.id, 'user_name': user.name,
+            'cargo_name': "VIP", 'meses': 1, 'status': main.ABERTO,
+        })
+        compradores.append((user, channel))
+
+    # Promoção: todos clicam "Já Comprei" (várias vezes) ao mesmo tempo
+    inicio = time.perf_counter()
+    interacoes = [
+        FakeInteraction(guild, user, channel)
+        for user, channel in compradores for _ in range(cliques)
+    ]
+    view = main.PixTicketView()
+    await asyncio.gather(
+        *(view.ja_comprei.callback(interaction) for interaction in interacoes)
+    )
+    await asyncio.gather(*(esperar(interaction) for interaction in interacoes))
+    enfileirar = time.perf_counter() - inicio
+    await main.atualizar_resumos()
+
+    # O dono aprova página por página pelo resumo
+    paginas = 0
+    inicio = time.perf_counter()
+    while main.pagamentos_pendentes.count(guild.id):
+        itens, _, _ = main.pagamentos_pendentes.page(guild.id, 0)
+        de, ate = itens[0][1]['pedido_ms'], itens[-1][1]['pedido_ms']
+        interaction = FakeInteraction(None, dono)
+        botao = main.PagamentoLoteButton('aprovar', guild.id, de, ate)
+        await botao.callback(interaction)
+        resposta = await esperar(interaction)
+        paginas += 1
+        if not resposta or not resposta.startswith("✅"):
+            print(f"FALHA página {paginas}: {resposta}")
+            return False
+    aprovar = time.perf_counter() - inicio
+    await asyncio.sleep(0.5)  # DMs de aprovação saem em segundo plano
+
+    falhas = []
+    cargo = main.cargos.get(guild, "VIP")
+    for user, _ in compradores:
+        if cargo is None or user.roles.count(cargo) != 1:
+            falhas.append(f"{user.name}: cargos {user.roles}")
+        if len(user.dms) != 1:
+            falhas.append(f"{user.name}: {len(user.dms)} DMs")
+    if len([r for r in guild.roles if r.name == "VIP"]) != 1:
+        falhas.append("cargo VIP criado mais de uma vez")
+    edicoes = sum(message.edicoes for message in dono.dms)
+
+    print(f"{clientes} clientes x {cliques} cliques = {len(interacoes)} cliques "
+          f"em 'Já Comprei' ({enfileirar:.2f}s)")
+    print(f"DMs ao dono: {len(dono.dms)} (antes: {len(interacoes)}), "
+          f"edições do resumo: {edicoes}")
+    print(f"Aprovação: {paginas} página(s) em {aprovar:.2f}s, "
+          f"{aprovar / clientes * 1000:.1f} ms por pagamento")
+    print(f"Chamadas REST: {dict(rede.chamadas)}")
+    for falha in falhas[:10]:
+        print(f"FALHA {falha}")
+    print("OK" if not falhas else f"{len(falhas)} falha(s)")
+    return not falhas
+
+if __name__ == "__main__":
+    clientes = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    cliques = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    ok = asyncio.run(rodar(clientes, cliques))
+    main.journal.close()
+    sys.exit(0 if ok else 1)
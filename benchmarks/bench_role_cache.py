@@ -0,0 +1,75 @@
+"""Resolução de cargos no caminho de aprovação do PIX
+
+Mede o custo de achar um cargo pelo nome em um servidor com muitos cargos
+(varredura de `guild.roles` contra o índice do RoleCache) e confere que
+aprovações simultâneas de um cargo inexistente criam um único cargo. O
+limite local de `member.add_roles` é removido para que o tempo medido seja
+o da fila com concorrência limitada, não o da janela de rate limit.
+
+Uso: python benchmarks/bench_role_cache.py [cargos] [aprovacoes]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import discord
+from fake_discord import FakeGuild, FakeRole, FakeUser, rede
+
+from rest_scheduler import RestScheduler
+from role_cache import RoleCache
+
+def medir(funcao, repeticoes=2_000):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1e6
+
+async def aprovar_simultaneos(aprovacoes):
+    rede.configurar(latencia=0.05, jitter=0.02, seed=1)
+    guild = FakeGuild()
+    cargos = RoleCache(RestScheduler(limites={'member.add_roles': (1_000_000, 1.0)}))
+    membros = [FakeUser(f"cliente{i}") for i in range(aprovacoes)]
+
+    async def aprovar(member):
+        cargo = await cargos.get_or_create(guild, "Cliente PIX")
+        return await cargos.add_to_members(guild, cargo, [member])
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(aprovar(member) for member in membros))
+    individual = time.perf_counter() - inicio
+
+    cargo = cargos.get(guild, "Cliente PIX")
+    outros = [FakeUser(f"lote{i}") for i in range(aprovacoes)]
+    inicio = time.perf_counter()
+    resultado = await cargos.add_to_members(guild, cargo, outros)
+    lote = time.perf_counter() - inicio
+    falhas = sum(1 for erro in resultado.values() if erro is not None)
+    return guild, individual, lote, falhas
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 250
+    aprovacoes = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    guild = FakeGuild()
+    guild.roles = [FakeRole(f"cargo-{i}", guild) for i in range(total)]
+    alvo = guild.roles[-1].name
+    cargos = RoleCache(RestScheduler())
+    varredura = medir(lambda: discord.utils.get(guild.roles, name=alvo))
+    indice = medir(lambda: cargos.get(guild, alvo))
+    print(f"{total} cargos: varredura {varredura:.2f} µs, "
+          f"índice {indice:.2f} µs por busca")
+
+    guild, individual, lote, falhas = asyncio.run(aprovar_simultaneos(aprovacoes))
+    criados = sum(1 for role in guild.roles if role.name == "Cliente PIX")
+    print(f"{aprovacoes} aprovações simultâneas: {criados} cargo(s) criado(s) "
+          f"em {individual:.2f}s")
+    print(f"lote de {aprovacoes} membros: {lote:.2f}s, {falhas} falha(s)")
+    if criados != 1:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Custo da agenda de expiração de cargos com muitas assinaturas
+
+Grava N assinaturas com vencimentos espalhados em 30 dias, carrega a
+agenda e mede: tempo de carga, entradas em memória, custo de um ciclo sem
+vencidos e de um ciclo que retira um lote de vencidos.
+
+Uso: python benchmarks/bench_role_expiry.py [assinaturas...]
+"""
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from role_expiry import RoleExpiry
+from ticket_journal import TicketJournal
+
+DIAS = 30
+
+def popular(path, n, agora):
+    journal = TicketJournal(path)
+    journal.load()
+    journal.close()
+    rng = random.Random(n)
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO expiracoes (guild_id, user_id, role_id, expira_em) "
+        "VALUES (?, ?, ?, ?)",
+        ((i % 500, i, 1, agora + rng.uniform(0, DIAS * 86400)) for i in range(n))
+    )
+    conn.commit()
+    conn.close()
+
+async def rodar(n):
+    agora = time.time()
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-expiracao-"), "tickets.db")
+    popular(path, n, agora)
+    journal = TicketJournal(path)
+    await journal.open()
+    agenda = RoleExpiry(journal)
+
+    inicio = time.perf_counter()
+    await agenda.load(agora)
+    carga = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for _ in range(1000):
+        await agenda.due(agora, 100)
+    ciclo_vazio = (time.perf_counter() - inicio) / 1000
+
+    # Avança 1h: ~n/720 assinaturas vencem; retira lotes de 100
+    inicio = time.perf_counter()
+    lotes = retirados = 0
+    while True:
+        vencidos = await agenda.due(agora + 3600, 100)
+        if not vencidos:
+            break
+        lotes += 1
+        retirados += len(vencidos)
+    ciclo_lote = (time.perf_counter() - inicio) / max(lotes, 1)
+    journal.close()
+    return carga, len(agenda) + retirados, ciclo_vazio, ciclo_lote, retirados
+
+def main():
+    tamanhos = [int(a) for a in sys.argv[1:]] or [10_000, 100_000, 500_000]
+    print(f"{'assinaturas':>12} {'carga':>9} {'em memória':>11} "
+          f"{'ciclo vazio':>12} {'lote de 100':>12}")
+    for n in tamanhos:
+        carga, memoria, vazio, lote, retirados = asyncio.run(rodar(n))
+        print(f"{n:>12} {carga * 1000:>7.1f}ms {memoria:>11} "
+              f"{vazio * 1e6:>10.1f}µs {lote * 1000:>10.2f}ms")
+
+if __name__ == "__main__":
+    main()
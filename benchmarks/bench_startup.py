@@ -0,0 +1,92 @@
+"""Tempo de cold start e memória do bot até o servidor web responder
+
+Cada rodada é um processo novo que importa `main`, sobe o servidor de
+keep-alive do jeito que o bot sobe e espera o primeiro `GET /health`.
+Não conecta ao Discord. Mede o tempo de import, o tempo até a primeira
+resposta HTTP, o RSS final e os módulos carregados.
+
+Uso: python benchmarks/bench_startup.py [rodadas]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SONDA = r'''
+import asyncio, json, os, sys, time, urllib.request
+inicio = time.perf_counter()
+import main
+import keep_alive
+importado = time.perf_counter()
+
+def rss_kb():
+    with open('/proc/self/status') as f:
+        for linha in f:
+            if linha.startswith('VmRSS:'):
+                return int(linha.split()[1])
+
+def esperar(url):
+    while True:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as r:
+                r.read()
+                return
+        except OSError as e:
+            if getattr(e, 'code', None):
+                return
+            time.sleep(0.005)
+
+async def subir():
+    servidor = keep_alive.keep_alive(main.estado_saude)
+    if asyncio.iscoroutine(servidor):
+        await servidor
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(
+        None, esperar, f"http://127.0.0.1:{os.environ['PORT']}/health"
+    )
+
+asyncio.run(subir())
+pronto = time.perf_counter()
+print(json.dumps({
+    'import_ms': (importado - inicio) * 1000,
+    'pronto_ms': (pronto - inicio) * 1000,
+    'rss_kb': rss_kb(),
+    'modulos': len(sys.modules),
+    'flask': 'flask' in sys.modules,
+}))
+sys.stdout.flush()
+os._exit(0)
+'''
+
+def rodada(porta=None):
+    porta = porta or os.environ.get('PORT', '8080')
+    pasta = tempfile.mkdtemp(prefix="bench-startup-")
+    env = dict(
+        os.environ, BOT_STATE='memoria', TICKETS_DB=os.path.join(pasta, "tickets.db"),
+        PORT=str(porta)
+    )
+    saida = subprocess.run(
+        [sys.executable, '-c', SONDA], cwd=RAIZ, env=env,
+        capture_output=True, text=True, timeout=120
+    )
+    if saida.returncode != 0:
+        raise RuntimeError(saida.stderr)
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+def main():
+    rodadas = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    resultados = [rodada() for _ in range(rodadas)]
+    resumo = {
+        chave: round(statistics.median(r[chave] for r in resultados), 1)
+        for chave in ('import_ms', 'pronto_ms', 'rss_kb', 'modulos')
+    }
+    resumo['flask'] = resultados[0]['flask']
+    resumo['rodadas'] = rodadas
+    print(json.dumps(resumo, indent=2))
+
+if __name__ == "__main__":
+    main()
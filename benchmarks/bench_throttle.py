@@ -0,0 +1,165 @@
+"""Cliques repetidos nos botões públicos (limite por usuário e servidor)
+
+Um usuário martela "Comprar", "Já Comprei" e um botão de categoria
+enquanto outros clientes clicam uma vez cada. As interações passam pelo
+mesmo caminho do discord.py (`interaction_check` e depois o callback),
+primeiro sem limite e depois com o limitador do bot. Mostra quantos
+cliques do spammer viraram trabalho e chamadas à API, confere que nenhum
+cliente legítimo foi recusado e que as recusas aparecem nas métricas,
+que o limite do servidor (quando configurado) separa as ofertas, e
+mede o custo de `InteractionThrottle.check` com muitos usuários e a
+varredura que devolve a memória.
+
+Uso: python benchmarks/bench_throttle.py [cliques_do_spammer] [clientes]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+PASTA = tempfile.mkdtemp(prefix="bench-throttle-")
+os.environ.setdefault('BOT_STATE', 'memoria')
+os.environ.setdefault('TICKETS_DB', os.path.join(PASTA, "tickets.db"))
+os.environ.setdefault('TRANSCRIPTS_DIR', os.path.join(PASTA, "transcripts"))
+
+from fake_discord import FakeChannel, FakeGuild, FakeInteraction, FakeUser, rede  # noqa: E402
+
+import main  # noqa: E402
+import metrics  # noqa: E402
+from interaction_throttle import InteractionThrottle  # noqa: E402
+
+OFERTA_ID = 1
+
+async def clicar(item, callback, interaction):
+    """Como o discord.py: o callback só roda se o `interaction_check` liberar"""
+    if not await item.interaction_check(interaction):
+        return False
+    await callback(interaction)
+    tarefa = main.tarefas_interacao.get(interaction.id)
+    if tarefa is not None:
+        await tarefa
+    return True
+
+async def rodada(cliques, clientes):
+    """Spammer (com e sem ticket aberto) e clientes; devolve as contagens"""
+    guild = FakeGuild("Loja")
+    main.bot.get_guild = {guild.id: guild}.get
+    main.painel_config.load({str(guild.id): {'pix_key': "chave"}})
+    spammer = FakeUser("spammer")
+    ticket_pix = FakeChannel(guild, "compra-spammer")
+    main.tickets.add(ticket_pix.id, {
+        'guild_id': guild.id, 'user_id': spammer.id, 'user_name': spammer.name,
+        'cargo_name': "VIP", 'meses': 1, 'status': main.ABERTO,
+    })
+    comprar = main.ComprarButton(OFERTA_ID)
+    pix = main.PixTicketView()
+    categorias = main.TicketCategoryView()
+    botoes = [
+        (comprar, comprar.callback, None, f"comprar:{OFERTA_ID}"),
+        (pix, pix.ja_comprei.callback, ticket_pix, "btn_ja_comprei"),
+        (categorias, categorias.duvida.callback, None, "btn_duvida"),
+    ]
+
+    rede.zerar()
+    liberados = 0
+    for i in range(cliques):
+        item, callback, channel, custom_id = botoes[i % len(botoes)]
+        liberados += await clicar(
+            item, callback, FakeInteraction(guild, spammer, channel, custom_id)
+        )
+    chamadas = dict(rede.chamadas)
+
+    recusados = 0
+    for i in range(clientes):
+        interaction = FakeInteraction(
+            guild, FakeUser(f"cliente{i}"), None, "btn_duvida"
+        )
+        recusados += not await clicar(
+            categorias, categorias.duvida.callback, interaction
+        )
+    return liberados, chamadas, recusados
+
+def por_oferta(clientes):
+    """Com limite no servidor, uma oferta esgotada não recusa cliques em outra"""
+    limitador = InteractionThrottle(
+        limite_servidor=lambda _guild_id: (clientes // 2, 10.0)
+    )
+    esgotada = sum(
+        limitador.check('comprar', 1, user_id, '1') > 0 for user_id in range(clientes)
+    )
+    outra = sum(
+        limitador.check('comprar', 1, user_id, '2') > 0
+        for user_id in range(clientes // 2)
+    )
+    return esgotada, outra
+
+def custo_check(usuarios, repeticoes=3):
+    """Tempo por `check` com muitos usuários distintos e a varredura depois"""
+    limitador = InteractionThrottle(limite_servidor=lambda _guild_id: (10**9, 10.0))
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for user_id in range(usuarios):
+            limitador.check('btn_duvida', user_id // 20, user_id)
+    por_check = (time.perf_counter() - inicio) / (usuarios * repeticoes)
+    buckets = len(limitador)
+    inicio = time.perf_counter()
+    removidos = limitador.evict(time.monotonic() + 3600)
+    return por_check, buckets, removidos, time.perf_counter() - inicio, len(limitador)
+
+async def rodar(cliques, clientes):
+    await main.journal.open()
+    rede.configurar(latencia=0.005)
+    main.ofertas[OFERTA_ID] = {'cargo_name': "VIP", 'meses': 1, 'valor': "10"}
+
+    limitador = main.limitador
+    main.limitador = InteractionThrottle(limites=dict.fromkeys(
+        ('comprar', 'btn_ja_comprei', 'btn_duvida'), (10 ** 9, 1.0)
+    ))
+    sem_limite, chamadas_sem, _ = await rodada(cliques, clientes)
+    main.limitador = limitador
+    com_limite, chamadas_com, recusados = await rodada(cliques, clientes)
+    rejeitados = sum(
+        v for (nome, _), v in metrics.contadores.items()
+        if nome == 'throttle_rejected_total'
+    )
+    por_check, buckets, removidos, varredura, restantes = custo_check(100_000)
+    esgotada, outra = por_oferta(clientes)
+
+    print(f"Spammer, {cliques} cliques sem limite: {sem_limite} executados, "
+          f"chamadas {chamadas_sem}")
+    print(f"Spammer, {cliques} cliques com limite: {com_limite} executados, "
+          f"chamadas {chamadas_com}")
+    print(f"Clientes: {clientes}, {recusados} recusado(s); "
+          f"rejeições nas métricas: {rejeitados}")
+    print(f"check: {por_check * 1e6:.2f} µs; varredura de {buckets} buckets: "
+          f"{varredura * 1000:.1f} ms, {removidos} removido(s), "
+          f"{restantes} restante(s)")
+    print(f"Limite de {clientes // 2} cliques no servidor: oferta esgotada recusou "
+          f"{esgotada}, outra oferta recusou {outra}")
+    falhas = []
+    if com_limite > 3 * 3:
+        falhas.append("spammer passou do limite")
+    if recusados:
+        falhas.append("cliente legítimo foi recusado")
+    if rejeitados != cliques - com_limite:
+        falhas.append("recusas não foram contadas")
+    if esgotada != clientes - clientes // 2 or outra:
+        falhas.append("limite do servidor não separou as ofertas")
+    if restantes:
+        falhas.append("varredura não removeu os buckets recompostos")
+    for falha in falhas:
+        print(f"FALHA {falha}")
+    print("OK" if not falhas else f"{len(falhas)} falha(s)")
+    return not falhas
+
+if __name__ == "__main__":
+    cliques = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    clientes = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    ok = asyncio.run(rodar(cliques, clientes))
+    main.transcricoes.close()
+    main.journal.close()
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,81 @@
+"""Micro-benchmark do TicketStore contra a varredura linear antiga
+
+Uso: python benchmarks/bench_ticket_store.py [tamanhos...]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ticket_store import ABERTO, FECHADO, TicketStore
+
+GUILDS = 50
+CONSULTAS = 10_000
+
+def popular(n):
+    store = TicketStore()
+    linear = {}
+    rng = random.Random(n)
+    for channel_id in range(n):
+        ticket = {
+            'guild_id': rng.randrange(GUILDS),
+            'user_id': rng.randrange(n // 2 + 1),
+            'status': ABERTO if rng.random() < 0.1 else FECHADO,
+        }
+        store.add(channel_id, ticket)
+        linear[channel_id] = dict(ticket)
+    return store, linear
+
+def cronometrar(func, repeticoes):
+    inicio = time.perf_counter()
+    for i in range(repeticoes):
+        func(i)
+    return (time.perf_counter() - inicio) / repeticoes * 1e6
+
+def rodar(n):
+    store, linear = popular(n)
+    rng = random.Random(0)
+    usuarios = [
+        (rng.randrange(GUILDS), rng.randrange(n // 2 + 1)) for _ in range(CONSULTAS)
+    ]
+    canais = [rng.randrange(n) for _ in range(CONSULTAS)]
+
+    def has_open(i):
+        g, u = usuarios[i]
+        store.has_open(g, u)
+
+    def transicao(i):
+        c = canais[i]
+        store.set_status(c, FECHADO)
+        store.set_status(c, ABERTO)
+
+    def stats(i):
+        store.count(ABERTO, i % GUILDS)
+        store.count(ABERTO)
+
+    def varredura(i):
+        g, u = usuarios[i]
+        [t for t in linear.values() if t['user_id'] == u and t['status'] == ABERTO]
+
+    resultado = {
+        'has_open_us': cronometrar(has_open, CONSULTAS),
+        'transicao_us': cronometrar(transicao, CONSULTAS),
+        'stats_us': cronometrar(stats, CONSULTAS),
+        # A varredura é O(N); poucas repetições bastam para medir
+        'varredura_linear_us': cronometrar(varredura, max(1, 1_000_000 // n)),
+    }
+    return resultado
+
+def main():
+    tamanhos = [int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    print(f"{'tickets':>10} {'has_open':>10} {'transição':>10} {'stats':>10} "
+          f"{'varredura':>12}  (µs/op)")
+    for n in tamanhos:
+        r = rodar(n)
+        print(f"{n:>10} {r['has_open_us']:>10.2f} {r['transicao_us']:>10.2f} "
+              f"{r['stats_us']:>10.2f} {r['varredura_linear_us']:>12.1f}")
+
+if __name__ == "__main__":
+    main()
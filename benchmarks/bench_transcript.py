@@ -0,0 +1,54 @@
+"""Throughput e pico de memória da exportação de transcrições
+
+Exporta canais falsos com históricos de tamanhos diferentes e mede
+mensagens por segundo e o pico de memória alocada durante a exportação
+(tracemalloc). Por padrão o limite local de `channel.history` é removido
+para medir o exportador em si; com --limite-real usa o limite do
+agendador REST.
+
+Uso: python benchmarks/bench_transcript.py [--limite-real] [tamanhos...]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_discord import FakeChannel, FakeGuild
+
+from rest_scheduler import RestScheduler
+from transcripts import TranscriptExporter
+
+async def rodar(tamanho, limite_real):
+    limites = None if limite_real else {'channel.history': (1_000_000, 1.0)}
+    exportador = TranscriptExporter(
+        RestScheduler(limites=limites), tempfile.mkdtemp(prefix="transcripts-")
+    )
+    channel = FakeChannel(FakeGuild(), "ticket-1", historico=tamanho)
+    tracemalloc.start()
+    try:
+        relatorio = await exportador.export(channel)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        exportador.close()
+    return relatorio, pico
+
+def main():
+    argumentos = sys.argv[1:]
+    limite_real = '--limite-real' in argumentos
+    tamanhos = [int(a) for a in argumentos if a != '--limite-real']
+    tamanhos = tamanhos or [1_000, 10_000, 50_000]
+    print(f"{'mensagens':>10} {'msg/s':>10} {'arquivo':>10} {'pico mem':>10}")
+    for tamanho in tamanhos:
+        relatorio, pico = asyncio.run(rodar(tamanho, limite_real))
+        print(
+            f"{relatorio['mensagens']:>10} {relatorio['mensagens_por_segundo']:>10.0f} "
+            f"{relatorio['bytes'] / 1024:>8.0f}KB {pico / 1024:>8.0f}KB"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+"""Servidor, canais e interações falsos para rodar os handlers sem o Discord
+
+Só implementa o que os handlers de `main.py` usam. Toda chamada REST
+falsa passa por `rede`, que conta as chamadas por rota, aplica a latência
+configurada e pode responder 429; como a biblioteca real, o 429 é
+esperado (`retry_after`) e a chamada é repetida.
+"""
+import asyncio
+import collections
+import datetime
+import itertools
+import random
+import time
+
+import discord
+
+_ids = itertools.count(10_000)
+
+class Rede:
+    """Latência e rate limit simulados do REST"""
+
+    def __init__(self, latencia=0.0, jitter=0.0, prob_429=0.0, retry_after=1.0, seed=0):
+        self.latencia = latencia
+        self.jitter = jitter
+        self.prob_429 = prob_429
+        self.retry_after = retry_after
+        self.chamadas = collections.Counter()
+        self.respostas_429 = collections.Counter()
+        self._rng = random.Random(seed)
+
+    def configurar(self, seed=None, **opcoes):
+        if seed is not None:
+            self._rng = random.Random(seed)
+        for chave, valor in opcoes.items():
+            if not hasattr(self, chave):
+                raise TypeError(f"Opção desconhecida: {chave}")
+            setattr(self, chave, valor)
+
+    def zerar(self):
+        self.chamadas.clear()
+        self.respostas_429.clear()
+
+    async def chamada(self, rota, limitada=True):
+        """Simula uma requisição; respostas de interação não sofrem 429"""
+        while True:
+            self.chamadas[rota] += 1
+            await asyncio.sleep(self.latencia + self._rng.uniform(0, self.jitter))
+            if not limitada or self._rng.random() >= self.prob_429:
+                return
+            self.respostas_429[rota] += 1
+            await asyncio.sleep(self.retry_after)
+
+rede = Rede()
+
+class _Resposta:
+    def __init__(self, status):
+        self.status = status
+        self.reason = ""
+
+class _MensagemApagada:
+    async def edit(self, **kwargs):
+        await rede.chamada('message.edit')
+        raise discord.NotFound(_Resposta(404), "Unknown Message")
+
+class FakeRole:
+    def __init__(self, nome, guild):
+        self.id = next(_ids)
+        self.name = nome
+        self.guild = guild
+        self.mention = f"<@&{self.id}>"
+
+    def __hash__(self):
+        return hash(self.id)
+
+class FakeUser:
+    def __init__(self, nome, administrador=False, user_id=None):
+        self.id = user_id if user_id is not None else next(_ids)
+        self.name = nome
+        self.mention = f"<@{self.id}>"
+        self.guild_permissions = discord.Permissions(administrator=administrador)
+        self.roles = []
+        self.dms = []
+        self._dm_id = next(_ids)
+
+    def __hash__(self):
+        return hash(self.id)
+
+    async def send(self, content=None, **kwargs):
+        await rede.chamada('user.send')
+        message = FakeSentMessage(self._dm_id, content, kwargs)
+        self.dms.append(message)
+        return message
+
+    async def add_roles(self, *roles):
+        await rede.chamada('member.add_roles')
+        self.roles.extend(role for role in roles if role not in self.roles)
+
+    async def remove_roles(self, *roles):
+        await rede.chamada('member.remove_roles')
+        self.roles = [role for role in self.roles if role not in roles]
+
+class FakeMessage:
+    __slots__ = ('id', 'author', 'created_at', 'content', 'attachments', 'embeds')
+
+    def __init__(self, message_id, author, content):
+        self.id = message_id
+        self.author = author
+        inicio = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+        self.created_at = inicio + datetime.timedelta(seconds=message_id)
+        self.content = content
+        self.attachments = []
+        self.embeds = []
+
+class FakeSentMessage:
+    """Mensagem enviada pelo bot; pode ser reeditada pelo id (`FakeClient`)"""
+    enviadas = {}
+
+    def __init__(self, channel_id, content, kwargs):
+        self.id = next(_ids)
+        self.channel = discord.Object(id=channel_id)
+        self.content = content
+        self.kwargs = kwargs
+        self.edicoes = 0
+        FakeSentMessage.enviadas[self.id] = self
+
+    async def edit(self, **kwargs):
+        await rede.chamada('message.edit')
+        self.kwargs.update(kwargs)
+        self.edicoes += 1
+        return self
+
+class FakeChannel:
+    def __init__(self, guild, nome, topic=None, overwrites=None, historico=0):
+        self.id = next(_ids)
+        self.guild = guild
+        self.name = nome
+        self.topic = topic
+        self.overwrites = overwrites or {}
+        self.mention = f"<#{self.id}>"
+        self.mensagens = []
+        self.last_message_id = None
+        # Mensagens antigas sintéticas (ids 1..historico), geradas sob demanda
+        self.historico = historico
+        self._autor = FakeUser("autor")
+
+    async def history(self, limit=100, after=None, oldest_first=True):
+        await rede.chamada('channel.history')
+        inicio = after.id + 1 if after is not None else 1
+        for message_id in range(inicio, min(self.historico, inicio + limit - 1) + 1):
+            yield FakeMessage(
+                message_id, self._autor,
+                f"mensagem {message_id} " + "x" * (message_id % 200)
+            )
+
+    async def send(self, content=None, **kwargs):
+        await rede.chamada('channel.send')
+        self.mensagens.append((content, kwargs))
+
+    async def edit(self, **kwargs):
+        await rede.chamada('channel.edit')
+        for chave, valor in kwargs.items():
+            setattr(self, chave, valor)
+        return self
+
+    async def delete(self, reason=None):
+        await rede.chamada('channel.delete')
+        self.guild.channels.pop(self.id, None)
+
+class FakeGuild:
+    def __init__(self, nome="Servidor de teste"):
+        self.id = next(_ids)
+        self.name = nome
+        self.default_role = FakeRole("@everyone", self)
+        self.me = FakeUser("bot")
+        self.categories = []
+        self.channels = {}
+        self.members = {}
+        self.roles = []
+        self.unavailable = False
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    def get_member(self, user_id):
+        return self.members.get(user_id)
+
+    def get_role(self, role_id):
+        return next((role for role in self.roles if role.id == role_id), None)
+
+    async def query_members(self, user_ids=None, limit=5, cache=True, **kwargs):
+        await rede.chamada('gateway.query_members')
+        encontrados = [
+            self.members[user_id] for user_id in user_ids or ()
+            if user_id in self.members
+        ]
+        return encontrados[:limit]
+
+    async def create_role(self, name, **kwargs):
+        await rede.chamada('guild.create_role')
+        role = FakeRole(name, self)
+        self.roles.append(role)
+        return role
+
+    async def create_text_channel(self, nome, topic=None, overwrites=None,
+                                  category=None):
+        await rede.chamada('guild.create_channel')
+        channel = FakeChannel(self, nome, topic, overwrites)
+        self.channels[channel.id] = channel
+        return channel
+
+class FakeClient:
+    """Substituto do bot para o UserResolver (`get_user` / `fetch_user`)"""
+
+    def __init__(self):
+        self.users = {}
+
+    def get_user(self, user_id):
+        return None
+
+    def get_partial_messageable(self, channel_id):
+        return self
+
+    def get_partial_message(self, message_id):
+        return FakeSentMessage.enviadas.get(message_id) or _MensagemApagada()
+
+    async def fetch_user(self, user_id):
+        await rede.chamada('user.fetch')
+        user = self.users.get(user_id)
+        if user is None:
+            user = self.users[user_id] = FakeUser(f"usuario-{user_id}", user_id=user_id)
+        return user
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    def _ack(self):
+        if not self._done:
+            self._done = True
+            self._interaction.ack_em = time.perf_counter()
+
+    async def send_message(self, content=None, **kwargs):
+        await rede.chamada('interaction.response', limitada=False)
+        self._ack()
+        self._interaction.respostas.append(content)
+
+    async def defer(self, **kwargs):
+        await rede.chamada('interaction.response', limitada=False)
+        self._ack()
+
+    async def send_modal(self, modal):
+        await rede.chamada('interaction.response', limitada=False)
+        self._ack()
+
+    async def edit_message(self, **kwargs):
+        await rede.chamada('interaction.response', limitada=False)
+        self._ack()
+        self._interaction.edicoes.append(kwargs)
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        await rede.chamada('interaction.followup', limitada=False)
+        self._interaction.respostas.append(content)
+
+class FakeInteraction:
+    def __init__(self, guild, user, channel=None, custom_id=''):
+        self.id = next(_ids)
+        self.guild = guild
+        self.guild_id = guild.id if guild is not None else None
+        self.data = {'custom_id': custom_id}
+        self.user = user
+        self.channel = channel
+        self.criado_em = time.perf_counter()
+        self.ack_em = None
+        self.respostas = []
+        self.edicoes = []
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+    async def edit_original_response(self, **kwargs):
+        await rede.chamada('interaction.followup', limitada=False)
+        self.edicoes.append(kwargs)
+
+    @property
+    def ack_latencia(self):
+        return None if self.ack_em is None else self.ack_em - self.criado_em
+
+class FakeGateway:
+    """Gateway falso ligado ao `ConnectionState` real de um cliente discord.py
+
+    Entrega payloads sintéticos (GUILD_CREATE, MESSAGE_CREATE) aos parsers
+    da biblioteca, respeitando os intents do cliente como o Discord faz, e
+    responde a REQUEST_GUILD_MEMBERS (`guild.query_members`) com um
+    GUILD_MEMBERS_CHUNK dos membros do servidor sintético. Serve para medir
+    os caches do discord.py, não os handlers.
+    """
+
+    def __init__(self, client):
+        self.state = client._connection
+        self.intents = client.intents
+        self.membros = {}  # guild_id -> {user_id: payload do membro}
+        self.pedidos = 0
+        client.ws = self
+
+    @staticmethod
+    def _usuario(user_id):
+        return {'id': str(user_id), 'username': f"usuario{user_id}",
+                'discriminator': '0', 'global_name': f"Usuário {user_id}",
+                'avatar': None}
+
+    @staticmethod
+    def _membro(user, roles=()):
+        return {'user': user, 'roles': [str(role_id) for role_id in roles],
+                'joined_at': '2024-01-01T00:00:00+00:00',
+                'deaf': False, 'mute': False, 'flags': 0}
+
+    def servidor(self, membros, canais, cargos):
+        """Payload GUILD_CREATE de um servidor sintético (ainda não entregue)"""
+        guild_id = next(_ids)
+        role_ids = [next(_ids) for _ in range(cargos)]
+        channel_ids = [next(_ids) for _ in range(canais)]
+        user_ids = [next(_ids) for _ in range(membros)]
+        payloads = {
+            user_id: self._membro(
+                self._usuario(user_id),
+                role_ids[i % cargos:i % cargos + 1] if cargos else ()
+            )
+            for i, user_id in enumerate(user_ids)
+        }
+        self.membros[guild_id] = payloads
+        data = {
+            'id': str(guild_id), 'name': f"Servidor {guild_id}", 'icon': None,
+            'owner_id': str(user_ids[0]), 'unavailable': False, 'large': True,
+            'member_count': membros, 'features': [],
+            'verification_level': 0, 'default_message_notifications': 0,
+            'explicit_content_filter': 0, 'mfa_level': 0, 'nsfw_level': 0,
+            'premium_tier': 0, 'afk_timeout': 300, 'system_channel_flags': 0,
+            'preferred_locale': 'pt-BR', 'joined_at': '2024-01-01T00:00:00+00:00',
+            'roles': [{'id': str(guild_id), 'name': '@everyone', 'permissions': '0',
+                       'position': 0, 'color': 0, 'hoist': False, 'managed': False,
+                       'mentionable': False}] + [
+                {'id': str(role_id), 'name': f"cargo-{i}", 'permissions': '0',
+                 'position': i + 1, 'color': 0, 'hoist': False, 'managed': False,
+                 'mentionable': False}
+                for i, role_id in enumerate(role_ids)
+            ],
+            'channels': [
+                {'id': str(channel_id), 'type': 0, 'name': f"canal-{i}", 'position': i,
+                 'permission_overwrites': [], 'topic': None, 'nsfw': False}
+                for i, channel_id in enumerate(channel_ids)
+            ],
+            # Sem o intent de membros o Discord não manda a lista (o chunking
+            # também exige o intent)
+            'members': list(payloads.values()) if self.intents.members else [],
+            'presences': [], 'voice_states': [], 'threads': [], 'emojis': [],
+            'stickers': [],
+            'stage_instances': [], 'guild_scheduled_events': [],
+        }
+        return data
+
+    def guild_create(self, data):
+        """Entrega o GUILD_CREATE; devolve (guild, ids dos canais, ids dos membros)"""
+        self.state.parse_guild_create(data)
+        guild_id = int(data['id'])
+        canais = [int(c['id']) for c in data['channels']]
+        return self.state._get_guild(guild_id), canais, list(self.membros[guild_id])
+
+    def message_create(self, guild_id, channel_id, user_id, conteudo):
+        """Mensagem de um membro; sem o intent de mensagens o evento não chega"""
+        if not self.intents.guild_messages:
+            return
+        membro = self.membros[guild_id][user_id]
+        self.state.parse_message_create({
+            'id': str(next(_ids) << 22), 'channel_id': str(channel_id),
+            'guild_id': str(guild_id),
+            'author': membro['user'],
+            'member': {k: v for k, v in membro.items() if k != 'user'},
+            'content': conteudo if self.intents.message_content else '',
+            'timestamp': '2024-01-01T00:00:00+00:00', 'edited_timestamp': None,
+            'tts': False, 'mention_everyone': False, 'mentions': [],
+            'mention_roles': [], 'attachments': [],
+            'embeds': [], 'pinned': False, 'type': 0, 'flags': 0,
+        })
+
+    async def request_chunks(self, guild_id, query=None, *, limit, user_ids=None,
+                             presences=False, nonce=None):
+        self.pedidos += 1
+        payloads = self.membros.get(guild_id, {})
+        encontrados = [
+            payloads[user_id] for user_id in user_ids or () if user_id in payloads
+        ][:limit]
+        chunk = {
+            'guild_id': str(guild_id), 'members': encontrados,
+            'chunk_index': 0, 'chunk_count': 1, 'nonce': nonce,
+            'not_found': [
+                str(user_id) for user_id in user_ids or () if user_id not in payloads
+            ],
+        }
+        # Como no gateway, a resposta chega depois, em outro evento (o discord.py
+        # só passa a esperar por ela depois de enviar o pedido)
+        asyncio.get_running_loop().call_later(
+            0.001, self.state.parse_guild_members_chunk, chunk
+        )
@@ -0,0 +1,258 @@
+"""Teste de carga offline dos handlers do bot
+
+Roda os handlers reais de `main.py` contra o Discord falso de
+`fake_discord.py`, com chegadas de Poisson em taxas configuráveis por
+operação, latência e respostas 429 injetadas no REST. Gera um JSON com
+p50/p95/p99 do tempo até o ack da interação e até a conclusão de cada
+operação, chamadas REST por ticket e atraso do event loop, para comparar
+versões.
+
+Uso:
+    python benchmarks/loadtest.py --duracao 30 --latencia 0.08 --prob-429 0.02 \\
+        --taxa abrir=20 --taxa fechar=10 --saida resultado.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+PASTA = tempfile.mkdtemp(prefix="loadtest-")
+os.environ.setdefault('BOT_STATE', 'memoria')
+os.environ.setdefault('TICKETS_DB', os.path.join(PASTA, "tickets.db"))
+os.environ.setdefault('TRANSCRIPTS_DIR', os.path.join(PASTA, "transcripts"))
+os.environ.setdefault('CONFIG_DEBOUNCE', '0.5')
+
+from fake_discord import FakeClient, FakeGuild, FakeInteraction, FakeUser, rede  # noqa: E402
+
+import main  # noqa: E402
+
+TAXAS_PADRAO = {
+    'abrir': 10.0, 'comprar': 2.0, 'fechar': 8.0, 'stats': 1.0, 'listar_equipe': 1.0,
+}
+OFERTA_ID = 1
+
+def percentis(valores):
+    if not valores:
+        return {'n': 0}
+    valores = sorted(valores)
+    def q(p):
+        return round(valores[min(len(valores) - 1, int(p * len(valores)))] * 1000, 3)
+    return {
+        'n': len(valores), 'p50_ms': q(0.50), 'p95_ms': q(0.95),
+        'p99_ms': q(0.99), 'max_ms': q(1.0),
+    }
+
+def versao():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class Carga:
+    """Estado do teste: servidores falsos, tickets abertos e medições"""
+
+    def __init__(self, guilds, equipe, seed):
+        self.rng = random.Random(seed)
+        self.guilds = [FakeGuild(f"servidor-{i}") for i in range(guilds)]
+        self.admin = FakeUser("admin", administrador=True)
+        self.abertos = []
+        self.tickets_criados = 0
+        self.ack = {}
+        self.conclusao = {}
+        self.erros = {}
+        for guild in self.guilds:
+            # Metade da equipe está no cache do servidor, a outra metade exige fetch
+            ids = []
+            for i in range(equipe):
+                membro = FakeUser(f"equipe-{i}")
+                if i % 2 == 0:
+                    guild.members[membro.id] = membro
+                ids.append(membro.id)
+            main.painel_config.load({str(guild.id): {'equipe': ids}})
+
+    async def abrir(self, interaction):
+        await main.abrir_ticket_categoria(interaction, "Suporte", "🛠️")
+
+    async def comprar(self, interaction):
+        await main.ComprarButton(OFERTA_ID).callback(interaction)
+
+    async def fechar(self, interaction):
+        await main.TicketFecharView().fechar_ticket.callback(interaction)
+
+    async def stats(self, interaction):
+        await main.stats.callback(interaction)
+
+    async def listar_equipe(self, interaction):
+        await main.listar_equipe.callback(interaction)
+
+    def interacao(self, operacao):
+        guild = self.rng.choice(self.guilds)
+        if operacao in ('abrir', 'comprar'):
+            return FakeInteraction(guild, FakeUser(f"cliente-{self.rng.random():.6f}"))
+        if operacao == 'fechar':
+            if not self.abertos:
+                return None
+            channel = self.abertos.pop(self.rng.randrange(len(self.abertos)))
+            return FakeInteraction(channel.guild, self.admin, channel)
+        return FakeInteraction(guild, self.admin)
+
+    async def executar(self, operacao):
+        interaction = self.interacao(operacao)
+        if interaction is None:
+            return
+        canais_antes = len(interaction.guild.channels)
+        try:
+            await getattr(self, operacao)(interaction)
+            # Handlers que reconhecem na hora concluem em segundo plano
+            tarefa = main.tarefas_interacao.get(interaction.id)
+            if tarefa is not None:
+                await tarefa
+        except Exception as e:
+            print(f"Erro em {operacao}: {e}")
+            self.erros[operacao] = self.erros.get(operacao, 0) + 1
+        fim = time.perf_counter()
+        self.conclusao.setdefault(operacao, []).append(fim - interaction.criado_em)
+        if interaction.ack_latencia is not None:
+            self.ack.setdefault(operacao, []).append(interaction.ack_latencia)
+        else:
+            self.erros[operacao] = self.erros.get(operacao, 0) + 1
+        if any(r and r.startswith("❌") for r in interaction.respostas):
+            self.erros[operacao] = self.erros.get(operacao, 0) + 1
+        criou = len(interaction.guild.channels) > canais_antes
+        if operacao in ('abrir', 'comprar') and criou:
+            self.tickets_criados += 1
+            channel = max(interaction.guild.channels.values(), key=lambda c: c.id)
+            self.abertos.append(channel)
+
+async def gerar(carga, operacao, taxa, duracao, tarefas):
+    """Dispara a operação em chegadas de Poisson com a taxa dada (por segundo)"""
+    fim = time.perf_counter() + duracao
+    while True:
+        await asyncio.sleep(carga.rng.expovariate(taxa))
+        if time.perf_counter() >= fim:
+            return
+        tarefas.append(asyncio.ensure_future(carga.executar(operacao)))
+
+async def medir_loop(intervalo, amostras, parar):
+    """Mede quanto cada sleep curto atrasa além do pedido"""
+    while not parar.is_set():
+        inicio = time.perf_counter()
+        await asyncio.sleep(intervalo)
+        amostras.append(max(0.0, time.perf_counter() - inicio - intervalo))
+
+async def rodar(args, taxas):
+    rede.configurar(latencia=args.latencia, jitter=args.jitter, prob_429=args.prob_429,
+                    retry_after=args.retry_after, seed=args.seed)
+    await main.journal.open()
+    main.resolver.client = FakeClient()
+    main.ofertas[OFERTA_ID] = {'cargo_name': "VIP", 'meses': 1, 'valor': "10"}
+    carga = Carga(args.guilds, args.equipe, args.seed)
+
+    lag = []
+    parar = asyncio.Event()
+    monitor = asyncio.ensure_future(medir_loop(0.01, lag, parar))
+    tarefas = []
+    inicio = time.perf_counter()
+    await asyncio.gather(*(
+        gerar(carga, operacao, taxa, args.duracao, tarefas)
+        for operacao, taxa in taxas.items() if taxa > 0
+    ))
+    if tarefas:
+        await asyncio.wait(tarefas, timeout=args.dreno)
+    decorrido = time.perf_counter() - inicio
+    parar.set()
+    await monitor
+    await main.config_writer.flush()
+
+    chamadas = dict(rede.chamadas)
+    total_rest = sum(
+        n for rota, n in chamadas.items() if not rota.startswith('interaction.')
+    )
+    return {
+        'versao': versao(),
+        'python': platform.python_version(),
+        'config': {
+            'duracao': args.duracao, 'guilds': args.guilds, 'equipe': args.equipe,
+            'latencia': args.latencia, 'jitter': args.jitter, 'prob_429': args.prob_429,
+            'retry_after': args.retry_after, 'seed': args.seed, 'taxas': taxas,
+        },
+        'decorrido_s': round(decorrido, 3),
+        'pendentes': sum(1 for t in tarefas if not t.done()),
+        'operacoes': {
+            operacao: {
+                'ack': percentis(carga.ack.get(operacao, [])),
+                'conclusao': percentis(carga.conclusao.get(operacao, [])),
+                'erros': carga.erros.get(operacao, 0),
+            }
+            for operacao in taxas
+        },
+        'rest': {
+            'chamadas': chamadas,
+            'respostas_429': dict(rede.respostas_429),
+            'tickets_criados': carga.tickets_criados,
+            'chamadas_por_ticket': (
+                round(total_rest / carga.tickets_criados, 3)
+                if carga.tickets_criados else None
+            ),
+        },
+        'loop_lag': percentis(lag),
+    }
+
+def parse_taxas(pares):
+    taxas = dict(TAXAS_PADRAO)
+    for par in pares or ():
+        operacao, _, valor = par.partition('=')
+        if operacao not in TAXAS_PADRAO:
+            raise SystemExit(f"Operação desconhecida: {operacao}")
+        taxas[operacao] = float(valor)
+    return taxas
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--duracao', type=float, default=10.0, help="segundos gerando carga"
+    )
+    parser.add_argument(
+        '--dreno', type=float, default=60.0,
+        help="segundos esperando as operações pendentes"
+    )
+    parser.add_argument('--guilds', type=int, default=20)
+    parser.add_argument(
+        '--equipe', type=int, default=10, help="membros da equipe por servidor"
+    )
+    parser.add_argument(
+        '--latencia', type=float, default=0.05,
+        help="latência base do REST em segundos"
+    )
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--prob-429', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--taxa', action='append', metavar="OPERACAO=POR_SEGUNDO",
+                        help=f"operações: {', '.join(TAXAS_PADRAO)}")
+    parser.add_argument('--saida', help="arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+
+    resultado = asyncio.run(rodar(args, parse_taxas(args.taxa)))
+    main.journal.close()
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(texto)
+    print(texto)
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,93 @@
+"""Teste de concorrência da abertura de tickets
+
+Cada usuário dispara uma rajada de cliques simultâneos misturando painel,
+modal e botão Comprar. Ao final confere que cada usuário ganhou exatamente
+um canal, que todos os cliques da rajada receberam o mesmo canal e que os
+números dos tickets de cada servidor não se repetem.
+
+Uso: python benchmarks/stress_abertura.py [usuarios] [cliques_por_usuario]
+"""
+import asyncio
+import collections
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+PASTA = tempfile.mkdtemp(prefix="stress-abertura-")
+os.environ.setdefault('BOT_STATE', 'memoria')
+os.environ.setdefault('TICKETS_DB', os.path.join(PASTA, "tickets.db"))
+os.environ.setdefault('TRANSCRIPTS_DIR', os.path.join(PASTA, "transcripts"))
+
+from fake_discord import FakeGuild, FakeInteraction, FakeUser, rede  # noqa: E402
+
+import main  # noqa: E402
+
+async def clique(tipo, guild, user):
+    interaction = FakeInteraction(guild, user)
+    if tipo == 'painel':
+        await main.abrir_ticket_categoria(interaction, "Suporte", "🛠️")
+    elif tipo == 'modal':
+        modal = main.TicketModal()
+        modal.motivo._value = "Dúvida"
+        modal.descricao._value = "Teste de concorrência"
+        await modal.on_submit(interaction)
+    else:
+        await main.ComprarButton(1).callback(interaction)
+    tarefa = main.tarefas_interacao.get(interaction.id)
+    if tarefa is not None:
+        await tarefa
+    return interaction.respostas[-1] if interaction.respostas else None
+
+async def rodar(usuarios, cliques):
+    await main.journal.open()
+    main.ofertas[1] = {'cargo_name': "VIP", 'meses': 1, 'valor': "10"}
+    rede.configurar(latencia=0.02)
+    guilds = [FakeGuild(f"servidor-{i}") for i in range(3)]
+    rng = random.Random(0)
+
+    rajadas = []
+    for i in range(usuarios):
+        guild = guilds[i % len(guilds)]
+        user = FakeUser(f"usuario-{i}")
+        tipos = [rng.choice(('painel', 'modal', 'comprar')) for _ in range(cliques)]
+        rajadas.append((guild, user, tipos))
+
+    respostas = await asyncio.gather(*(
+        asyncio.gather(*(clique(tipo, guild, user) for tipo in tipos))
+        for guild, user, tipos in rajadas
+    ))
+
+    falhas = []
+    por_guild = collections.defaultdict(list)
+    for (guild, user, _), resposta in zip(rajadas, respostas):
+        canais = [c for c in guild.channels.values() if user in c.overwrites]
+        if len(canais) != 1:
+            falhas.append(f"{user.name}: {len(canais)} canais")
+            continue
+        canal = canais[0]
+        por_guild[guild.id].append(int(canal.name.rsplit('-', 1)[1]))
+        if any(canal.mention not in (r or '') for r in resposta):
+            falhas.append(f"{user.name}: respostas sem o canal {resposta}")
+
+    for guild_id, numeros in por_guild.items():
+        if len(set(numeros)) != len(numeros):
+            falhas.append(f"servidor {guild_id}: números repetidos")
+
+    total_canais = sum(len(g.channels) for g in guilds)
+    print(f"{usuarios} usuários x {cliques} cliques -> {total_canais} canais")
+    print(f"Chamadas REST: {dict(rede.chamadas)}")
+    for falha in falhas:
+        print(f"FALHA {falha}")
+    print("OK" if not falhas else f"{len(falhas)} falha(s)")
+    return not falhas
+
+if __name__ == "__main__":
+    usuarios = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    cliques = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    ok = asyncio.run(rodar(usuarios, cliques))
+    main.journal.close()
+    sys.exit(0 if ok else 1)
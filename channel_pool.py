@@ -0,0 +1,116 @@
+"""Pool de canais de ticket pré-criados por servidor"""
+import collections
+import functools
+import logging
+import time
+
+import discord
+
+import metrics
+from rest_scheduler import INTERACAO, SEGUNDO_PLANO
+
+log = logging.getLogger(__name__)
+
+PREFIXO = "pool-"
+
+class ChannelPool:
+    """Mantém canais ocultos prontos para virar tickets
+
+    Abrir um ticket vira uma única edição (nome, tópico e permissões) de um
+    canal que já existe, em vez de criar um canal do zero. O reabastecimento
+    acontece em segundo plano, limitado a `refill_por_ciclo` canais por
+    servidor a cada ciclo e enviado ao `rest` com prioridade de segundo
+    plano, para não consumir o orçamento dos cliques.
+    """
+
+    def __init__(self, rest, categoria="Tickets", refill_por_ciclo=2):
+        self.rest = rest
+        self.categoria = categoria
+        self.refill_por_ciclo = refill_por_ciclo
+        self._pools = {}
+        self._sequencia = 0
+
+    def size(self, guild_id):
+        return len(self._pools.get(guild_id, ()))
+
+    def discover(self, guild):
+        """Recupera canais do pool que já existiam antes de um restart"""
+        pool = self._pools.setdefault(guild.id, collections.deque())
+        conhecidos = set(pool)
+        categoria = discord.utils.get(guild.categories, name=self.categoria)
+        if categoria:
+            for channel in categoria.text_channels:
+                if channel.name.startswith(PREFIXO) and channel.id not in conhecidos:
+                    pool.append(channel.id)
+        metrics.set_gauge('ticket_pool_size', len(pool), guild=guild.id)
+        return pool
+
+    async def claim(self, guild, nome, topico, overwrites):
+        """Transforma um canal do pool em ticket; None se o pool estiver vazio"""
+        inicio = time.perf_counter()
+        pool = self._pools.get(guild.id)
+        while pool:
+            channel = guild.get_channel(pool.popleft())
+            if channel is None:
+                continue
+            metrics.set_gauge('ticket_pool_size', len(pool), guild=guild.id)
+            try:
+                editado = await self.rest.run(
+                    'channel.edit', channel.id,
+                    functools.partial(
+                        channel.edit, name=nome, topic=topico, overwrites=overwrites
+                    ),
+                    INTERACAO
+                )
+            except discord.HTTPException:
+                log.exception("Erro ao usar canal do pool")
+                continue
+            metrics.inc('ticket_pool_claims_total', resultado='hit')
+            metrics.observe('ticket_pool_claim_seconds', time.perf_counter() - inicio)
+            return editado or channel
+        metrics.inc('ticket_pool_claims_total', resultado='miss')
+        return None
+
+    async def refill(self, guild, tamanho):
+        """Cria até `refill_por_ciclo` canais enquanto o pool não chega a `tamanho`"""
+        pool = self._pools.get(guild.id)
+        if pool is None:
+            pool = self.discover(guild)
+        criados = 0
+        while len(pool) < tamanho and criados < self.refill_por_ciclo:
+            categoria = await self._categoria(guild)
+            self._sequencia += 1
+            nome = f"{PREFIXO}{self._sequencia}"
+            channel = await self.rest.run(
+                'guild.create_channel', guild.id,
+                functools.partial(
+                    guild.create_text_channel, nome,
+                    category=categoria, overwrites=self._ocultos(guild)
+                ),
+                SEGUNDO_PLANO
+            )
+            pool.append(channel.id)
+            criados += 1
+            metrics.inc('ticket_pool_created_total')
+        metrics.set_gauge('ticket_pool_size', len(pool), guild=guild.id)
+        return criados
+
+    async def _categoria(self, guild):
+        categoria = discord.utils.get(guild.categories, name=self.categoria)
+        if categoria is None:
+            categoria = await self.rest.run(
+                'guild.create_channel', guild.id,
+                lambda: guild.create_category(
+                    self.categoria, overwrites=self._ocultos(guild)
+                ),
+                SEGUNDO_PLANO
+            )
+        return categoria
+
+    def _ocultos(self, guild):
+        return {
+            guild.default_role: discord.PermissionOverwrite(view_channel=False),
+            guild.me: discord.PermissionOverwrite(
+                view_channel=True, send_messages=True, manage_channels=True
+            ),
+        }
@@ -0,0 +1,168 @@
+"""Gravação assíncrona e agrupada do arquivo de configuração"""
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+class ConfigWriter:
+    """Agrupa mutações de configuração em uma única gravação atômica
+
+    Cada `schedule` marca a configuração como suja; depois de `debounce`
+    segundos sem novas gravações em andamento, o estado mais recente é
+    serializado e gravado fora do event loop (arquivo temporário + rename).
+
+    Quando todas as mutações pendentes informam o servidor alterado, só
+    esses servidores são mesclados ao arquivo em disco (sob um lock de
+    arquivo), então vários processos/shards podem compartilhar o mesmo
+    arquivo sem sobrescrever as alterações uns dos outros.
+
+    Se a gravação falhar, o lote volta para a fila (junto do que chegou
+    enquanto isso) e uma nova tentativa é agendada, com espera crescente.
+    """
+
+    def __init__(self, path, debounce=1.0):
+        self.path = path
+        self.debounce = debounce
+        self.pedidos = 0
+        self.gravacoes = 0
+        self.ultima_latencia = 0.0
+        self._pendente = None
+        self._sujos = set()
+        self._completo = False
+        self._tarefa = None
+        self._gravando = 0
+
+    @property
+    def coalescing_ratio(self):
+        """Mutações por gravação efetiva (1.0 = nenhuma agrupada)"""
+        return self.pedidos / self.gravacoes if self.gravacoes else 0.0
+
+    @property
+    def ocupado(self):
+        """Há mutação ainda não gravada (pendente ou gravando): o disco está atrasado"""
+        return self._pendente is not None or self._gravando > 0
+
+    def schedule(self, config, guild_id=None):
+        """Agenda a gravação da configuração (de um servidor, se informado)"""
+        self.pedidos += 1
+        metrics.inc('config_write_requests_total')
+        self._pendente = config
+        if guild_id is None:
+            self._completo = True
+        else:
+            self._sujos.add(str(guild_id))
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush_sync()
+            return
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = loop.create_task(self._gravar_apos_debounce())
+
+    async def flush(self):
+        """Grava imediatamente o que estiver pendente"""
+        while self._pendente is not None:
+            lote = (self._pendente, self._sujos, self._completo)
+            dados, parcial = self._serializar()
+            loop = asyncio.get_running_loop()
+            self._gravando += 1
+            try:
+                latencia = await loop.run_in_executor(
+                    None, self._gravar, dados, parcial
+                )
+            except Exception:
+                self._devolver(*lote)
+                raise
+            finally:
+                self._gravando -= 1
+            self._registrar(latencia)
+
+    def flush_sync(self):
+        """Grava o que estiver pendente de forma síncrona (desligamento)"""
+        if self._pendente is not None:
+            lote = (self._pendente, self._sujos, self._completo)
+            try:
+                self._registrar(self._gravar(*self._serializar()))
+            except Exception:
+                self._devolver(*lote)
+                raise
+
+    async def _gravar_apos_debounce(self, espera=None):
+        espera = espera or self.debounce
+        await asyncio.sleep(espera)
+        try:
+            await self.flush()
+        except Exception:
+            metrics.inc('config_write_errors_total')
+            proxima = min(espera * 2, 60.0)
+            log.exception("Erro ao salvar configuração; nova tentativa em %gs", proxima)
+            loop = asyncio.get_running_loop()
+            self._tarefa = loop.create_task(self._gravar_apos_debounce(proxima))
+
+    def _devolver(self, config, sujos, completo):
+        # Lote que falhou volta para a fila sem apagar o que chegou durante a gravação
+        if self._pendente is None:
+            self._pendente = config
+        self._sujos |= sujos
+        self._completo = self._completo or completo
+
+    def _serializar(self):
+        # Serializa no event loop para ter uma cópia consistente do dicionário
+        config = self._pendente
+        parcial = not self._completo
+        if parcial:
+            config = {g: config[g] for g in self._sujos if g in config}
+        dados = json.dumps(config, indent=4, ensure_ascii=False)
+        self._pendente = None
+        self._sujos = set()
+        self._completo = False
+        return dados, parcial
+
+    def _gravar(self, dados, parcial=False):
+        inicio = time.perf_counter()
+        if not parcial:
+            self._substituir(dados)
+            return time.perf_counter() - inicio
+
+        with open(self.path + ".lock", 'w') as trava:
+            if fcntl is not None:
+                fcntl.flock(trava, fcntl.LOCK_EX)
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    atual = json.load(f)
+            except (FileNotFoundError, ValueError):
+                atual = {}
+            atual.update(json.loads(dados))
+            self._substituir(json.dumps(atual, indent=4, ensure_ascii=False))
+        return time.perf_counter() - inicio
+
+    def _substituir(self, dados):
+        pasta = os.path.dirname(os.path.abspath(self.path))
+        fd, temporario = tempfile.mkstemp(prefix=".config-", suffix=".tmp", dir=pasta)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(dados)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporario, self.path)
+        except BaseException:
+            os.unlink(temporario)
+            raise
+
+    def _registrar(self, latencia):
+        self.ultima_latencia = latencia
+        self.gravacoes += 1
+        metrics.inc('config_writes_total')
+        metrics.observe('config_write_seconds', latencia)
+        metrics.set_gauge('config_write_coalescing_ratio', self.coalescing_ratio)
@@ -0,0 +1,161 @@
+"""Templates de embeds com cache por servidor e anexo GIF em memória"""
+import io
+
+import discord
+
+import metrics
+
+GIF_PATH = "venom_store.gif"
+GIF_URL = "attachment://venom_store.gif"
+
+TEMPLATES = {}
+
+def template(nome):
+    """Registra uma função que monta a base de um embed"""
+    def decorador(func):
+        TEMPLATES[nome] = func
+        return func
+    return decorador
+
+@template('painel')
+def _painel():
+    embed = discord.Embed(
+        title="🎫 Painel de Tickets",
+        description="Escolha o tipo de ticket que você precisa:",
+        color=discord.Color.purple()
+    )
+    embed.add_field(
+        name="❓ Dúvida", value="Tenha uma dúvida? Abra um ticket!", inline=False
+    )
+    embed.add_field(
+        name="👤 Atendimento",
+        value="Precisa de atendimento? Clique aqui!",
+        inline=False
+    )
+    embed.add_field(
+        name="🛠️ Suporte", value="Problemas técnicos? Estamos aqui!", inline=False
+    )
+    embed.add_field(
+        name="⚠️ Reclamação", value="Alguma reclamação? Nos avise!", inline=False
+    )
+    return embed
+
+@template('pedir_uper')
+def _pedir_uper():
+    return discord.Embed(
+        title="UPER",
+        description=(
+            "Confirme os valores de serviço em <#1443037178358665306>\n"
+            "Vou solicitar um UPER, você concorda com nossos termos e condições "
+            "em <#1443036865937674250>\n"
+            "Você receberá entregas em <#1443037457351180430>\n"
+            "As regiões de serviços estão em <#1443037600763088937>"
+        ),
+        color=discord.Color.from_rgb(88, 101, 242)
+    )
+
+@template('ticket_categoria')
+def _ticket_categoria(categoria, emoji):
+    embed = discord.Embed(
+        title=f"{emoji} {categoria}",
+        description=f"Bem-vindo ao seu ticket de {categoria.lower()}!",
+        color=discord.Color.purple()
+    )
+    embed.add_field(name="Usuário", value="-", inline=True)
+    embed.add_field(name="Status", value="🟢 Aberto", inline=True)
+    embed.add_field(
+        name="📝", value="Descreva seu problema ou dúvida abaixo!", inline=False
+    )
+    return embed
+
+@template('ticket_fechado')
+def _ticket_fechado():
+    return discord.Embed(
+        title="🔒 Ticket Fechado",
+        description="Este ticket foi arquivado.",
+        color=discord.Color.red()
+    )
+
+@template('ticket_reaberto')
+def _ticket_reaberto():
+    return discord.Embed(
+        title="🔓 Ticket Reaberto",
+        color=discord.Color.green()
+    )
+
+@template('loja')
+def _loja(cargo, meses, valor):
+    desc = f"**Cargo:** {cargo}\n**Duração:** {meses} mês(es)"
+    if valor:
+        desc += f"\n**Valor:** R$ {valor}"
+    desc += "\n\nClique no botão abaixo para comprar!"
+
+    embed = discord.Embed(
+        title="💳 Loja de Cargos",
+        description=desc,
+        color=discord.Color.purple()
+    )
+    embed.set_image(url=GIF_URL)
+    return embed
+
+@template('pix_pagamento')
+def _pix_pagamento(cargo, meses, valor, pix_key):
+    embed = discord.Embed(
+        title="💳 Pagamento via PIX",
+        description=f"**Cargo:** {cargo}\n**Duração:** {meses} mês(es)",
+        color=discord.Color.purple()
+    )
+    if valor:
+        embed.add_field(name="Valor", value=f"R$ {valor}", inline=False)
+    embed.add_field(name="📲 Chave PIX", value=f"`{pix_key}`", inline=False)
+    return embed
+
+class EmbedCache:
+    """Guarda a base renderizada de cada template por servidor
+
+    A base fica guardada como dicionário e cada `render` devolve um embed
+    novo com os campos copiados, então quem chama pode completar os campos
+    específicos (usuário, id do canal) sem afetar o cache.
+    """
+
+    def __init__(self, max_por_guild=64):
+        self.max_por_guild = max_por_guild
+        self._cache = {}
+
+    def render(self, nome, guild_id=None, **params):
+        guild_cache = self._cache.setdefault(guild_id, {})
+        chave = (nome, tuple(sorted(params.items())))
+        base = guild_cache.get(chave)
+        if base is None:
+            metrics.inc('embed_cache_total', resultado='miss')
+            if len(guild_cache) >= self.max_por_guild:
+                guild_cache.pop(next(iter(guild_cache)))
+            base = guild_cache[chave] = TEMPLATES[nome](**params).to_dict()
+        else:
+            metrics.inc('embed_cache_total', resultado='hit')
+        # Embed.copy compartilha os dicionários dos campos; aqui eles são copiados
+        dados = dict(base)
+        if 'fields' in dados:
+            dados['fields'] = [dict(campo) for campo in dados['fields']]
+        return discord.Embed.from_dict(dados)
+
+    def invalidate(self, guild_id):
+        """Descarta apenas as entradas de um servidor"""
+        self._cache.pop(guild_id, None)
+
+class Anexo:
+    """Arquivo lido do disco uma única vez e reaproveitado em cada envio"""
+
+    def __init__(self, path, filename=None):
+        self.path = path
+        self.filename = filename or path
+        self._dados = None
+
+    def file(self):
+        if self._dados is None:
+            with open(self.path, 'rb') as f:
+                self._dados = f.read()
+        # discord.File é consumido no envio, então cada envio precisa do seu
+        return discord.File(io.BytesIO(self._dados), filename=self.filename)
+
+gif = Anexo(GIF_PATH, filename="venom_store.gif")
@@ -0,0 +1,35 @@
+"""Perfis de execução: intents pedidos ao gateway e caches do discord.py
+
+- padrao: `Intents.default()` + `message_content`, cache de 1000
+  mensagens (o comportamento original).
+- economico: só o que os handlers usam. `guilds` para servidores, canais
+  e cargos (e os eventos `on_guild_role_*` do RoleCache);
+  `guild_messages` para manter o `last_message_id` dos canais, usado pela
+  coleta de tickets parados; `message_content` porque as transcrições
+  leem o histórico dos tickets (sem ele o REST devolve o texto vazio).
+  Sem cache de mensagens, sem cache de membros e sem chunking; os
+  membros necessários são pedidos sob demanda pelo `MemberLoader`.
+"""
+import discord
+
+PADRAO = 'padrao'
+ECONOMICO = 'economico'
+PERFIS = (PADRAO, ECONOMICO)
+
+def opcoes_do_perfil(perfil):
+    """(intents, opções extras do cliente) do perfil"""
+    if perfil == PADRAO:
+        intents = discord.Intents.default()
+        intents.message_content = True
+        return intents, {}
+    if perfil == ECONOMICO:
+        intents = discord.Intents.none()
+        intents.guilds = True
+        intents.guild_messages = True
+        intents.message_content = True
+        return intents, {
+            'max_messages': None,
+            'member_cache_flags': discord.MemberCacheFlags.none(),
+            'chunk_guilds_at_startup': False,
+        }
+    raise ValueError(f"Perfil desconhecido: {perfil} (use {', '.join(PERFIS)})")
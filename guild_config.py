@@ -0,0 +1,232 @@
+"""Configuração dos servidores em memória, com tipos e acesso O(1)
+
+O arquivo JSON continua sendo o formato em disco. Ao carregar, cada
+servidor vira um `GuildConfig` com `__slots__`, chaveado pelo id inteiro,
+com a equipe em um frozenset. Toda alteração passa por
+`GuildConfigStore.update`, que troca o registro, atualiza a cópia JSON do
+servidor e agenda a gravação; assim o cache nunca diverge do disco.
+
+Com vários processos no mesmo arquivo, cada um grava só os servidores que
+alterou e `GuildConfigStore.refresh` traz as alterações dos outros: um
+stat compara mtime, tamanho e inode, e o arquivo só é relido se mudou.
+"""
+import asyncio
+import json
+import logging
+import os
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+RETENCAO_PADRAO_HORAS = 0
+
+def _int_ou_none(valor):
+    try:
+        return int(valor) if valor not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+class GuildConfig:
+    """Configuração de um servidor; não altere os campos diretamente"""
+    __slots__ = ('owner_id', 'pix_key', 'cargo_equipe', 'equipe', 'pool_tamanho',
+                 'inatividade_horas', 'retencao_horas', 'transcrever_antes',
+                 'limite_cliques', 'extras')
+
+    # Valores padrão; campos com o valor padrão não são gravados no arquivo
+    PADRAO = {
+        'owner_id': None,
+        'pix_key': None,
+        'cargo_equipe': None,
+        'equipe': frozenset(),
+        'pool_tamanho': 0,
+        'inatividade_horas': 0,
+        'retencao_horas': RETENCAO_PADRAO_HORAS,
+        'transcrever_antes': True,
+        # Cliques por ação no servidor inteiro a cada 10 s (0 = sem limite)
+        'limite_cliques': 0,
+    }
+
+    def __init__(self, **campos):
+        for nome, padrao in self.PADRAO.items():
+            setattr(self, nome, campos.pop(nome, padrao))
+        # Chaves que o bot não interpreta (ex.: textos do painel) são preservadas
+        self.extras = campos.pop('extras', {})
+        if campos:
+            raise TypeError(f"Campos desconhecidos: {', '.join(campos)}")
+
+    @classmethod
+    def from_dict(cls, dados):
+        """Converte a entrada do JSON, normalizando os tipos"""
+        dados = dict(dados)
+        campos = {
+            'owner_id': _int_ou_none(dados.pop('owner_id', None)),
+            'pix_key': dados.pop('pix_key', None),
+            'cargo_equipe': _int_ou_none(dados.pop('cargo_equipe', None)),
+            'equipe': frozenset(
+                user_id
+                for user_id in map(_int_ou_none, dados.pop('equipe', ()))
+                if user_id is not None
+            ),
+            'pool_tamanho': int(dados.pop('pool_tamanho', 0) or 0),
+            'inatividade_horas': float(dados.pop('inatividade_horas', 0) or 0),
+            'retencao_horas': float(dados.pop('retencao_horas', RETENCAO_PADRAO_HORAS)),
+            'transcrever_antes': bool(dados.pop('transcrever_antes', True)),
+            'limite_cliques': int(dados.pop('limite_cliques', 0) or 0),
+        }
+        return cls(extras=dados, **campos)
+
+    def to_dict(self):
+        dados = dict(self.extras)
+        for nome, padrao in self.PADRAO.items():
+            valor = getattr(self, nome)
+            if valor != padrao:
+                # A ordem da equipe no arquivo não importa; sem ordenar a cada alteração
+                dados[nome] = list(valor) if nome == 'equipe' else valor
+        return dados
+
+    def replace(self, **campos):
+        """Cópia com os campos alterados (o registro original não muda)"""
+        atuais = {nome: getattr(self, nome) for nome in self.PADRAO}
+        atuais.update(campos)
+        if 'equipe' in campos:
+            atuais['equipe'] = frozenset(campos['equipe'])
+        return GuildConfig(extras=dict(self.extras), **atuais)
+
+VAZIA = GuildConfig()
+
+class GuildConfigStore:
+    """Configurações de todos os servidores, gravadas pelo ConfigWriter
+
+    `ao_alterar(guild_id)` é chamado depois de cada alteração (por exemplo,
+    para invalidar embeds renderizados com a configuração antiga).
+    """
+
+    def __init__(self, writer, ao_alterar=None):
+        self.writer = writer
+        self.ao_alterar = ao_alterar
+        self._configs = {}
+        # Espelho JSON (chaves str) entregue ao writer; só o servidor alterado é refeito
+        self._dados = {}
+        self.path = None
+        # (mtime, tamanho, inode) do arquivo na última leitura
+        self._assinatura = None
+
+    def __len__(self):
+        return len(self._configs)
+
+    def __contains__(self, guild_id):
+        return guild_id in self._configs
+
+    def load(self, dados):
+        """Carrega o conteúdo do arquivo ({guild_id: {...}})
+
+        Entradas iguais às já carregadas são ignoradas; devolve os ids dos
+        servidores que mudaram. Servidores ausentes do arquivo são mantidos.
+        """
+        alterados = []
+        for guild_id, entrada in dados.items():
+            if self._dados.get(str(guild_id)) == entrada:
+                continue
+            try:
+                config = GuildConfig.from_dict(entrada)
+            except (AttributeError, TypeError, ValueError):
+                log.exception("Erro ao carregar configuração do servidor %s", guild_id)
+                continue
+            self._configs[int(guild_id)] = config
+            self._dados[str(guild_id)] = entrada
+            alterados.append(int(guild_id))
+        metrics.set_gauge('guild_configs', len(self._configs))
+        return alterados
+
+    async def load_file(self, path):
+        """Lê o arquivo fora do event loop e carrega; arquivo ausente = vazio"""
+        loop = asyncio.get_running_loop()
+        self.path = path
+        self._assinatura, dados = await loop.run_in_executor(None, _ler, path)
+        self.load(dados)
+
+    async def refresh(self):
+        """Traz as alterações que outros processos gravaram no arquivo
+
+        Só relê o arquivo se o stat mudou. Com gravação local pendente ou em
+        andamento não recarrega (o disco ainda não tem o que está em
+        memória); a próxima chamada tenta de novo. Devolve quantos
+        servidores mudaram, já avisados por `ao_alterar`.
+        """
+        if self.path is None or self.writer.ocupado:
+            return 0
+        loop = asyncio.get_running_loop()
+        if await loop.run_in_executor(None, _assinatura, self.path) == self._assinatura:
+            return 0
+        assinatura, dados = await loop.run_in_executor(None, _ler, self.path)
+        if self.writer.ocupado:
+            return 0  # Alterado localmente durante a leitura
+        self._assinatura = assinatura
+        alterados = self.load(dados)
+        if alterados:
+            metrics.inc('guild_config_reloads_total')
+            log.info(
+                "Configuração recarregada do disco: %s servidor(es) alterado(s)",
+                len(alterados)
+            )
+        if self.ao_alterar is not None:
+            for guild_id in alterados:
+                self.ao_alterar(guild_id)
+        return len(alterados)
+
+    def get(self, guild_id):
+        """Configuração do servidor (a vazia, compartilhada, se não houver)"""
+        return self._configs.get(guild_id, VAZIA)
+
+    def items(self):
+        return list(self._configs.items())
+
+    def update(self, guild_id, **campos):
+        """Altera campos do servidor, agenda a gravação e devolve o registro novo"""
+        config = self.get(guild_id).replace(**campos)
+        self._configs[guild_id] = config
+        self._dados[str(guild_id)] = config.to_dict()
+        metrics.set_gauge('guild_configs', len(self._configs))
+        self.writer.schedule(self._dados, guild_id)
+        if self.ao_alterar is not None:
+            self.ao_alterar(guild_id)
+        return config
+
+    def add_staff(self, guild_id, user_id):
+        """Adiciona à equipe; False se o usuário já estava nela
+
+        O(N) no tamanho da equipe: o registro ganha um frozenset novo, e quem
+        guardou o anterior (ex.: durante um await) continua com uma cópia estável.
+        """
+        equipe = self.get(guild_id).equipe
+        if user_id in equipe:
+            return False
+        self.update(guild_id, equipe=equipe | {user_id})
+        return True
+
+    def remove_staff(self, guild_id, user_id):
+        """Remove da equipe; False se o usuário não estava nela"""
+        equipe = self.get(guild_id).equipe
+        if user_id not in equipe:
+            return False
+        self.update(guild_id, equipe=equipe - {user_id})
+        return True
+
+def _assinatura(path, stat=os.stat):
+    try:
+        info = stat(path)
+    except FileNotFoundError:
+        return None
+    return info.st_mtime_ns, info.st_size, info.st_ino
+
+def _ler(path):
+    """(assinatura, conteúdo) do arquivo; a assinatura é a do arquivo aberto"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return _assinatura(f.fileno(), os.fstat), json.load(f)
+    except FileNotFoundError:
+        return None, {}
+    except (OSError, ValueError):
+        log.exception("Erro ao ler configuração")
+        return None, {}
@@ -0,0 +1,105 @@
+"""Limite de cliques repetidos nos botões de ticket e de pagamento
+
+Cada clique consome um token do bucket do usuário naquela ação no
+servidor e, se o servidor configurou um limite, do bucket da ação no
+servidor inteiro (para muitos usuários ao mesmo tempo; o do botão de
+compra é separado por oferta, então um lançamento concorrido não trava as
+outras). Sem token, a interação é recusada antes de qualquer I/O, e o
+spam nunca chega ao RestScheduler nem ao orçamento REST do bot.
+
+Os buckets ficam em um único dicionário de tuplas (tokens, instante). Um
+bucket cheio é igual a um ausente, então a varredura periódica apaga os
+que já se recompuseram e a memória acompanha só quem clicou há pouco.
+"""
+import time
+
+import metrics
+
+# (cliques, janela em segundos) por ação (prefixo do custom_id)
+LIMITES = {
+    'comprar': (2, 30.0),
+    'btn_ja_comprei': (2, 60.0),
+    'btn_copiar_pix': (5, 30.0),
+    'btn_fechar_ticket': (3, 30.0),
+}
+LIMITE_PADRAO = (3, 30.0)
+# Janela do limite por servidor (os cliques vêm da configuração do servidor)
+JANELA_SERVIDOR = 10.0
+VARREDURA = 60.0
+
+class InteractionThrottle:
+    """Token buckets por (ação, servidor, usuário) e por (ação, servidor, alvo)
+
+    `limite_servidor(guild_id)` devolve o (cliques, janela) do servidor, ou
+    None para não limitar o servidor inteiro (o padrão).
+    """
+
+    def __init__(self, limites=None, limite_servidor=None, varredura=VARREDURA):
+        self.limites = dict(LIMITES, **(limites or {}))
+        self.limite_servidor = limite_servidor or (lambda _guild_id: None)
+        self.varredura = varredura
+        # (acao, guild_id, user_id) ou (acao, guild_id, None, alvo)
+        #   -> (tokens, instante)
+        self._buckets = {}
+        self._proxima_varredura = time.monotonic() + varredura
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def _limite(self, chave):
+        if chave[2] is None:
+            return self.limite_servidor(chave[1])
+        return self.limites.get(chave[0], LIMITE_PADRAO)
+
+    def _tokens(self, chave, limite, agora):
+        capacidade, janela = limite
+        estado = self._buckets.get(chave)
+        if estado is None:
+            return float(capacidade)
+        tokens, instante = estado
+        return min(capacidade, tokens + (agora - instante) * capacidade / janela)
+
+    def check(self, acao, guild_id, user_id, alvo=None):
+        """Consome um clique; devolve 0 se liberado ou os segundos até o próximo
+
+        `alvo` (ex.: a oferta do botão de compra) separa o bucket do servidor.
+        """
+        agora = time.monotonic()
+        if agora >= self._proxima_varredura:
+            self.evict(agora)
+        espera = 0.0
+        saldos = []
+        escopos = (
+            ('usuario', (acao, guild_id, user_id)),
+            ('servidor', (acao, guild_id, None, alvo)),
+        )
+        for escopo, chave in escopos:
+            limite = self._limite(chave)
+            if not limite:
+                continue
+            tokens = self._tokens(chave, limite, agora)
+            if tokens < 1:
+                capacidade, janela = limite
+                espera = (1 - tokens) * janela / capacidade
+                metrics.inc('throttle_rejected_total', acao=acao, escopo=escopo)
+                break
+            saldos.append((chave, tokens))
+        else:
+            # Só consome quando os dois buckets liberam
+            for chave, tokens in saldos:
+                self._buckets[chave] = (tokens - 1, agora)
+        return espera
+
+    def evict(self, agora=None):
+        """Apaga os buckets já recompostos (ou cujo limite foi desligado)"""
+        agora = time.monotonic() if agora is None else agora
+        cheios = [chave for chave in self._buckets if self._cheio(chave, agora)]
+        for chave in cheios:
+            del self._buckets[chave]
+        self._proxima_varredura = agora + self.varredura
+        metrics.set_gauge('throttle_buckets', len(self._buckets))
+        return len(cheios)
+
+    def _cheio(self, chave, agora):
+        limite = self._limite(chave)
+        return not limite or self._tokens(chave, limite, agora) >= limite[0]
@@ -1,11 +1,42 @@
-from flask import Flask,render_template
-from threading import Thread
-app = Flask(__name__)
-@app.route('/')
-def index():
-    return "Alive"
-def run():
-  app.run(host='0.0.0.0',port=8080)
-def keep_alive():  
-    t = Thread(target=run)
-    t.start()
\ No newline at end of file
+"""Servidor web de keep-alive, métricas e saúde no event loop do bot
+
+Usa o aiohttp que o discord.py já carrega, então não abre uma thread nem
+um segundo servidor: as rotas rodam no mesmo loop e leem as métricas do
+processo diretamente.
+"""
+import json
+
+from aiohttp import web
+
+import metrics
+
+async def index(_request):
+    return web.Response(text="Alive")
+
+async def prometheus(_request):
+    return web.Response(
+        text=metrics.render_prometheus(), content_type='text/plain', charset='utf-8'
+    )
+
+async def health(request):
+    saude = request.app['saude']
+    dados = saude() if saude else {'status': 'ok'}
+    return web.json_response(
+        dados, status=200 if dados.get('status') == 'ok' else 503,
+        dumps=lambda d: json.dumps(d, ensure_ascii=False)
+    )
+
+async def keep_alive(funcao_saude=None, host='0.0.0.0', port=8080):
+    """Sobe o servidor no loop atual e devolve o runner (para `cleanup`)
+
+    `funcao_saude` devolve o dicionário do /health.
+    """
+    app = web.Application()
+    app['saude'] = funcao_saude
+    app.router.add_get('/', index)
+    app.router.add_get('/metrics', prometheus)
+    app.router.add_get('/health', health)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
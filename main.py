@@ -1,52 +1,785 @@
+import asyncio
+import logging
+import math
 import os
+import time
+from datetime import datetime
+
 import discord
-from discord.ext import commands, tasks
 from discord import app_commands
-from datetime import datetime, timedelta
+from discord.ext import commands, tasks
+
+import metrics
+import structured_log
+from channel_pool import ChannelPool
+from config_writer import ConfigWriter
+from embeds import GIF_URL, EmbedCache, gif
+from gateway_profile import opcoes_do_perfil
+from guild_config import GuildConfigStore
+from interaction_throttle import JANELA_SERVIDOR, InteractionThrottle
 from keep_alive import keep_alive
-keep_alive()
-import json
-import asyncio
+from member_loader import MemberLoader
+from payment_queue import PaymentQueue
+from resolver import UserResolver
+from rest_scheduler import (
+    INTERACAO,
+    NORMAL,
+    SEGUNDO_PLANO,
+    Descartado,
+    RestScheduler,
+    parse_limites,
+)
+from role_cache import RoleCache
+from role_expiry import RoleExpiry
+from single_flight import SingleFlight
+from state_backend import criar_backend
+from ticket_journal import TicketJournal
+from ticket_reaper import APAGAR, INATIVO, Politica, TicketReaper, decidir
+from ticket_stats import TicketStats
+from ticket_store import ABERTO, FECHADO, TicketStore
+from transcripts import TranscriptExporter
+
+CONFIG_FILE = "painel_config.json"
+TICKETS_DB = os.getenv('TICKETS_DB', 'tickets.db')
+BOT_STATE = os.getenv('BOT_STATE', 'sqlite')
+BOT_SHARD_COUNT = os.getenv('BOT_SHARD_COUNT')
+BOT_SHARD_IDS = os.getenv('BOT_SHARD_IDS')
+BOT_PERFIL = os.getenv('BOT_PERFIL', 'padrao')
+CONFIG_DEBOUNCE = float(os.getenv('CONFIG_DEBOUNCE', '1.0'))
+CONFIG_RECARGA_SEGUNDOS = float(os.getenv('CONFIG_RECARGA_SEGUNDOS', '5'))
+POOL_REFILL_SEGUNDOS = float(os.getenv('POOL_REFILL_SEGUNDOS', '30'))
+POOL_REFILL_POR_CICLO = int(os.getenv('POOL_REFILL_POR_CICLO', '2'))
+WEB_PORT = int(os.getenv('PORT', '8080'))
+TRANSCRIPTS_DIR = os.getenv('TRANSCRIPTS_DIR', 'transcripts')
+EXPIRACAO_SEGUNDOS = float(os.getenv('EXPIRACAO_SEGUNDOS', '30'))
+EXPIRACAO_LOTE = int(os.getenv('EXPIRACAO_LOTE', '100'))
+RESUMO_PAGAMENTOS_SEGUNDOS = float(os.getenv('RESUMO_PAGAMENTOS_SEGUNDOS', '20'))
+DECISOES_SEGUNDOS = float(os.getenv('DECISOES_SEGUNDOS', '2'))
+COLETA_SEGUNDOS = float(os.getenv('COLETA_SEGUNDOS', '60'))
+COLETA_LOTE = int(os.getenv('COLETA_LOTE', '50'))
+LOG_NIVEL = os.getenv('LOG_NIVEL', 'INFO')
+RESERVA_SEGUNDOS = float(os.getenv('RESERVA_SEGUNDOS', '300'))
+# Orçamentos consultivos do agendador REST
+# (ex.: "member.add_roles=10/10,channel.send=5/5")
+REST_LIMITES = parse_limites(os.getenv('REST_LIMITES', ''))
+LAG_INTERVALO = 0.5
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
 
-intents = discord.Intents.default()
-intents.message_content = True
-bot = commands.Bot(command_prefix="/", intents=intents)
+log = logging.getLogger(__name__)
+
+def parse_shard_ids(texto):
+    """Converte '0-3,8' em [0, 1, 2, 3, 8]"""
+    ids = []
+    for parte in texto.split(','):
+        inicio, _, fim = parte.strip().partition('-')
+        ids.extend(range(int(inicio), int(fim or inicio) + 1))
+    return ids
+
+def criar_bot(intents, **opcoes):
+    """Cria o bot; com BOT_SHARD_COUNT/BOT_SHARD_IDS usa AutoShardedBot
+
+    BOT_SHARD_COUNT=auto deixa o Discord escolher o número de shards.
+    Para vários processos, cada um recebe o total em BOT_SHARD_COUNT e
+    sua faixa em BOT_SHARD_IDS (ex.: 0-3), compartilhando o estado pelo
+    backend SQLite. `opcoes` (caches do discord.py) vêm do perfil.
+    """
+    if not BOT_SHARD_COUNT and not BOT_SHARD_IDS:
+        return commands.Bot(command_prefix="/", intents=intents, **opcoes)
+    shard_count = None
+    if BOT_SHARD_COUNT not in (None, '', 'auto'):
+        shard_count = int(BOT_SHARD_COUNT)
+    shard_ids = parse_shard_ids(BOT_SHARD_IDS) if BOT_SHARD_IDS else None
+    return commands.AutoShardedBot(
+        command_prefix="/", intents=intents,
+        shard_count=shard_count, shard_ids=shard_ids, **opcoes
+    )
+
+# BOT_PERFIL=economico pede ao gateway só os intents usados e desliga os caches
+# de mensagens e membros
+intents, opcoes_cliente = opcoes_do_perfil(BOT_PERFIL)
+bot = criar_bot(intents, **opcoes_cliente)
 
 # Dicionários para armazenar dados
-tickets = {}
-painel_config = {}
-ticket_counter = 0
-pagamentos_pendentes = {}
+journal = TicketJournal(TICKETS_DB)
+state = criar_backend(BOT_STATE, TICKETS_DB)
+config_writer = ConfigWriter(CONFIG_FILE, debounce=CONFIG_DEBOUNCE)
+rest = RestScheduler(limites=REST_LIMITES)
+channel_pool = ChannelPool(rest, refill_por_ciclo=POOL_REFILL_POR_CICLO)
+resolver = UserResolver(bot)
+embeds = EmbedCache()
+transcricoes = TranscriptExporter(rest, TRANSCRIPTS_DIR)
+carregador_membros = MemberLoader()
+limitador = InteractionThrottle(
+    limite_servidor=lambda guild_id: limite_cliques_servidor(guild_id)
+)
+tickets = TicketStore(journal)
+estatisticas = TicketStats(journal)
+expiracoes = RoleExpiry(journal)
+cargos = RoleCache(rest)
+coletor = TicketReaper(journal)
+painel_config = GuildConfigStore(
+    config_writer, ao_alterar=lambda guild_id: config_alterada(guild_id)
+)
+pagamentos_pendentes = PaymentQueue(journal)
+ofertas = {}
+aberturas = SingleFlight()
+INICIO = time.monotonic()
+servidor_web = None
+tarefas_interacao = {}
+contadores_semeados = set()
 
-CONFIG_FILE = "painel_config.json"
+def config_alterada(guild_id):
+    """Descarta o que foi renderizado com a configuração antiga do servidor"""
+    embeds.invalidate(int(guild_id))
+
+async def proximo_numero_ticket(guild_id):
+    """Aloca atomicamente o próximo número de ticket do servidor"""
+    chave = f"ticket_counter:{guild_id}"
+    if guild_id not in contadores_semeados:
+        # Sem contador no backend (ex.: em memória, após um restart), continua do
+        # maior número gravado no journal; tickets sem número (anteriores a ele)
+        # entram pela contagem para não repetir nomes
+        ultimo = await journal.last_ticket_number(guild_id)
+        await state.claim(chave, max(ultimo, tickets.count(guild_id=guild_id)))
+        contadores_semeados.add(guild_id)
+    return await state.incr(chave)
+
+def chave_aberto(guild_id, user_id):
+    return f"aberto:{guild_id}:{user_id}"
+
+def reserva_abandonada(valor, agora):
+    """Se a reserva gravada não corresponde a nenhuma criação em andamento
+
+    Só é chamada quando o usuário não tem ticket aberto neste processo
+    (o único que atende o servidor). Um marcador de criação vale por
+    RESERVA_SEGUNDOS; depois disso o processo que o gravou caiu antes de
+    registrar o canal. Um id de canal sem ticket aberto (ou o '0' do
+    formato antigo) também não segura mais nada.
+    """
+    prefixo, _, instante = valor.partition(':')
+    if prefixo != 'reservando':
+        return True
+    try:
+        return agora - float(instante) > RESERVA_SEGUNDOS
+    except ValueError:
+        return True
+
+async def reservar_ticket(guild_id, user_id):
+    """Reserva o ticket aberto do usuário no servidor, consistente entre shards
+
+    Enquanto o canal é criado a reserva guarda `reservando:<timestamp>`;
+    `registrar_ticket` troca pelo id do canal. Reservas abandonadas são
+    retomadas em vez de bloquear o usuário para sempre.
+    """
+    if tickets.has_open(guild_id, user_id):
+        return False
+    chave = chave_aberto(guild_id, user_id)
+    agora = time.time()
+    marcador = f"reservando:{agora:.0f}"
+    if await state.claim(chave, marcador):
+        return True
+    atual = await state.get(chave)
+    if atual is not None:
+        if not reserva_abandonada(atual, agora):
+            return False
+        await state.release(chave, atual)
+        metrics.inc('ticket_reservations_recovered_total')
+    return await state.claim(chave, marcador)
+
+async def liberar_reserva(guild_id, user_id):
+    await state.release(chave_aberto(guild_id, user_id))
+
+async def registrar_ticket(channel_id, ticket):
+    """Guarda um ticket novo e vincula a reserva ao canal criado"""
+    tickets.add(channel_id, ticket)
+    estatisticas.opened(ticket['guild_id'])
+    agendar_coleta(channel_id, ticket, INATIVO, time.time())
+    await state.set(chave_aberto(ticket['guild_id'], ticket['user_id']), channel_id)
+
+async def abrir_ticket(guild, user, prefixo, topico, dados, boas_vindas):
+    """Abre o ticket do usuário; cliques simultâneos reaproveitam a mesma criação
+
+    Retorna (canal, compartilhado). O canal é None se o usuário já tinha um
+    ticket aberto.
+    """
+    return await aberturas.run(
+        (guild.id, user.id),
+        lambda: _criar_ticket(guild, user, prefixo, topico, dados, boas_vindas)
+    )
+
+async def _criar_ticket(guild, user, prefixo, topico, dados, boas_vindas):
+    if not await reservar_ticket(guild.id, user.id):
+        return None
+    
+    try:
+        numero = await proximo_numero_ticket(guild.id)
+        channel = await criar_canal_ticket(guild, user, f"{prefixo}-{numero}", topico)
+        
+        # Armazenar informações do ticket
+        ticket = {
+            'guild_id': guild.id,
+            'user_id': user.id,
+            'user_name': user.name,
+            'status': ABERTO,
+            'criado_em': str(datetime.now()),
+            'numero': numero
+        }
+        ticket.update(dados)
+        await registrar_ticket(channel.id, ticket)
+    except Exception:
+        await liberar_reserva(guild.id, user.id)
+        raise
+    
+    await boas_vindas(channel)
+    return channel
 
-def load_config():
-    """Carrega configurações de painéis salvas"""
-    if os.path.exists(CONFIG_FILE):
+async def reconhecer(interaction, operacao, trabalho, erro="❌ Erro ao processar"):
+    """Reconhece a interação na hora e conclui o trabalho em segundo plano
+
+    O defer acontece antes de qualquer chamada lenta, então a janela de 3s
+    do Discord nunca expira. `trabalho()` devolve o texto (ou os argumentos
+    de `followup.send`) entregue ao usuário quando terminar. A tarefa fica
+    em `tarefas_interacao` até concluir.
+    """
+    inicio = time.perf_counter()
+    try:
+        await interaction.response.defer(ephemeral=True, thinking=True)
+    except discord.HTTPException:
+        log.exception("Erro ao reconhecer interação (%s)", operacao)
+        metrics.inc('interaction_total', operacao=operacao, resultado='ack_falhou')
+        return None
+    metrics.observe('interaction_ack_seconds', time.perf_counter() - inicio,
+                    operacao=operacao)
+    
+    tarefa = asyncio.ensure_future(
+        _concluir(interaction, operacao, trabalho, erro, inicio)
+    )
+    tarefas_interacao[interaction.id] = tarefa
+    tarefa.add_done_callback(lambda _: tarefas_interacao.pop(interaction.id, None))
+    return tarefa
+
+async def _concluir(interaction, operacao, trabalho, erro, inicio):
+    resultado = 'ok'
+    try:
+        resposta = await trabalho()
+    except Exception as e:
+        log.exception("%s (%s)", erro, operacao)
+        resultado = 'erro'
+        resposta = f"{erro}: {str(e)}"
+    
+    if resposta is not None:
+        if isinstance(resposta, str):
+            resposta = {'content': resposta}
         try:
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
+            await interaction.followup.send(ephemeral=True, **resposta)
+        except Exception:
+            log.exception("Erro ao responder interação (%s)", operacao)
+            resultado = 'erro'
+    
+    metrics.observe('interaction_completion_seconds', time.perf_counter() - inicio,
+                    operacao=operacao)
+    metrics.inc('interaction_total', operacao=operacao, resultado=resultado)
+
+def limite_cliques_servidor(guild_id):
+    """(cliques, janela) do servidor inteiro, ou None se ele não configurou"""
+    cliques = painel_config.get(guild_id).limite_cliques
+    return (cliques, JANELA_SERVIDOR) if cliques else None
+
+async def dentro_do_limite(interaction):
+    """`interaction_check` dos botões públicos: recusa cliques em excesso
+
+    Roda antes do callback e de qualquer I/O; o aviso de espera é a
+    própria resposta da interação, que não conta no rate limit do bot.
+    O que vem depois de ':' no custom_id (a oferta, no botão de compra)
+    separa o limite do servidor.
+    """
+    acao, _, alvo = interaction.data.get('custom_id', '').partition(':')
+    espera = limitador.check(
+        acao, interaction.guild_id, interaction.user.id, alvo or None
+    )
+    if not espera:
+        return True
+    try:
+        await interaction.response.send_message(
+            f"⏳ Muitos cliques! Tente de novo em {math.ceil(espera)}s.", ephemeral=True
+        )
+    except discord.HTTPException:
+        log.exception("Erro ao responder limite de cliques")
+    return False
+
+def tempo_aberto(ticket):
+    """Segundos desde a criação do ticket (None se a data não for legível)"""
+    try:
+        criado_em = datetime.fromisoformat(ticket['criado_em'])
+        return (datetime.now() - criado_em).total_seconds()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+async def marcar_fechado(channel_id):
+    ticket = tickets.get(channel_id)
+    mudou = ticket is not None and ticket.get('status') != FECHADO
+    if mudou:
+        ticket['fechado_em'] = str(datetime.now())
+    ticket = tickets.set_status(channel_id, FECHADO)
+    if ticket is not None:
+        if mudou:
+            estatisticas.closed(ticket.get('guild_id'), tempo_aberto(ticket))
+            agendar_coleta(channel_id, ticket, APAGAR, time.time())
+        chave = chave_aberto(ticket.get('guild_id'), ticket.get('user_id'))
+        await state.release(chave, channel_id)
+    return ticket
+
+async def marcar_aberto(channel_id):
+    ticket = tickets.get(channel_id)
+    mudou = ticket is not None and ticket.get('status') != ABERTO
+    if mudou:
+        # A transcrição do fechamento anterior não cobre o que vier agora
+        ticket.pop('transcricao', None)
+    ticket = tickets.set_status(channel_id, ABERTO)
+    if ticket is not None:
+        if mudou:
+            estatisticas.reopened(ticket.get('guild_id'))
+            agendar_coleta(channel_id, ticket, INATIVO, time.time())
+        chave = chave_aberto(ticket.get('guild_id'), ticket.get('user_id'))
+        await state.set(chave, channel_id)
+    return ticket
+
+async def esquecer_canal(channel_id):
+    """Limpa o ticket de um canal que não existe mais
+
+    Um ticket aberto conta como fechado e libera a reserva do usuário, que
+    pode abrir outro; o prazo de coleta do canal é descartado.
+    """
+    if await tickets.fetch(channel_id) is not None:
+        await marcar_fechado(channel_id)
+        tickets.remove(channel_id)
+    coletor.cancel(channel_id)
+
+async def reconciliar_tickets():
+    """Esquece os tickets abertos cujo canal sumiu enquanto o bot estava fora"""
+    for channel_id, ticket in list(tickets.items()):
+        if ticket.get('status') != ABERTO:
+            continue
+        guild = bot.get_guild(ticket.get('guild_id'))
+        if guild is None or guild.unavailable:
+            continue
+        if guild.get_channel(channel_id) is not None:
+            continue
+        await esquecer_canal(channel_id)
+        metrics.inc('tickets_reconciled_total')
+
+def timestamp_de(texto):
+    """Timestamp de uma data guardada no ticket (str(datetime)), ou None"""
+    try:
+        return datetime.fromisoformat(texto).timestamp()
+    except (TypeError, ValueError):
+        return None
 
-def save_config(config):
-    """Salva configurações de painéis"""
-    with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-        json.dump(config, f, indent=4, ensure_ascii=False)
+def politica_coleta(guild_id):
+    return Politica.from_config(painel_config.get(guild_id))
+
+def agendar_coleta(channel_id, ticket, tipo, referencia):
+    """Grava o prazo de inatividade (aberto) ou de retenção (fechado) do ticket"""
+    guild_id = ticket.get('guild_id')
+    prazo = politica_coleta(guild_id).deadline(tipo, referencia)
+    coletor.schedule(channel_id, guild_id, tipo, prazo)
+
+def ultima_atividade(channel, ticket):
+    """Última mensagem do canal (id vindo do gateway) ou a abertura do ticket"""
+    momentos = [timestamp_de(ticket.get('criado_em'))]
+    if channel.last_message_id:
+        momentos.append(
+            discord.utils.snowflake_time(channel.last_message_id).timestamp()
+        )
+    validos = [momento for momento in momentos if momento is not None]
+    return max(validos, default=time.time())
+
+@tasks.loop(minutes=1)
+async def salvar_estatisticas():
+    """Grava as estatísticas dos servidores alterados"""
+    estatisticas.flush()
+
+@tasks.loop(seconds=EXPIRACAO_SEGUNDOS)
+async def expirar_cargos():
+    """Remove os cargos comprados que venceram, em lotes limitados"""
+    vencidos = await expiracoes.due(time.time(), EXPIRACAO_LOTE)
+    if vencidos:
+        await asyncio.gather(*(revogar_cargo(*item) for item in vencidos))
+
+@expirar_cargos.before_loop
+async def antes_expirar_cargos():
+    await bot.wait_until_ready()
+
+async def revogar_cargo(expira_em, guild_id, user_id, role_id):
+    guild = bot.get_guild(guild_id)
+    if guild is None:
+        # Os shards deste processo ainda não receberam o servidor: tenta mais tarde
+        await expiracoes.retry(guild_id, user_id, role_id)
+        return
+    role = guild.get_role(role_id)
+    try:
+        if role is not None:
+            member = guild.get_member(user_id)
+            if member is None:
+                member = await rest.run(
+                    'member.fetch', guild.id,
+                    lambda: guild.fetch_member(user_id), SEGUNDO_PLANO
+                )
+            if role in member.roles:
+                await rest.run(
+                    'member.remove_roles', guild.id,
+                    lambda: member.remove_roles(role, reason="Assinatura expirada"),
+                    SEGUNDO_PLANO
+                )
+    except discord.NotFound:
+        pass  # Membro saiu do servidor: não há o que remover
+    except (discord.HTTPException, Descartado):
+        log.exception("Erro ao remover cargo expirado")
+        await expiracoes.retry(guild_id, user_id, role_id)
+        return
+    expiracoes.done(expira_em, guild_id, user_id, role_id)
+
+@tasks.loop(seconds=RESUMO_PAGAMENTOS_SEGUNDOS)
+async def atualizar_resumos():
+    """Reedita o resumo de pagamentos dos servidores cuja fila mudou"""
+    for guild_id in pagamentos_pendentes.dirty():
+        try:
+            await atualizar_resumo(guild_id)
+        except Exception:
+            log.exception("Erro ao atualizar resumo de pagamentos")
+            pagamentos_pendentes.mark_dirty(guild_id)
+
+@atualizar_resumos.before_loop
+async def antes_atualizar_resumos():
+    await bot.wait_until_ready()
+
+@tasks.loop(seconds=DECISOES_SEGUNDOS)
+async def aplicar_decisoes():
+    """Aplica as decisões do resumo que chegaram (por DM) a outro processo"""
+    shard_ids = getattr(bot, 'shard_ids', None)
+    for guild_id, decisao in await journal.take_decisions(bot.shard_count, shard_ids):
+        acao = decisao.pop('acao')
+        try:
+            texto = await decidir_pagamentos(guild_id, acao, **decisao)
+        except Exception:
+            log.exception("Erro ao aplicar decisão encaminhada",
+                          extra={'guild_id': guild_id})
+            continue
+        log.info("Decisão encaminhada aplicada: %s", texto,
+                 extra={'guild_id': guild_id})
+
+@aplicar_decisoes.before_loop
+async def antes_aplicar_decisoes():
+    await bot.wait_until_ready()
+
+@tasks.loop(seconds=COLETA_SEGUNDOS)
+async def coletar_tickets():
+    """Fecha tickets parados e apaga canais de tickets fechados, em lotes"""
+    await painel_config.refresh()
+    agora = time.time()
+    shard_ids = getattr(bot, 'shard_ids', None)
+    vencidos = await coletor.due(agora, COLETA_LOTE, bot.shard_count, shard_ids)
+    if vencidos:
+        await asyncio.gather(*(
+            coletar_ticket(channel_id, guild_id, tipo, agora)
+            for channel_id, guild_id, tipo, _ in vencidos
+        ))
+
+@coletar_tickets.before_loop
+async def antes_coletar_tickets():
+    await bot.wait_until_ready()
+
+async def coletar_ticket(channel_id, guild_id, tipo, agora):
+    guild = bot.get_guild(guild_id)
+    if guild is not None and guild.unavailable:
+        # Servidor fora do ar: os canais não aparecem, mas continuam existindo
+        coletor.retry(channel_id, guild_id, tipo, agora)
+        return
+    channel = guild.get_channel(channel_id) if guild is not None else None
+    ticket = await tickets.fetch(channel_id)
+    if channel is None:
+        # Canal apagado à mão (ou servidor que o bot deixou): só limpa o registro
+        if guild is not None:
+            await esquecer_canal(channel_id)
+        else:
+            coletor.cancel(channel_id)
+        metrics.inc('ticket_reaper_total', acao='sem_canal', resultado='ok')
+        return
+    
+    if ticket is None:
+        referencia = agora
+    elif tipo == INATIVO:
+        referencia = ultima_atividade(channel, ticket)
+    else:
+        referencia = (timestamp_de(ticket.get('fechado_em'))
+                      or ultima_atividade(channel, ticket))
+    politica = politica_coleta(guild_id)
+    acao, novo_prazo = decidir(
+        tipo, ticket, politica, coletor.reference(referencia), agora
+    )
+    
+    try:
+        if acao == 'descartar':
+            coletor.cancel(channel_id)
+        elif acao == 'adiar':
+            coletor.schedule(channel_id, guild_id, tipo, novo_prazo)
+        elif acao == 'fechar':
+            await rest.run(
+                'channel.send', channel.id,
+                lambda: channel.send(
+                    "⏰ Ticket fechado automaticamente por inatividade."
+                ),
+                SEGUNDO_PLANO
+            )
+            await fechar_canal(channel, SEGUNDO_PLANO)
+        elif not await apagar_canal(channel, politica):
+            coletor.retry(channel_id, guild_id, tipo, agora)
+            return
+    except (discord.HTTPException, Descartado):
+        log.exception("Erro ao coletar ticket %s", channel_id)
+        if acao == 'fechar' and tickets.get(channel_id, {}).get('status') == FECHADO:
+            return  # Já fechado e com prazo de retenção gravado; só o aviso falhou
+        coletor.retry(channel_id, guild_id, tipo, agora)
+        return
+    metrics.inc('ticket_reaper_total', acao=acao, resultado='ok')
+
+async def apagar_canal(channel, politica):
+    """Apaga o canal de um ticket fechado (depois da transcrição, se a política pedir)
+
+    A transcrição feita ao fechar é reaproveitada; só exporta de novo se ela
+    não existir (falhou, ou o ticket é anterior a este registro).
+    """
+    ticket = tickets.get(channel.id) or {}
+    transcrever = politica.transcrever and not ticket.get('transcricao')
+    if transcrever and await transcricoes.schedule(channel) is None:
+        return False  # Sem a transcrição o canal fica para a próxima tentativa
+    await rest.run(
+        'channel.delete', channel.guild.id,
+        lambda: channel.delete(reason="Ticket fechado: retenção vencida"),
+        SEGUNDO_PLANO
+    )
+    tickets.remove(channel.id)
+    coletor.cancel(channel.id)
+    return True
+
+@tasks.loop(seconds=CONFIG_RECARGA_SEGUNDOS)
+async def recarregar_config():
+    """Traz as alterações de configuração gravadas por outros processos/shards"""
+    await painel_config.refresh()
+
+@tasks.loop(minutes=10)
+async def compactar_journal():
+    """Compacta periodicamente o log de tickets no snapshot"""
+    await journal.checkpoint()
+
+@tasks.loop(seconds=POOL_REFILL_SEGUNDOS)
+async def reabastecer_pools():
+    """Repõe os canais pré-criados dos servidores com pool ativo"""
+    for guild_id, config in painel_config.items():
+        tamanho = config.pool_tamanho
+        guild = bot.get_guild(guild_id)
+        if not tamanho or guild is None:
+            continue
+        try:
+            await channel_pool.refill(guild, tamanho)
+        except Exception:
+            log.exception("Erro ao reabastecer pool")
+
+@reabastecer_pools.before_loop
+async def antes_reabastecer_pools():
+    await bot.wait_until_ready()
+
+@tasks.loop(seconds=15)
+async def medir_gateway():
+    """Publica a latência do gateway (por shard, quando houver vários)"""
+    for shard_id, latencia in getattr(bot, 'latencies', [(None, bot.latency)]):
+        if not math.isnan(latencia) and not math.isinf(latencia):
+            metrics.set_gauge('discord_gateway_latency_seconds', latencia,
+                              shard=shard_id or 0)
+
+@medir_gateway.before_loop
+async def antes_medir_gateway():
+    await bot.wait_until_ready()
+
+@tasks.loop()
+async def medir_loop():
+    """Mede o atraso do event loop: quanto um sleep curto demora além do pedido"""
+    inicio = time.perf_counter()
+    await asyncio.sleep(LAG_INTERVALO)
+    atraso = max(0.0, time.perf_counter() - inicio - LAG_INTERVALO)
+    metrics.set_gauge('event_loop_lag_last_seconds', atraso)
+    metrics.observe('event_loop_lag_seconds', atraso, buckets=LAG_BUCKETS)
+
+@metrics.collector
+def metricas_tickets():
+    """Tickets por servidor e status, lidos dos índices do TicketStore"""
+    for guild_id, status, quantidade in tickets.counts_by_guild():
+        yield 'tickets', quantidade, {'guild': guild_id, 'status': status}
+    yield 'interactions_in_progress', len(tarefas_interacao)
+
+def estado_saude():
+    """Dados do /health; status 'ok' só com o bot conectado e o loop em dia"""
+    latencia = bot.latency
+    atraso = metrics.get('event_loop_lag_last_seconds')
+    pronto = bot.is_ready() and not bot.is_closed()
+    latencia_ms = None
+    if not math.isnan(latencia) and not math.isinf(latencia):
+        latencia_ms = round(latencia * 1000, 1)
+    return {
+        'status': 'ok' if pronto and atraso < 1.0 else 'degradado',
+        'pronto': pronto,
+        'uptime_segundos': round(time.monotonic() - INICIO, 1),
+        'latencia_gateway_ms': latencia_ms,
+        'atraso_loop_ms': round(atraso * 1000, 1),
+        'servidores': len(bot.guilds),
+        'tickets_abertos': tickets.count(ABERTO),
+        'fila_rest': rest.depth(),
+        'interacoes_em_andamento': len(tarefas_interacao),
+    }
+
+@bot.event
+async def setup_hook():
+    global servidor_web
+    
+    # Keep-alive, /metrics e /health no próprio loop do bot
+    try:
+        servidor_web = await keep_alive(estado_saude, port=WEB_PORT)
+    except OSError:
+        log.exception("Erro ao iniciar servidor web")
+    
+    # Configuração carregada antes de qualquer interação
+    await painel_config.load_file(CONFIG_FILE)
+    
+    # Restaura tickets abertos e contadores antes de receber interações
+    abertos, contagens = await journal.open()
+    tickets.hydrate(abertos, contagens)
+    estatisticas.load(await journal.stats())
+    shard_ids = getattr(bot, 'shard_ids', None)
+    await expiracoes.load(time.time(), bot.shard_count, shard_ids)
+    # Só a fila dos servidores destes shards: decisões dos outros chegam por
+    # `aplicar_decisoes`
+    pagamentos_pendentes.load(
+        await journal.payments(bot.shard_count, shard_ids),
+        await journal.payment_summaries(bot.shard_count, shard_ids),
+    )
+    await coletor.seed(time.time())
+    log.info("🎫 %s ticket(s) aberto(s) restaurado(s)", len(abertos))
+    
+    # Views persistentes: botões de mensagens antigas continuam funcionando
+    bot.add_view(TicketCategoryView())
+    bot.add_view(PedirUperView())
+    bot.add_view(TicketFecharView())
+    bot.add_view(PixTicketView())
+    bot.add_dynamic_items(
+        ComprarButton, AprovacaoPixButton, PagamentoSelect, PagamentoLoteButton,
+        PaginaPagamentosButton
+    )
+    recarregar_config.start()
+    compactar_journal.start()
+    salvar_estatisticas.start()
+    expirar_cargos.start()
+    atualizar_resumos.start()
+    aplicar_decisoes.start()
+    coletar_tickets.start()
+    reabastecer_pools.start()
+    medir_gateway.start()
+    medir_loop.start()
+
+@bot.event
+async def on_guild_role_create(role):
+    cargos.on_create(role)
+
+@bot.event
+async def on_guild_role_update(before, after):
+    cargos.on_update(before, after)
+
+@bot.event
+async def on_guild_role_delete(role):
+    cargos.on_delete(role)
+
+@bot.event
+async def on_guild_remove(guild):
+    cargos.forget(guild.id)
+    # Sem o bot no servidor não há cargo a remover; as linhas ficam para o caso
+    # de ele voltar
+    expiracoes.forget(guild.id)
+
+@bot.event
+async def on_guild_join(guild):
+    await expiracoes.restore(guild.id)
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    await esquecer_canal(channel.id)
 
 @bot.event
 async def on_ready():
+    await reconciliar_tickets()
     try:
-        synced = await bot.tree.sync()
-        print(f"✅ Bot conectado como {bot.user}")
-        print(f"📊 Em {len(bot.guilds)} servidor(es)")
-        print(f"🔄 {len(synced)} comandos sincronizados!")
-    except Exception as e:
-        print(f"Erro ao sincronizar: {e}")
+        log.info("✅ Bot conectado como %s", bot.user)
+        log.info("📊 Em %s servidor(es)", len(bot.guilds))
+        # Com vários processos, só o que tem o shard 0 sincroniza os comandos
+        shard_ids = getattr(bot, 'shard_ids', None)
+        if not shard_ids or 0 in shard_ids:
+            synced = await bot.tree.sync()
+            log.info("🔄 %s comandos sincronizados!", len(synced))
+    except Exception:
+        log.exception("Erro ao sincronizar")
+
+def permissoes_ticket(guild, user):
+    """Monta os overwrites de um canal de ticket para criá-lo em uma só chamada
+
+    Se o servidor tiver um cargo de equipe configurado, ele recebe acesso no
+    lugar de cada membro da equipe, mantendo o custo constante.
+    """
+    permitido = discord.PermissionOverwrite(view_channel=True, send_messages=True)
+    overwrites = {
+        guild.default_role: discord.PermissionOverwrite(
+            view_channel=False, send_messages=False
+        ),
+        guild.me: permitido,
+        user: permitido,
+    }
     
-    global painel_config
-    painel_config = load_config()
+    config = painel_config.get(guild.id)
+    cargo_equipe = guild.get_role(config.cargo_equipe) if config.cargo_equipe else None
+    if cargo_equipe:
+        overwrites[cargo_equipe] = permitido
+    else:
+        for user_id in config.equipe:
+            member = guild.get_member(user_id)
+            if member:
+                overwrites[member] = permitido
+    return overwrites
+
+async def carregar_equipe(guild):
+    """Traz para o cache os membros da equipe que ainda não estão nele
+
+    Sem o intent de membros, `guild.get_member` só acha quem já foi
+    buscado; sem isso a equipe ficaria de fora dos overwrites.
+    """
+    config = painel_config.get(guild.id)
+    if config.cargo_equipe or not config.equipe:
+        return
+    try:
+        await carregador_membros.get_many(guild, config.equipe)
+    except Exception:
+        log.exception("Erro ao carregar equipe")
+
+async def criar_canal_ticket(guild, user, nome, topico):
+    """Cria o canal do ticket, usando um canal do pool quando houver"""
+    await carregar_equipe(guild)
+    overwrites = permissoes_ticket(guild, user)
+    channel = await channel_pool.claim(guild, nome, topico, overwrites)
+    if channel is None:
+        channel = await rest.run(
+            'guild.create_channel', guild.id,
+            lambda: guild.create_text_channel(
+                nome, topic=topico, overwrites=overwrites
+            ),
+            INTERACAO
+        )
+    return channel
 
 class TicketModal(discord.ui.Modal, title="Criar Ticket"):
     motivo = discord.ui.TextInput(
@@ -62,40 +795,14 @@ class TicketModal(discord.ui.Modal, title="Criar Ticket"):
         max_length=1000
     )
     
+    @structured_log.handler('ticket_modal')
     async def on_submit(self, interaction: discord.Interaction):
-        global ticket_counter
-        
         guild = interaction.guild
         user = interaction.user
         motivo = self.motivo.value
         descricao = self.descricao.value
         
-        # Verificar se já existe ticket aberto
-        user_tickets = [t for t in tickets.values() if t.get('user_id') == user.id and t.get('status') == 'aberto']
-        if user_tickets:
-            await interaction.response.send_message("❌ Você já tem um ticket aberto!", ephemeral=True)
-            return
-        
-        ticket_counter += 1
-        ticket_name = f"ticket-{ticket_counter}"
-        
-        try:
-            # Criar canal de ticket
-            channel = await guild.create_text_channel(
-                ticket_name,
-                topic=f"Ticket do usuário {user.mention} - {motivo}"
-            )
-            
-            # Armazenar informações do ticket
-            tickets[channel.id] = {
-                'user_id': user.id,
-                'user_name': user.name,
-                'motivo': motivo,
-                'descricao': descricao,
-                'status': 'aberto',
-                'criado_em': str(datetime.now())
-            }
-            
+        async def boas_vindas(channel):
             # Enviar embed no canal do ticket
             embed = discord.Embed(
                 title=f"🎫 {motivo}",
@@ -107,526 +814,1101 @@ class TicketModal(discord.ui.Modal, title="Criar Ticket"):
             embed.set_footer(text=f"Ticket ID: {channel.id}")
             
             view = TicketFecharView()
-            await channel.send(embed=embed, view=view)
-            await interaction.response.send_message(f"✅ Ticket criado em {channel.mention}!", ephemeral=True)
+            await rest.run(
+                'channel.send', channel.id,
+                lambda: channel.send(embed=embed, view=view), INTERACAO
+            )
+        
+        async def criar():
+            channel, _ = await abrir_ticket(
+                guild, user, "ticket",
+                f"Ticket do usuário {user.mention} - {motivo}",
+                {'motivo': motivo, 'descricao': descricao},
+                boas_vindas
+            )
             
-        except Exception as e:
-            print(f"Erro ao criar ticket: {e}")
-            await interaction.response.send_message("❌ Erro ao criar ticket!", ephemeral=True)
+            # Verificar se já existe ticket aberto
+            if channel is None:
+                return "❌ Você já tem um ticket aberto!"
+            return f"✅ Ticket criado em {channel.mention}!"
+        
+        await reconhecer(
+            interaction, 'ticket_modal', criar, erro="❌ Erro ao criar ticket"
+        )
 
 class TicketCategoryView(discord.ui.View):
     def __init__(self):
         super().__init__(timeout=None)
         self.persistent = True
     
-    @discord.ui.button(label="Dúvida", style=discord.ButtonStyle.blurple, emoji="❓", custom_id="btn_duvida")
-    async def duvida(self, interaction: discord.Interaction, button: discord.ui.Button):
+    async def interaction_check(self, interaction: discord.Interaction):
+        return await dentro_do_limite(interaction)
+    
+    @discord.ui.button(label="Dúvida", style=discord.ButtonStyle.blurple,
+                       emoji="❓", custom_id="btn_duvida")
+    @structured_log.handler('btn_duvida')
+    async def duvida(self, interaction: discord.Interaction,
+                     _button: discord.ui.Button):
         try:
             await abrir_ticket_categoria(interaction, "Dúvida", "❓")
-        except Exception as e:
-            print(f"Erro ao criar ticket: {e}")
+        except Exception:
+            log.exception("Erro ao criar ticket")
     
-    @discord.ui.button(label="Atendimento", style=discord.ButtonStyle.primary, emoji="👤", custom_id="btn_atendimento")
-    async def atendimento(self, interaction: discord.Interaction, button: discord.ui.Button):
+    @discord.ui.button(label="Atendimento", style=discord.ButtonStyle.primary,
+                       emoji="👤", custom_id="btn_atendimento")
+    @structured_log.handler('btn_atendimento')
+    async def atendimento(self, interaction: discord.Interaction,
+                          _button: discord.ui.Button):
         try:
             await abrir_ticket_categoria(interaction, "Atendimento", "👤")
-        except Exception as e:
-            print(f"Erro ao criar ticket: {e}")
+        except Exception:
+            log.exception("Erro ao criar ticket")
     
-    @discord.ui.button(label="Suporte", style=discord.ButtonStyle.success, emoji="🛠️", custom_id="btn_suporte")
-    async def suporte(self, interaction: discord.Interaction, button: discord.ui.Button):
+    @discord.ui.button(label="Suporte", style=discord.ButtonStyle.success,
+                       emoji="🛠️", custom_id="btn_suporte")
+    @structured_log.handler('btn_suporte')
+    async def suporte(self, interaction: discord.Interaction,
+                      _button: discord.ui.Button):
         try:
             await abrir_ticket_categoria(interaction, "Suporte", "🛠️")
-        except Exception as e:
-            print(f"Erro ao criar ticket: {e}")
+        except Exception:
+            log.exception("Erro ao criar ticket")
     
-    @discord.ui.button(label="Reclamação", style=discord.ButtonStyle.danger, emoji="⚠️", custom_id="btn_reclamacao")
-    async def reclamacao(self, interaction: discord.Interaction, button: discord.ui.Button):
+    @discord.ui.button(label="Reclamação", style=discord.ButtonStyle.danger,
+                       emoji="⚠️", custom_id="btn_reclamacao")
+    @structured_log.handler('btn_reclamacao')
+    async def reclamacao(self, interaction: discord.Interaction,
+                         _button: discord.ui.Button):
         try:
             await abrir_ticket_categoria(interaction, "Reclamação", "⚠️")
-        except Exception as e:
-            print(f"Erro ao criar ticket: {e}")
+        except Exception:
+            log.exception("Erro ao criar ticket")
 
 class PedirUperView(discord.ui.View):
     def __init__(self):
         super().__init__(timeout=None)
         self.persistent = True
     
-    @discord.ui.button(label="TICKET UPER", style=discord.ButtonStyle.primary, emoji="👑", custom_id="btn_ticket_uper")
-    async def pedir_uper(self, interaction: discord.Interaction, button: discord.ui.Button):
+    async def interaction_check(self, interaction: discord.Interaction):
+        return await dentro_do_limite(interaction)
+    
+    @discord.ui.button(label="TICKET UPER", style=discord.ButtonStyle.primary,
+                       emoji="👑", custom_id="btn_ticket_uper")
+    @structured_log.handler('btn_ticket_uper')
+    async def pedir_uper(self, interaction: discord.Interaction,
+                         _button: discord.ui.Button):
         try:
             await abrir_ticket_categoria(interaction, "Pedir Uper", "👑")
-        except Exception as e:
-            print(f"Erro ao criar ticket: {e}")
+        except Exception:
+            log.exception("Erro ao criar ticket")
 
-async def abrir_ticket_categoria(interaction: discord.Interaction, categoria: str, emoji: str):
+async def abrir_ticket_categoria(
+    interaction: discord.Interaction, categoria: str, emoji: str
+):
     """Função auxiliar para abrir tickets com categoria"""
-    global ticket_counter
-    
     user = interaction.user
     guild = interaction.guild
     
-    try:
-        # Verificar se já existe ticket aberto
-        user_tickets = [t for t in tickets.values() if t.get('user_id') == user.id and t.get('status') == 'aberto']
-        if user_tickets:
-            await interaction.response.send_message("❌ Você já tem um ticket aberto!", ephemeral=True)
-            return
-        
-        await interaction.response.defer(ephemeral=True)
-        
-        ticket_counter += 1
-        ticket_name = f"ticket-{ticket_counter}"
-        
-        # Criar canal de ticket
-        channel = await guild.create_text_channel(
-            ticket_name,
-            topic=f"{categoria} - {user.mention}"
-        )
-        
-        # Armazenar informações do ticket
-        tickets[channel.id] = {
-            'user_id': user.id,
-            'user_name': user.name,
-            'motivo': categoria,
-            'descricao': '',
-            'status': 'aberto',
-            'criado_em': str(datetime.now())
-        }
-        
-        # Configurar permissões do canal
-        try:
-            # Bloquear @everyone
-            await channel.set_permissions(guild.default_role, view_channel=False, send_messages=False)
-            
-            # Permitir o usuário
-            await channel.set_permissions(user, view_channel=True, send_messages=True)
-            
-            # Permitir equipe
-            config = painel_config.get(str(guild.id), {})
-            equipe = config.get('equipe', [])
-            for user_id in equipe:
-                member = guild.get_member(user_id)
-                if member:
-                    await channel.set_permissions(member, view_channel=True, send_messages=True)
-        except Exception as e:
-            print(f"Erro ao configurar permissões: {e}")
-        
+    async def boas_vindas(channel):
         # Enviar embed no canal do ticket
-        embed = discord.Embed(
-            title=f"{emoji} {categoria}",
-            description=f"Bem-vindo ao seu ticket de {categoria.lower()}!",
-            color=discord.Color.purple()
-        )
-        embed.add_field(name="Usuário", value=user.mention, inline=True)
-        embed.add_field(name="Status", value="🟢 Aberto", inline=True)
-        embed.add_field(name="📝", value="Descreva seu problema ou dúvida abaixo!", inline=False)
+        embed = embeds.render('ticket_categoria', categoria=categoria, emoji=emoji)
+        embed.set_field_at(0, name="Usuário", value=user.mention, inline=True)
         embed.set_footer(text=f"Ticket ID: {channel.id}")
         
         view = TicketFecharView()
-        await channel.send(embed=embed, view=view)
-        await interaction.followup.send(f"✅ Ticket criado em {channel.mention}!", ephemeral=True)
+        await rest.run(
+            'channel.send', channel.id,
+            lambda: channel.send(embed=embed, view=view), INTERACAO
+        )
+    
+    async def criar():
+        channel, _ = await abrir_ticket(
+            guild, user, "ticket",
+            f"{categoria} - {user.mention}",
+            {'motivo': categoria, 'descricao': ''},
+            boas_vindas
+        )
         
-    except Exception as e:
-        print(f"Erro ao criar ticket: {e}")
-        try:
-            await interaction.followup.send(f"❌ Erro ao criar ticket: {str(e)}", ephemeral=True)
-        except:
-            pass
+        # Verificar se já existe ticket aberto
+        if channel is None:
+            return "❌ Você já tem um ticket aberto!"
+        return f"✅ Ticket criado em {channel.mention}!"
+    
+    await reconhecer(interaction, 'abrir_ticket', criar, erro="❌ Erro ao criar ticket")
 
 class TicketFecharView(discord.ui.View):
     def __init__(self):
         super().__init__(timeout=None)
     
-    @discord.ui.button(label="Fechar Ticket", style=discord.ButtonStyle.danger, emoji="🔒", custom_id="btn_fechar_ticket")
-    async def fechar_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
+    async def interaction_check(self, interaction: discord.Interaction):
+        return await dentro_do_limite(interaction)
+    
+    @discord.ui.button(label="Fechar Ticket", style=discord.ButtonStyle.danger,
+                       emoji="🔒", custom_id="btn_fechar_ticket")
+    @structured_log.handler('btn_fechar_ticket')
+    async def fechar_ticket(self, interaction: discord.Interaction,
+                            _button: discord.ui.Button):
         channel = interaction.channel
         
         if channel.id not in tickets:
-            await interaction.response.send_message("❌ Ticket não encontrado!", ephemeral=True)
+            await interaction.response.send_message(
+                "❌ Ticket não encontrado!", ephemeral=True
+            )
             return
         
-        ticket = tickets[channel.id]
-        ticket['status'] = 'fechado'
-        
-        embed = discord.Embed(
-            title="🔒 Ticket Fechado",
-            description="Este ticket foi arquivado.",
-            color=discord.Color.red()
+        await reconhecer(
+            interaction, 'fechar_ticket', lambda: fechar_canal(channel),
+            erro="❌ Erro ao fechar ticket"
         )
-        
-        await interaction.response.defer()
-        await channel.send(embed=embed)
-        await channel.edit(archived=True)
-
-class ComprarButton(discord.ui.Button):
-    def __init__(self, cargo_name, meses, valor, guild_id):
-        super().__init__(label="🛒 Comprar", style=discord.ButtonStyle.green, emoji="💳")
-        self.cargo_name = cargo_name
-        self.meses = meses
-        self.valor = valor
-        self.guild_id = guild_id
+
+async def fechar_canal(channel, prioridade=NORMAL):
+    """Marca o ticket como fechado e arquiva o canal"""
+    await marcar_fechado(channel.id)
+    
+    embed = embeds.render('ticket_fechado')
+    
+    await rest.run(
+        'channel.send', channel.id,
+        lambda: channel.send(embed=embed), prioridade
+    )
+    await rest.run(
+        'channel.edit', channel.id,
+        lambda: channel.edit(archived=True), prioridade
+    )
+    
+    # A transcrição roda em segundo plano; fechar não espera por ela
+    transcricoes.schedule(channel).add_done_callback(
+        lambda tarefa: guardar_transcricao(channel.id, tarefa)
+    )
+    return "🔒 Ticket fechado!"
+
+def guardar_transcricao(channel_id, tarefa):
+    """Registra no ticket o arquivo da transcrição do fechamento"""
+    relatorio = None if tarefa.cancelled() else tarefa.result()
+    ticket = tickets.get(channel_id)
+    if relatorio is not None and ticket is not None and ticket.get('status') == FECHADO:
+        tickets.update(channel_id, transcricao=relatorio['path'])
+
+async def buscar_oferta(oferta_id):
+    """Busca uma oferta da loja (cache em memória, depois o journal)"""
+    oferta = ofertas.get(oferta_id)
+    if oferta is None:
+        oferta = await journal.offer(oferta_id)
+        if oferta is not None:
+            ofertas[oferta_id] = oferta
+    return oferta
+
+class ComprarButton(
+    discord.ui.DynamicItem[discord.ui.Button],
+    template=r'comprar:(?P<oferta_id>[0-9]+)'
+):
+    """Botão de compra; o id da oferta vai no custom_id para sobreviver a restarts"""
+    def __init__(self, oferta_id):
+        super().__init__(discord.ui.Button(
+            label="🛒 Comprar",
+            style=discord.ButtonStyle.green,
+            emoji="💳",
+            custom_id=f"comprar:{oferta_id}"
+        ))
+        self.oferta_id = oferta_id
+    
+    @classmethod
+    async def from_custom_id(cls, _interaction: discord.Interaction,
+                             _item: discord.ui.Button, match):
+        return cls(int(match['oferta_id']))
     
+    async def interaction_check(self, interaction: discord.Interaction):
+        return await dentro_do_limite(interaction)
+    
+    @structured_log.handler('comprar')
     async def callback(self, interaction: discord.Interaction):
-        global ticket_counter, painel_config
+        oferta = await buscar_oferta(self.oferta_id)
+        if oferta is None:
+            await interaction.response.send_message(
+                "❌ Oferta não encontrada!", ephemeral=True
+            )
+            return
+        self.cargo_name = oferta['cargo_name']
+        self.meses = oferta['meses']
+        self.valor = oferta['valor']
         
-        user = interaction.user
-        guild = interaction.guild
+        await reconhecer(
+            interaction, 'comprar',
+            lambda: self.criar_ticket(interaction.guild, interaction.user),
+            erro="❌ Erro ao criar ticket"
+        )
+    
+    async def criar_ticket(self, guild, user):
+        cargo_name, meses, valor = self.cargo_name, self.meses, self.valor
         
-        try:
-            # Verificar se já existe ticket aberto
-            user_tickets = [t for t in tickets.values() if t.get('user_id') == user.id and t.get('status') == 'aberto']
-            if user_tickets:
-                await interaction.response.send_message("❌ Você já tem um ticket aberto!", ephemeral=True)
-                return
-            
-            ticket_counter += 1
-            ticket_name = f"pix-{ticket_counter}"
-            
-            # Criar canal de ticket para PIX
-            channel = await guild.create_text_channel(
-                ticket_name,
-                topic=f"Compra de {self.cargo_name} - {user.name}"
-            )
-            
-            # Armazenar informações do ticket
-            tickets[channel.id] = {
-                'user_id': user.id,
-                'user_name': user.name,
-                'motivo': f"Compra - {self.cargo_name}",
-                'status': 'aberto',
-                'criado_em': str(datetime.now()),
-                'cargo_name': self.cargo_name,
-                'meses': self.meses,
-                'valor': self.valor
-            }
-            
-            # Configurar permissões do canal
-            try:
-                # Bloquear @everyone
-                await channel.set_permissions(guild.default_role, view_channel=False, send_messages=False)
-                
-                # Permitir o usuário
-                await channel.set_permissions(user, view_channel=True, send_messages=True)
-                
-                # Permitir equipe
-                config = painel_config.get(str(guild.id), {})
-                equipe = config.get('equipe', [])
-                for user_id in equipe:
-                    member = guild.get_member(user_id)
-                    if member:
-                        await channel.set_permissions(member, view_channel=True, send_messages=True)
-            except Exception as e:
-                print(f"Erro ao configurar permissões PIX: {e}")
-            
+        async def boas_vindas(channel):
             # Buscar PIX key do config
-            config = painel_config.get(str(guild.id), {})
-            pix_key = config.get('pix_key', '❌ PIX não configurado')
+            pix_key = painel_config.get(guild.id).pix_key or '❌ PIX não configurado'
             
             # Enviar embed com PIX
-            embed = discord.Embed(
-                title=f"💳 Pagamento via PIX",
-                description=f"**Cargo:** {self.cargo_name}\n**Duração:** {self.meses} mês(es)",
-                color=discord.Color.purple()
+            embed = embeds.render(
+                'pix_pagamento', guild.id,
+                cargo=cargo_name, meses=meses, valor=valor, pix_key=pix_key
             )
             
-            if self.valor:
-                embed.add_field(name="Valor", value=f"R$ {self.valor}", inline=False)
-            
-            embed.add_field(name="📲 Chave PIX", value=f"`{pix_key}`", inline=False)
-            
             try:
-                embed.set_image(url="attachment://venom_store.gif")
-                file = discord.File("venom_store.gif", filename="venom_store.gif")
-                view = PixTicketView(user.id, self.cargo_name, self.meses)
-                await channel.send(embed=embed, file=file, view=view)
-            except:
+                file = gif.file()
+                embed_gif = embed.copy().set_image(url=GIF_URL)
+                view = PixTicketView()
+                await rest.run(
+                    'channel.send', channel.id,
+                    lambda: channel.send(embed=embed_gif, file=file, view=view),
+                    INTERACAO
+                )
+            except Exception:
                 # Se falhar ao enviar com GIF, envia sem
-                view = PixTicketView(user.id, self.cargo_name, self.meses)
-                await channel.send(embed=embed, view=view)
-            
-            await interaction.response.send_message(f"✅ Ticket de compra criado em {channel.mention}!", ephemeral=True)
-            
-        except Exception as e:
-            print(f"Erro ao criar ticket de PIX: {e}")
-            try:
-                await interaction.response.send_message(f"❌ Erro ao criar ticket: {str(e)}", ephemeral=True)
-            except:
-                pass
+                log.warning("Erro ao enviar o GIF do PIX; enviando sem", exc_info=True)
+                view = PixTicketView()
+                await rest.run(
+                    'channel.send', channel.id,
+                    lambda: channel.send(embed=embed, view=view), INTERACAO
+                )
+        
+        # Criar canal de ticket para PIX já com as permissões
+        channel, _ = await abrir_ticket(
+            guild, user, "pix",
+            f"Compra de {cargo_name} - {user.name}",
+            {
+                'motivo': f"Compra - {cargo_name}",
+                'cargo_name': cargo_name,
+                'meses': meses,
+                'valor': valor
+            },
+            boas_vindas
+        )
+        
+        # Verificar se já existe ticket aberto
+        if channel is None:
+            return "❌ Você já tem um ticket aberto!"
+        return f"✅ Ticket de compra criado em {channel.mention}!"
 
 class PixTicketView(discord.ui.View):
-    def __init__(self, user_id, cargo_name, meses):
+    """Botões do ticket de compra; os dados vêm do ticket do canal"""
+    def __init__(self):
         super().__init__(timeout=None)
-        self.user_id = user_id
-        self.cargo_name = cargo_name
-        self.meses = meses
         self.persistent = True
     
-    @discord.ui.button(label="Copiar PIX", style=discord.ButtonStyle.gray, emoji="📋", custom_id="btn_copiar_pix")
-    async def copiar(self, interaction: discord.Interaction, button: discord.ui.Button):
-        try:
-            config = painel_config.get(str(interaction.guild.id), {})
-            pix_key = config.get('pix_key', 'Não configurado')
-            await interaction.response.send_message(f"✅ Chave PIX copiada: `{pix_key}`", ephemeral=True)
-        except Exception as e:
-            print(f"Erro ao copiar PIX: {e}")
-    
-    @discord.ui.button(label="Já Comprei", style=discord.ButtonStyle.success, emoji="✅", custom_id="btn_ja_comprei")
-    async def ja_comprei(self, interaction: discord.Interaction, button: discord.ui.Button):
+    async def interaction_check(self, interaction: discord.Interaction):
+        return await dentro_do_limite(interaction)
+    
+    @discord.ui.button(label="Copiar PIX", style=discord.ButtonStyle.gray,
+                       emoji="📋", custom_id="btn_copiar_pix")
+    @structured_log.handler('btn_copiar_pix')
+    async def copiar(self, interaction: discord.Interaction,
+                     _button: discord.ui.Button):
         try:
-            guild = interaction.guild
-            config = painel_config.get(str(guild.id), {})
-            owner_id = config.get('owner_id')
-            
-            # Enviar DM ao dono
-            if owner_id:
-                try:
-                    owner = await interaction.client.fetch_user(int(owner_id))
-                    embed = discord.Embed(
-                        title="👑 Novo Pagamento Pendente",
-                        description=f"{interaction.user.mention} diz que já pagou!",
-                        color=discord.Color.gold()
-                    )
-                    embed.add_field(name="Usuário", value=f"{interaction.user.mention} ({interaction.user.name})", inline=False)
-                    embed.add_field(name="Cargo", value=self.cargo_name, inline=True)
-                    embed.add_field(name="Duração", value=f"{self.meses} mês(es)", inline=True)
-                    embed.add_field(name="📍 Ticket", value=interaction.channel.mention, inline=False)
-                    
-                    view = AprovacaoPixView(self.user_id, self.cargo_name, self.meses, guild.id)
-                    await owner.send(embed=embed, view=view)
-                except Exception as e:
-                    print(f"Erro ao enviar DM ao dono: {e}")
-            
-            # Avisar o cliente
+            config = painel_config.get(interaction.guild.id)
+            pix_key = config.pix_key or 'Não configurado'
+            await interaction.response.send_message(
+                f"✅ Chave PIX copiada: `{pix_key}`", ephemeral=True
+            )
+        except Exception:
+            log.exception("Erro ao copiar PIX")
+    
+    @discord.ui.button(label="Já Comprei", style=discord.ButtonStyle.success,
+                       emoji="✅", custom_id="btn_ja_comprei")
+    @structured_log.handler('btn_ja_comprei')
+    async def ja_comprei(self, interaction: discord.Interaction,
+                         _button: discord.ui.Button):
+        ticket = tickets.get(interaction.channel.id)
+        if ticket is None:
             await interaction.response.send_message(
-                "⏳ Você será analisado em breve!\n\n"
-                "👑 O dono do servidor foi notificado e em breve um admin verificará seu pagamento.\n"
-                "Aguarde a confirmação aqui no ticket!",
-                ephemeral=True
+                "❌ Ticket não encontrado!", ephemeral=True
             )
-        except Exception as e:
-            print(f"Erro ao processar 'Já Comprei': {e}")
+            return
+        
+        await reconhecer(
+            interaction, 'ja_comprei', lambda: notificar_pagamento(interaction, ticket),
+            erro="❌ Erro ao processar 'Já Comprei'"
+        )
 
-class AprovacaoPixView(discord.ui.View):
-    def __init__(self, user_id, cargo_name, meses, guild_id):
-        super().__init__(timeout=None)
-        self.user_id = user_id
-        self.cargo_name = cargo_name
-        self.meses = meses
-        self.guild_id = guild_id
-        self.persistent = True
+async def notificar_pagamento(interaction, ticket):
+    """Põe o pagamento informado pelo cliente na fila do dono
+
+    O dono não recebe uma DM por clique: a fila entra no resumo do
+    servidor, reeditado pelo loop `atualizar_resumos`.
+    """
+    if not pagamentos_pendentes.add(
+        interaction.guild.id, interaction.channel.id, pagamento_do_ticket(ticket)
+    ):
+        return (
+            "⏳ Seu pagamento já está na fila de análise. "
+            "Aguarde a confirmação aqui no ticket!"
+        )
+    
+    # Avisar o cliente
+    return (
+        "⏳ Você será analisado em breve!\n\n"
+        "👑 O dono do servidor foi notificado e em breve um admin verificará "
+        "seu pagamento.\n"
+        "Aguarde a confirmação aqui no ticket!"
+    )
+
+def pagamento_do_ticket(ticket):
+    """Dados da compra guardados na fila de pagamentos"""
+    return {
+        'user_id': ticket['user_id'],
+        'user_name': ticket.get('user_name'),
+        'cargo_name': ticket.get('cargo_name'),
+        'meses': ticket.get('meses', 1),
+    }
+
+def nome_cargo(pagamento):
+    cargo_name = pagamento.get('cargo_name')
+    if not cargo_name or cargo_name.strip() == "":
+        return "Membro VIP"
+    return cargo_name
+
+def servidor_local(guild_id):
+    """Se o servidor é de um shard deste processo (sem shards, todos são)"""
+    shard_ids = getattr(bot, 'shard_ids', None)
+    if not bot.shard_count or not shard_ids:
+        return True
+    return (guild_id >> 22) % bot.shard_count in shard_ids
+
+async def encaminhar_decisao(guild_id, acao, selecao):
+    """Grava a decisão do dono para o processo que tem o servidor aplicar
+
+    Interações em DM chegam só ao shard 0; a fila do servidor está no
+    processo dono dele, que lê as decisões do journal em `aplicar_decisoes`
+    e reedita o resumo com o resultado.
+    """
+    await journal.save_decision(guild_id, dict(selecao, acao=acao))
+    metrics.inc('payment_decisions_forwarded_total', acao=acao)
+    return "⏳ Decisão registrada; o resumo será atualizado em instantes."
+
+def dono_do_servidor(guild_id):
+    """ID do dono registrado com /registrar_dono (0 se não houver)"""
+    return painel_config.get(guild_id).owner_id or 0
+
+def avisar_cliente(guild, user_id, texto, contexto):
+    """Envia uma DM ao cliente em segundo plano"""
+    async def enviar():
+        member = await resolver.resolve(user_id, guild)
+        if member is not None:
+            await member.send(texto)
+    rest.fire('user.send', user_id, enviar, contexto=contexto)
+
+async def aprovar_pagamentos(guild_id, itens):
+    """Aprova um lote de pagamentos de um servidor
+
+    Cada cargo é resolvido (ou criado) uma vez por lote e aplicado a todos
+    os compradores pela fila REST. Devolve (aprovados, falhas): aprovados
+    como (channel_id, pagamento, data de expiração) e falhas como
+    (channel_id, pagamento, mensagem). As falhas voltam para a fila.
+    """
+    guild = bot.get_guild(guild_id)
+    aprovados = []
+    falhas = []
+    grupos = {}
+    for channel_id, pagamento in itens:
+        grupos.setdefault(nome_cargo(pagamento), []).append((channel_id, pagamento))
     
-    @discord.ui.button(label="Aprovar", style=discord.ButtonStyle.success, emoji="✅", custom_id="btn_aprovar_pix")
-    async def aprovar(self, interaction: discord.Interaction, button: discord.ui.Button):
+    for cargo_name, grupo in grupos.items():
+        if guild is None:
+            falhas.extend(
+                (channel_id, pagamento, "❌ Servidor não encontrado!")
+                for channel_id, pagamento in grupo
+            )
+            continue
         try:
-            guild = interaction.client.get_guild(self.guild_id)
-            
-            try:
-                member = await interaction.client.fetch_user(self.user_id)
-                guild_member = guild.get_member(self.user_id)
-            except:
-                member = None
-                guild_member = None
-            
-            cargo_name = self.cargo_name
-            if not cargo_name or cargo_name.strip() == "":
-                cargo_name = "Membro VIP"
-            
-            cargo = discord.utils.get(guild.roles, name=cargo_name)
-            
-            if not cargo:
-                try:
-                    cargo = await guild.create_role(name=cargo_name, color=discord.Color.gold())
-                except Exception as e:
-                    print(f"Erro ao criar cargo: {e}")
-                    await interaction.response.send_message(f"❌ Erro ao criar cargo '{cargo_name}'!", ephemeral=True)
-                    return
-            
-            if guild_member:
-                try:
-                    await guild_member.add_roles(cargo)
-                except Exception as e:
-                    print(f"Erro ao adicionar cargo: {e}")
-                    await interaction.response.send_message(f"❌ Erro ao adicionar cargo ao membro!", ephemeral=True)
-                    return
-            
-            # Calcular data de expiração
-            expiry_date = (datetime.now() + timedelta(days=self.meses * 30)).strftime("%d/%m/%Y")
-            
-            embed = discord.Embed(
-                title="✅ Pagamento Aprovado!",
-                description=f"Você aprovou o pagamento de <@{self.user_id}>!",
-                color=discord.Color.green()
+            cargo = await cargos.get_or_create(
+                guild, cargo_name, color=discord.Color.gold()
             )
-            embed.add_field(name="Cargo", value=cargo_name, inline=True)
-            embed.add_field(name="Duração", value=f"{self.meses} mês(es)", inline=True)
-            embed.add_field(name="Data de Expiração", value=f"**{expiry_date}**", inline=False)
-            await interaction.response.send_message(embed=embed, ephemeral=True)
-            
+        except Exception:
+            log.exception("Erro ao criar cargo %s", cargo_name)
+            falhas.extend(
+                (channel_id, pagamento, f"❌ Erro ao criar cargo '{cargo_name}'!")
+                for channel_id, pagamento in grupo
+            )
+            continue
+        
+        # Compradores não ficam no cache: só o lote é buscado, sem guardar
+        try:
+            encontrados = await carregador_membros.get_many(
+                guild, [pagamento['user_id'] for _, pagamento in grupo], cache=False
+            )
+        except Exception:
+            log.exception("Erro ao buscar membros")
+            encontrados = {}
+        por_usuario = {
+            pagamento['user_id']: encontrados.get(pagamento['user_id'])
+            for _, pagamento in grupo
+        }
+        erros = await cargos.add_to_members(
+            guild, cargo,
+            [member for member in por_usuario.values() if member is not None]
+        )
+        
+        # Calcular data de expiração; renovar soma a partir da expiração atual
+        agora = time.time()
+        renovados = {}
+        for channel_id, pagamento in grupo:
+            user_id = pagamento['user_id']
+            member = por_usuario[user_id]
+            if member is not None and erros.get(user_id) is not None:
+                log.error(
+                    "Erro ao adicionar cargo", exc_info=erros[user_id],
+                    extra={'user_id': user_id}
+                )
+                falhas.append(
+                    (channel_id, pagamento, "❌ Erro ao adicionar cargo ao membro!")
+                )
+                continue
+            atual = renovados.get(user_id)
+            if not atual and member:
+                atual = await expiracoes.expires_at(guild.id, user_id, cargo.id)
+            duracao = pagamento.get('meses', 1) * 30 * 86400
+            expira_em = max(agora, atual or agora) + duracao
             if member:
-                try:
-                    await member.send(f"✅ Seu pagamento foi aprovado! Você tem o cargo **{cargo_name}** até **{expiry_date}**!")
-                except:
-                    pass
-        except Exception as e:
-            print(f"Erro ao aprovar pagamento: {e}")
-            try:
-                await interaction.response.send_message(f"❌ Erro ao aprovar: {str(e)}", ephemeral=True)
-            except:
-                pass
+                await expiracoes.schedule(guild.id, user_id, cargo.id, expira_em)
+                renovados[user_id] = expira_em
+            estatisticas.payment(guild.id, True)
+            data = datetime.fromtimestamp(expira_em).strftime("%d/%m/%Y")
+            aprovados.append((channel_id, pagamento, data))
+    
+    for channel_id, pagamento, _ in falhas:
+        pagamentos_pendentes.restore(guild_id, channel_id, pagamento)
+    for channel_id, pagamento, expiry_date in aprovados:
+        pagamentos_pendentes.done(channel_id)
+        avisar_cliente(
+            guild, pagamento['user_id'],
+            f"✅ Seu pagamento foi aprovado! Você tem o cargo "
+            f"**{nome_cargo(pagamento)}** até **{expiry_date}**!",
+            "DM de aprovação"
+        )
+    metrics.inc(
+        'payments_decided_total', len(aprovados), acao='aprovar', resultado='ok'
+    )
+    if falhas:
+        metrics.inc(
+            'payments_decided_total', len(falhas), acao='aprovar', resultado='erro'
+        )
+    return aprovados, falhas
+
+def rejeitar_pagamentos(guild_id, itens):
+    """Rejeita um lote de pagamentos e avisa os clientes"""
+    guild = bot.get_guild(guild_id)
+    for channel_id, pagamento in itens:
+        estatisticas.payment(guild_id, False)
+        pagamentos_pendentes.done(channel_id)
+        avisar_cliente(
+            guild, pagamento['user_id'],
+            "❌ Seu pagamento foi rejeitado pelo dono do servidor.", "DM de rejeição"
+        )
+    metrics.inc('payments_decided_total', len(itens), acao='rejeitar', resultado='ok')
+    return itens
+
+async def decidir_pagamentos(guild_id, acao, avulso=False, **selecao):
+    """Job em lote do resumo: pega os pagamentos escolhidos e decide todos
+
+    `avulso` vem dos botões individuais: um pedido anterior à fila é
+    decidido com os dados da compra guardados no ticket.
+    """
+    itens = pagamentos_pendentes.take(guild_id, **selecao)
+    if not itens and avulso:
+        for channel_id in selecao['channel_ids']:
+            ticket = await tickets.fetch(channel_id)
+            if ticket is not None:
+                itens.append((channel_id, pagamento_do_ticket(ticket)))
+    if not itens:
+        return "⚠️ Esses pagamentos já foram decididos."
+    
+    if acao == 'aprovar':
+        aprovados, falhas = await aprovar_pagamentos(guild_id, itens)
+        texto = f"✅ {len(aprovados)} pagamento(s) aprovado(s)."
+        if falhas:
+            texto += f"\n⚠️ {len(falhas)} falha(s), de volta à fila: {falhas[0][2]}"
+    else:
+        rejeitar_pagamentos(guild_id, itens)
+        texto = f"❌ {len(itens)} pagamento(s) rejeitado(s)."
+    
+    try:
+        await atualizar_resumo(guild_id)
+    except Exception:
+        log.exception("Erro ao atualizar resumo de pagamentos")
+        pagamentos_pendentes.mark_dirty(guild_id)
+    return texto
+
+def montar_resumo_pagamentos(guild_id, pagina=None, fila=None):
+    """Embed e view do resumo de pagamentos pendentes enviado ao dono"""
+    if fila is None:
+        fila = pagamentos_pendentes
+    itens, pagina, total = fila.page(guild_id, pagina)
+    pendentes = fila.count(guild_id)
+    guild = bot.get_guild(guild_id)
     
-    @discord.ui.button(label="Rejeitar", style=discord.ButtonStyle.danger, emoji="❌", custom_id="btn_rejeitar_pix")
-    async def rejeitar(self, interaction: discord.Interaction, button: discord.ui.Button):
+    embed = discord.Embed(
+        title="👑 Pagamentos Pendentes",
+        description=(
+            f"**{guild.name if guild else guild_id}**: {pendentes} aguardando análise"
+        ),
+        color=discord.Color.gold() if pendentes else discord.Color.green()
+    )
+    for channel_id, pagamento in itens:
+        embed.add_field(
+            name=pagamento.get('user_name') or str(pagamento['user_id']),
+            value=(
+                f"<@{pagamento['user_id']}> • {nome_cargo(pagamento)} • "
+                f"{pagamento.get('meses', 1)} mês(es)\n"
+                f"📍 <#{channel_id}> • <t:{pagamento.get('pedido_ms', 0) // 1000}:R>"
+            ),
+            inline=False
+        )
+    if not itens:
+        embed.add_field(
+            name="✅ Tudo em dia", value="Nenhum pagamento aguardando análise.",
+            inline=False
+        )
+    embed.set_footer(text=f"Página {pagina + 1}/{total}")
+    embed.timestamp = discord.utils.utcnow()
+    return embed, ResumoPagamentosView(guild_id, itens, pagina, total)
+
+async def atualizar_resumo(guild_id):
+    """Envia ou reedita o resumo de pagamentos na DM do dono"""
+    await painel_config.refresh()
+    guild = bot.get_guild(guild_id)
+    owner_id = dono_do_servidor(guild_id)
+    if guild is None or not owner_id:
+        return
+    
+    resumo = pagamentos_pendentes.summary_message(guild_id)
+    embed, view = montar_resumo_pagamentos(guild_id)
+    if resumo is not None and resumo[0] == owner_id:
+        _, channel_id, message_id = resumo
+        canal = bot.get_partial_messageable(channel_id)
+        message = canal.get_partial_message(message_id)
         try:
-            try:
-                member = await interaction.client.fetch_user(self.user_id)
-            except:
-                member = None
-            
-            embed = discord.Embed(
-                title="❌ Pagamento Rejeitado",
-                description=f"Você rejeitou o pagamento de <@{self.user_id}>.",
-                color=discord.Color.red()
+            await rest.run(
+                'message.edit', channel_id,
+                lambda: message.edit(embed=embed, view=view), SEGUNDO_PLANO
             )
-            await interaction.response.send_message(embed=embed, ephemeral=True)
-            
-            if member:
-                try:
-                    await member.send(f"❌ Seu pagamento foi rejeitado pelo dono do servidor.")
-                except:
-                    pass
-        except Exception as e:
-            print(f"Erro ao rejeitar pagamento: {e}")
+            metrics.inc('payment_summary_total', acao='editado')
+            return
+        except discord.NotFound:
+            pass  # O dono apagou o resumo: manda outro
+    elif not pagamentos_pendentes.count(guild_id):
+        return
+    
+    owner = await resolver.resolve(owner_id, guild)
+    if owner is None:
+        raise ValueError(f"dono {owner_id} não encontrado")
+    message = await rest.run(
+        'user.send', owner.id,
+        lambda: owner.send(embed=embed, view=view), SEGUNDO_PLANO
+    )
+    pagamentos_pendentes.set_summary_message(
+        guild_id, owner_id, message.channel.id, message.id
+    )
+    metrics.inc('payment_summary_total', acao='enviado')
+
+class ResumoPagamentosView(discord.ui.View):
+    """Controles do resumo: seleção individual, lote da página e paginação"""
+    def __init__(self, guild_id, itens, pagina, total):
+        super().__init__(timeout=None)
+        if itens:
+            self.add_item(PagamentoSelect('aprovar', guild_id, itens))
+            self.add_item(PagamentoSelect('rejeitar', guild_id, itens))
+            # A página vai como intervalo de chegada: só decide o que o dono viu
+            de = itens[0][1].get('pedido_ms', 0)
+            ate = itens[-1][1].get('pedido_ms', 0)
+            self.add_item(PagamentoLoteButton('aprovar', guild_id, de, ate))
+            self.add_item(PagamentoLoteButton('rejeitar', guild_id, de, ate))
+        self.add_item(PaginaPagamentosButton(
+            guild_id, max(pagina - 1, 0), "◀️", disabled=pagina == 0
+        ))
+        self.add_item(PaginaPagamentosButton(
+            guild_id, pagina + 1, "▶️", disabled=pagina >= total - 1
+        ))
+        self.persistent = True
+
+async def decidir_pelo_resumo(interaction, guild_id, acao, **selecao):
+    if interaction.user.id != dono_do_servidor(guild_id):
+        # O dono pode ter sido trocado há pouco por outro processo: confere o
+        # disco antes de negar
+        await painel_config.refresh()
+    if interaction.user.id != dono_do_servidor(guild_id):
+        await interaction.response.send_message(
+            "❌ Apenas o dono do servidor pode decidir pagamentos!", ephemeral=True
+        )
+        return
+    erro = "❌ Erro ao aprovar" if acao == 'aprovar' else "❌ Erro ao rejeitar"
+    if not servidor_local(guild_id):
+        await reconhecer(
+            interaction, f'pix_lote_{acao}',
+            lambda: encaminhar_decisao(guild_id, acao, selecao), erro=erro
+        )
+        return
+    await reconhecer(
+        interaction, f'pix_lote_{acao}',
+        lambda: decidir_pagamentos(guild_id, acao, **selecao), erro=erro
+    )
+
+class PagamentoSelect(
+    discord.ui.DynamicItem[discord.ui.Select],
+    template=r'pixsel_(?P<acao>aprovar|rejeitar):(?P<guild_id>[0-9]+)'
+):
+    def __init__(self, acao, guild_id, itens=()):
+        opcoes = [
+            discord.SelectOption(
+                label=(pagamento.get('user_name') or str(pagamento['user_id']))[:100],
+                description=(
+                    f"{nome_cargo(pagamento)} • {pagamento.get('meses', 1)} mês(es)"
+                )[:100],
+                value=str(channel_id)
+            )
+            for channel_id, pagamento in itens
+        ]
+        super().__init__(discord.ui.Select(
+            custom_id=f"pixsel_{acao}:{guild_id}",
+            placeholder=(
+                "✅ Aprovar selecionados..." if acao == 'aprovar'
+                else "❌ Rejeitar selecionados..."
+            ),
+            min_values=1,
+            max_values=max(len(opcoes), 1),
+            options=opcoes,
+            row=0 if acao == 'aprovar' else 1
+        ))
+        self.acao = acao
+        self.guild_id = guild_id
+    
+    @classmethod
+    async def from_custom_id(cls, _interaction: discord.Interaction,
+                             _item: discord.ui.Select, match):
+        return cls(match['acao'], int(match['guild_id']))
+    
+    @structured_log.handler('pix_lote')
+    async def callback(self, interaction: discord.Interaction):
+        channel_ids = [int(valor) for valor in interaction.data.get('values', [])]
+        await decidir_pelo_resumo(
+            interaction, self.guild_id, self.acao, channel_ids=channel_ids
+        )
+
+class PagamentoLoteButton(
+    discord.ui.DynamicItem[discord.ui.Button],
+    template=(
+        r'pixlote_(?P<acao>aprovar|rejeitar):(?P<guild_id>[0-9]+)'
+        r':(?P<de>[0-9]+):(?P<ate>[0-9]+)'
+    )
+):
+    def __init__(self, acao, guild_id, de, ate):
+        if acao == 'aprovar':
+            button = discord.ui.Button(
+                label="Aprovar página", style=discord.ButtonStyle.success,
+                emoji="✅", row=2
+            )
+        else:
+            button = discord.ui.Button(
+                label="Rejeitar página", style=discord.ButtonStyle.danger,
+                emoji="❌", row=2
+            )
+        button.custom_id = f"pixlote_{acao}:{guild_id}:{de}:{ate}"
+        super().__init__(button)
+        self.acao = acao
+        self.guild_id = guild_id
+        self.de = de
+        self.ate = ate
+    
+    @classmethod
+    async def from_custom_id(cls, _interaction: discord.Interaction,
+                             _item: discord.ui.Button, match):
+        return cls(
+            match['acao'], int(match['guild_id']), int(match['de']), int(match['ate'])
+        )
+    
+    @structured_log.handler('pix_lote')
+    async def callback(self, interaction: discord.Interaction):
+        await decidir_pelo_resumo(
+            interaction, self.guild_id, self.acao, de=self.de, ate=self.ate
+        )
+
+class PaginaPagamentosButton(
+    discord.ui.DynamicItem[discord.ui.Button],
+    template=r'pixpag:(?P<guild_id>[0-9]+):(?P<pagina>[0-9]+)'
+):
+    def __init__(self, guild_id, pagina, emoji="▶️", disabled=False):
+        button = discord.ui.Button(
+            style=discord.ButtonStyle.gray, emoji=emoji, disabled=disabled, row=2
+        )
+        button.custom_id = f"pixpag:{guild_id}:{pagina}"
+        super().__init__(button)
+        self.guild_id = guild_id
+        self.pagina = pagina
+    
+    @classmethod
+    async def from_custom_id(cls, _interaction: discord.Interaction,
+                             _item: discord.ui.Button, match):
+        return cls(int(match['guild_id']), int(match['pagina']))
+    
+    @structured_log.handler('pix_pagina')
+    async def callback(self, interaction: discord.Interaction):
+        if servidor_local(self.guild_id):
+            embed, view = montar_resumo_pagamentos(self.guild_id, self.pagina)
+            await interaction.response.edit_message(embed=embed, view=view)
+            return
+        # A fila está no processo dono do servidor: a página sai do que está no journal
+        await interaction.response.defer()
+        fila = PaymentQueue(journal)
+        fila.load(await journal.payments(guild_id=self.guild_id), ())
+        embed, view = montar_resumo_pagamentos(self.guild_id, self.pagina, fila)
+        await interaction.edit_original_response(embed=embed, view=view)
+
+class AprovacaoPixButton(
+    discord.ui.DynamicItem[discord.ui.Button],
+    template=r'pix_(?P<acao>aprovar|rejeitar):(?P<channel_id>[0-9]+)'
+):
+    """Botões das DMs individuais enviadas antes da fila de pagamentos"""
+    def __init__(self, acao, channel_id):
+        if acao == 'aprovar':
+            button = discord.ui.Button(
+                label="Aprovar", style=discord.ButtonStyle.success, emoji="✅"
+            )
+        else:
+            button = discord.ui.Button(
+                label="Rejeitar", style=discord.ButtonStyle.danger, emoji="❌"
+            )
+        button.custom_id = f"pix_{acao}:{channel_id}"
+        super().__init__(button)
+        self.acao = acao
+        self.channel_id = channel_id
+    
+    @classmethod
+    async def from_custom_id(cls, _interaction: discord.Interaction,
+                             _item: discord.ui.Button, match):
+        return cls(match['acao'], int(match['channel_id']))
+    
+    @structured_log.handler('pix_aprovacao')
+    async def callback(self, interaction: discord.Interaction):
+        # O ticket guarda usuário, cargo, duração e servidor da compra
+        ticket = await tickets.fetch(self.channel_id)
+        if ticket is None:
+            await interaction.response.send_message(
+                "❌ Ticket não encontrado!", ephemeral=True
+            )
+            return
+        
+        guild_id = ticket['guild_id']
+        if not servidor_local(guild_id):
+            selecao = {'channel_ids': [self.channel_id], 'avulso': True}
+            await reconhecer(
+                interaction, f'pix_{self.acao}',
+                lambda: encaminhar_decisao(guild_id, self.acao, selecao),
+                erro=(
+                    "❌ Erro ao aprovar" if self.acao == 'aprovar'
+                    else "❌ Erro ao rejeitar"
+                )
+            )
+            return
+        # Se o pagamento estiver na fila, sai dela; senão é um pedido anterior à fila
+        itens = pagamentos_pendentes.take(guild_id, [self.channel_id])
+        if not itens:
+            itens = [(self.channel_id, pagamento_do_ticket(ticket))]
+        
+        if self.acao == 'aprovar':
+            await reconhecer(
+                interaction, 'pix_aprovar', lambda: self.aprovar(guild_id, itens),
+                erro="❌ Erro ao aprovar"
+            )
+        else:
+            await reconhecer(
+                interaction, 'pix_rejeitar', lambda: self.rejeitar(guild_id, itens),
+                erro="❌ Erro ao rejeitar"
+            )
+    
+    async def aprovar(self, guild_id, itens):
+        aprovados, falhas = await aprovar_pagamentos(guild_id, itens)
+        if falhas:
+            return falhas[0][2]
+        _, pagamento, expiry_date = aprovados[0]
+        
+        embed = discord.Embed(
+            title="✅ Pagamento Aprovado!",
+            description=f"Você aprovou o pagamento de <@{pagamento['user_id']}>!",
+            color=discord.Color.green()
+        )
+        embed.add_field(name="Cargo", value=nome_cargo(pagamento), inline=True)
+        embed.add_field(
+            name="Duração", value=f"{pagamento.get('meses', 1)} mês(es)", inline=True
+        )
+        embed.add_field(
+            name="Data de Expiração", value=f"**{expiry_date}**", inline=False
+        )
+        return {'embed': embed}
+    
+    async def rejeitar(self, guild_id, itens):
+        rejeitar_pagamentos(guild_id, itens)
+        
+        embed = discord.Embed(
+            title="❌ Pagamento Rejeitado",
+            description=f"Você rejeitou o pagamento de <@{itens[0][1]['user_id']}>.",
+            color=discord.Color.red()
+        )
+        return {'embed': embed}
 
 @bot.tree.command(name="pedir_uper", description="Painel para pedir uper")
+@structured_log.handler('pedir_uper')
 async def pedir_uper(interaction: discord.Interaction):
     """Mostra o painel para pedir uper"""
-    embed = discord.Embed(
-        title="UPER",
-        description="Confirme os valores de serviço em <#1443037178358665306>\nVou solicitar um UPER, você concorda com nossos termos e condições em <#1443036865937674250>\nVocê receberá entregas em <#1443037457351180430>\nAs regiões de serviços estão em <#1443037600763088937>",
-        color=discord.Color.from_rgb(88, 101, 242)
-    )
+    embed = embeds.render('pedir_uper')
     
     view = PedirUperView()
     await interaction.response.send_message(embed=embed, view=view)
 
 @bot.tree.command(name="painel", description="Painel de tickets")
+@structured_log.handler('painel')
 async def painel(interaction: discord.Interaction):
     """Mostra o painel de criação de tickets"""
-    embed = discord.Embed(
-        title="🎫 Painel de Tickets",
-        description="Escolha o tipo de ticket que você precisa:",
-        color=discord.Color.purple()
-    )
-    embed.add_field(name="❓ Dúvida", value="Tenha uma dúvida? Abra um ticket!", inline=False)
-    embed.add_field(name="👤 Atendimento", value="Precisa de atendimento? Clique aqui!", inline=False)
-    embed.add_field(name="🛠️ Suporte", value="Problemas técnicos? Estamos aqui!", inline=False)
-    embed.add_field(name="⚠️ Reclamação", value="Alguma reclamação? Nos avise!", inline=False)
+    embed = embeds.render('painel')
     
     view = TicketCategoryView()
     await interaction.response.send_message(embed=embed, view=view)
 
 @bot.tree.command(name="criar_ticket", description="Cria um novo ticket")
+@structured_log.handler('criar_ticket')
 async def criar_ticket(interaction: discord.Interaction):
     """Abre um modal para o usuário criar um ticket"""
     await interaction.response.send_modal(TicketModal())
 
 @bot.tree.command(name="fechar_ticket", description="Fecha um ticket")
+@structured_log.handler('fechar_ticket')
 async def fechar_ticket(interaction: discord.Interaction):
     """Fecha o ticket do canal atual"""
     if interaction.channel.id not in tickets:
         await interaction.response.send_message("❌ Este não é um canal de ticket!")
         return
     
-    ticket = tickets[interaction.channel.id]
-    ticket['status'] = 'fechado'
-    
-    embed = discord.Embed(
-        title="🔒 Ticket Fechado",
-        description="Este ticket foi arquivado.",
-        color=discord.Color.red()
+    channel = interaction.channel
+    await reconhecer(
+        interaction, 'fechar_ticket', lambda: fechar_canal(channel),
+        erro="❌ Erro ao fechar ticket"
     )
-    
-    await interaction.response.defer()
-    await interaction.channel.send(embed=embed)
-    await interaction.channel.edit(archived=True)
 
 @bot.tree.command(name="reabrir", description="Reabre um ticket")
+@structured_log.handler('reabrir')
 async def reabrir(interaction: discord.Interaction):
     """Reabre um ticket"""
-    if interaction.channel.id not in tickets:
-        await interaction.response.send_message("❌ Este não é um canal de ticket!")
+    channel = interaction.channel
+    await reconhecer(
+        interaction, 'reabrir', lambda: reabrir_canal(channel),
+        erro="❌ Erro ao reabrir ticket"
+    )
+
+async def reabrir_canal(channel):
+    """Marca o ticket como aberto e desarquiva o canal"""
+    # Um ticket fechado pode não estar em memória: a busca fica fora da janela de 3s
+    if await tickets.fetch(channel.id) is None:
+        return "❌ Este não é um canal de ticket!"
+    
+    await marcar_aberto(channel.id)
+    
+    embed = embeds.render('ticket_reaberto')
+    
+    await rest.run(
+        'channel.send', channel.id,
+        lambda: channel.send(embed=embed), NORMAL
+    )
+    await rest.run(
+        'channel.edit', channel.id,
+        lambda: channel.edit(archived=False), NORMAL
+    )
+    return "🔓 Ticket reaberto!"
+
+@bot.tree.command(
+    name="configurar_pix", description="Configura a chave PIX do servidor"
+)
+@structured_log.handler('configurar_pix')
+async def configurar_pix(interaction: discord.Interaction, chave_pix: str):
+    """Configura a chave PIX para o servidor"""
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ Apenas administradores!")
         return
     
-    ticket = tickets[interaction.channel.id]
-    ticket['status'] = 'aberto'
+    painel_config.update(interaction.guild.id, pix_key=chave_pix)
     
     embed = discord.Embed(
-        title="🔓 Ticket Reaberto",
+        title="✅ PIX Configurado",
+        description=f"Chave PIX: `{chave_pix}`",
         color=discord.Color.green()
     )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(
+    name="configurar_cargo_equipe",
+    description="Define o cargo da equipe com acesso aos tickets"
+)
+@structured_log.handler('configurar_cargo_equipe')
+async def configurar_cargo_equipe(
+    interaction: discord.Interaction, cargo: discord.Role
+):
+    """Usa um cargo da equipe nos tickets em vez de permissões por membro"""
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ Apenas administradores!")
+        return
     
-    await interaction.response.send_message(embed=embed)
-    await interaction.channel.edit(archived=False)
+    painel_config.update(interaction.guild.id, cargo_equipe=cargo.id)
+    
+    embed = discord.Embed(
+        title="✅ Cargo da Equipe Configurado",
+        description=f"Novos tickets darão acesso a {cargo.mention}.",
+        color=discord.Color.green()
+    )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
 
-@bot.tree.command(name="configurar_pix", description="Configura a chave PIX do servidor")
-async def configurar_pix(interaction: discord.Interaction, chave_pix: str):
-    """Configura a chave PIX para o servidor"""
+@bot.tree.command(
+    name="configurar_pool",
+    description="Define quantos canais de ticket ficam pré-criados"
+)
+@structured_log.handler('configurar_pool')
+async def configurar_pool(
+    interaction: discord.Interaction, tamanho: app_commands.Range[int, 0, 50]
+):
+    """Configura o pool de canais pré-criados (0 desativa)"""
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ Apenas administradores!")
+        return
+    
+    painel_config.update(interaction.guild.id, pool_tamanho=tamanho)
+    
+    embed = discord.Embed(
+        title="✅ Pool Configurado",
+        description=(
+            f"Canais pré-criados: **{tamanho}** "
+            f"(atual: {channel_pool.size(interaction.guild.id)})"
+        ),
+        color=discord.Color.green()
+    )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(
+    name="limite_cliques",
+    description="Limita os cliques por botão no servidor inteiro"
+)
+@structured_log.handler('limite_cliques')
+async def limite_cliques(
+    interaction: discord.Interaction, cliques: app_commands.Range[int, 0, 10000]
+):
+    """Configura quantos cliques por botão o servidor aceita a cada 10s (0 desativa)"""
     if not interaction.user.guild_permissions.administrator:
         await interaction.response.send_message("❌ Apenas administradores!")
         return
     
-    global painel_config
-    guild_id = str(interaction.guild.id)
+    painel_config.update(interaction.guild.id, limite_cliques=cliques)
     
-    if guild_id not in painel_config:
-        painel_config[guild_id] = {}
+    embed = discord.Embed(
+        title="✅ Limite de Cliques Configurado",
+        description=(
+            f"Cliques por botão a cada {JANELA_SERVIDOR:.0f}s: "
+            f"**{cliques or 'sem limite'}**"
+        ),
+        color=discord.Color.green()
+    )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(
+    name="politica_tickets",
+    description="Define quando tickets parados fecham e canais fechados são apagados"
+)
+@structured_log.handler('politica_tickets')
+async def politica_tickets(
+    interaction: discord.Interaction,
+    inatividade_horas: app_commands.Range[int, 0, 8760],
+    retencao_horas: app_commands.Range[int, 0, 8760],
+    transcrever: bool = True
+):
+    """Configura a coleta de tickets do servidor (0 desativa cada prazo)"""
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ Apenas administradores!")
+        return
     
-    painel_config[guild_id]['pix_key'] = chave_pix
-    save_config(painel_config)
+    painel_config.update(
+        interaction.guild.id,
+        inatividade_horas=inatividade_horas, retencao_horas=retencao_horas,
+        transcrever_antes=transcrever
+    )
+    # Os prazos já gravados são refeitos com a política nova
+    guild = interaction.guild
+    agora = time.time()
+    abertos = []
+    for channel_id, ticket in list(tickets.items()):
+        if ticket.get('guild_id') == guild.id and ticket.get('status') == ABERTO:
+            channel = guild.get_channel(channel_id)
+            referencia = agora
+            if channel is not None:
+                referencia = ultima_atividade(channel, ticket)
+            abertos.append((channel_id, referencia))
+    coletor.requeue(guild.id, politica_coleta(guild.id), abertos, agora)
     
     embed = discord.Embed(
-        title="✅ PIX Configurado",
-        description=f"Chave PIX: `{chave_pix}`",
+        title="✅ Política de Tickets Configurada",
+        description=(
+            f"Fechar tickets parados após: "
+            f"**{f'{inatividade_horas}h' if inatividade_horas else 'desativado'}**\n"
+            f"Apagar canais fechados após: "
+            f"**{f'{retencao_horas}h' if retencao_horas else 'desativado'}**\n"
+            f"Transcrição antes de apagar: **{'sim' if transcrever else 'não'}**"
+        ),
         color=discord.Color.green()
     )
     await interaction.response.send_message(embed=embed, ephemeral=True)
 
 @bot.tree.command(name="pix", description="Cria painel de compra via PIX")
-async def pix(interaction: discord.Interaction, cargo: str, meses: int = 1, valor: str = ""):
+@structured_log.handler('pix')
+async def pix(
+    interaction: discord.Interaction, cargo: str, meses: int = 1, valor: str = ""
+):
     """Envia painel de compra com botão Comprar"""
     if not interaction.user.guild_permissions.administrator:
         await interaction.response.send_message("❌ Apenas administradores!")
         return
     
-    desc = f"**Cargo:** {cargo}\n**Duração:** {meses} mês(es)"
-    if valor:
-        desc += f"\n**Valor:** R$ {valor}"
-    desc += "\n\nClique no botão abaixo para comprar!"
-    
-    embed = discord.Embed(
-        title="💳 Loja de Cargos",
-        description=desc,
-        color=discord.Color.purple()
+    guild_id = interaction.guild.id
+    channel = interaction.channel
+    oferta = {'cargo_name': cargo, 'meses': meses, 'valor': valor}
+    await reconhecer(
+        interaction, 'pix', lambda: enviar_oferta(channel, guild_id, oferta),
+        erro="❌ Erro ao criar painel"
+    )
+
+async def enviar_oferta(channel, guild_id, oferta):
+    """Grava a oferta e envia o painel de compra no canal"""
+    embed = embeds.render(
+        'loja', guild_id, cargo=oferta['cargo_name'], meses=oferta['meses'],
+        valor=oferta['valor']
     )
+    file = gif.file()
+    
+    oferta_id = await journal.add_offer(guild_id, oferta)
+    ofertas[oferta_id] = oferta
     
-    embed.set_image(url="attachment://venom_store.gif")
-    file = discord.File("venom_store.gif", filename="venom_store.gif")
-    view = discord.ui.View()
-    view.add_item(ComprarButton(cargo, meses, valor, interaction.guild.id))
+    view = discord.ui.View(timeout=None)
+    view.add_item(ComprarButton(oferta_id))
     
-    await interaction.response.send_message(embed=embed, file=file, view=view)
+    await rest.run(
+        'channel.send', channel.id,
+        lambda: channel.send(embed=embed, file=file, view=view), NORMAL
+    )
+    return "✅ Painel de compra enviado!"
 
 @bot.tree.command(name="stats", description="Mostra estatísticas de tickets")
+@structured_log.handler('stats')
 async def stats(interaction: discord.Interaction):
     """Mostra estatísticas"""
     if not interaction.user.guild_permissions.administrator:
         await interaction.response.send_message("❌ Apenas administradores!")
         return
     
-    total = len(tickets)
-    abertos = sum(1 for t in tickets.values() if t.get('status') == 'aberto')
-    fechados = total - abertos
+    guild_id = interaction.guild.id
+    resumo = estatisticas.summary(guild_id)
+    # Os canais apagados pela coleta saem do store; os totais vêm dos contadores
+    total = resumo['abertos_total']
+    fechados = resumo['fechados_total']
+    abertos = tickets.count(ABERTO, guild_id)
     
     embed = discord.Embed(
         title="📊 Estatísticas de Tickets",
@@ -636,9 +1918,65 @@ async def stats(interaction: discord.Interaction):
     embed.add_field(name="🟢 Abertos", value=str(abertos), inline=True)
     embed.add_field(name="🔴 Fechados", value=str(fechados), inline=True)
     
+    abertos_24h, fechados_24h = resumo['ultimas_24h']
+    abertos_antes, _ = resumo['24h_anteriores']
+    embed.add_field(
+        name="🕐 Últimas 24h",
+        value=(
+            f"{abertos_24h} aberto(s) {tendencia(abertos_24h, abertos_antes)}\n"
+            f"{fechados_24h} fechado(s)"
+        ),
+        inline=True
+    )
+    semana = resumo['ultimos_7_dias']
+    embed.add_field(
+        name="📅 Últimos 7 dias",
+        value=(
+            f"{sum(a for a, _ in semana)} aberto(s)\n"
+            f"`{' '.join(str(a) for a, _ in semana)}`"
+        ),
+        inline=True
+    )
+    
+    mediana = resumo['mediana_fechamento']
+    embed.add_field(
+        name="⏱️ Mediana até fechar",
+        value=formatar_duracao(mediana) if mediana is not None else "-", inline=True
+    )
+    aprovacao = resumo['aprovacao_pix']
+    embed.add_field(
+        name="💳 Aprovação PIX",
+        value=(
+            f"{aprovacao:.0%} de {resumo['pix_decididos']}"
+            if aprovacao is not None else "-"
+        ),
+        inline=True
+    )
+    
     await interaction.response.send_message(embed=embed)
 
-@bot.tree.command(name="mensagem", description="Enviar uma mensagem de texto customizada")
+def tendencia(atual, anterior):
+    """Seta comparando um período com o anterior"""
+    if atual == anterior:
+        return "➖"
+    if not anterior:
+        return "📈"
+    variacao = (atual - anterior) / anterior
+    return f"{'📈' if variacao > 0 else '📉'} {variacao:+.0%}"
+
+def formatar_duracao(segundos):
+    if segundos < 60:
+        return f"{segundos:.0f} s"
+    if segundos < 3600:
+        return f"{segundos / 60:.0f} min"
+    if segundos < 86400:
+        return f"{segundos / 3600:.1f} h"
+    return f"{segundos / 86400:.1f} dias"
+
+@bot.tree.command(
+    name="mensagem", description="Enviar uma mensagem de texto customizada"
+)
+@structured_log.handler('mensagem')
 async def mensagem(
     interaction: discord.Interaction, 
     titulo: str, 
@@ -647,41 +1985,55 @@ async def mensagem(
 ):
     """Envia uma mensagem com título e texto, opcionalmente com embed e GIF"""
     if not interaction.user.guild_permissions.administrator:
-        await interaction.response.send_message("❌ Apenas administradores podem usar este comando!")
+        await interaction.response.send_message(
+            "❌ Apenas administradores podem usar este comando!"
+        )
         return
     
+    channel = interaction.channel
+    await reconhecer(
+        interaction, 'mensagem',
+        lambda: enviar_mensagem(channel, titulo, texto, embed_option),
+        erro="❌ Erro ao enviar mensagem"
+    )
+
+async def enviar_mensagem(channel, titulo, texto, embed_option):
+    """Envia a mensagem customizada no canal"""
     if embed_option:
         embed = discord.Embed(
             title=titulo,
             description=texto,
             color=discord.Color.purple()
         )
-        embed.set_image(url="attachment://venom_store.gif")
-        file = discord.File("venom_store.gif", filename="venom_store.gif")
-        await interaction.channel.send(embed=embed, file=file)
+        embed.set_image(url=GIF_URL)
+        file = gif.file()
+        await rest.run(
+            'channel.send', channel.id,
+            lambda: channel.send(embed=embed, file=file), NORMAL
+        )
     else:
-        await interaction.channel.send(f"**{titulo}**\n{texto}")
+        await rest.run(
+            'channel.send', channel.id,
+            lambda: channel.send(f"**{titulo}**\n{texto}"), NORMAL
+        )
     
-    await interaction.response.send_message("✅ Mensagem enviada!", ephemeral=True)
+    return "✅ Mensagem enviada!"
 
-@bot.tree.command(name="registrar_dono", description="Registra o ID do dono do servidor")
+@bot.tree.command(
+    name="registrar_dono", description="Registra o ID do dono do servidor"
+)
+@structured_log.handler('registrar_dono')
 async def registrar_dono(interaction: discord.Interaction, dono_id: str):
     """Registra o ID do dono para receber notificações"""
     if not interaction.user.guild_permissions.administrator:
         await interaction.response.send_message("❌ Apenas administradores!")
         return
     
-    global painel_config
-    
     try:
         dono_id_int = int(dono_id)
-        guild_id = str(interaction.guild.id)
-        
-        if guild_id not in painel_config:
-            painel_config[guild_id] = {}
-        
-        painel_config[guild_id]['owner_id'] = dono_id_int
-        save_config(painel_config)
+        painel_config.update(interaction.guild.id, owner_id=dono_id_int)
+        # O novo dono recebe o resumo da fila no próximo ciclo
+        pagamentos_pendentes.mark_dirty(interaction.guild.id)
         
         embed = discord.Embed(
             title="✅ Dono Registrado",
@@ -690,28 +2042,21 @@ async def registrar_dono(interaction: discord.Interaction, dono_id: str):
         )
         await interaction.response.send_message(embed=embed, ephemeral=True)
     except ValueError:
-        await interaction.response.send_message("❌ ID inválido! Use apenas números.", ephemeral=True)
+        await interaction.response.send_message(
+            "❌ ID inválido! Use apenas números.", ephemeral=True
+        )
 
-@bot.tree.command(name="adicionar_equipe", description="Adiciona um membro à equipe de suporte")
+@bot.tree.command(
+    name="adicionar_equipe", description="Adiciona um membro à equipe de suporte"
+)
+@structured_log.handler('adicionar_equipe')
 async def adicionar_equipe(interaction: discord.Interaction, usuario: discord.User):
     """Adiciona um usuário à equipe de suporte"""
     if not interaction.user.guild_permissions.administrator:
         await interaction.response.send_message("❌ Apenas administradores!")
         return
     
-    global painel_config
-    guild_id = str(interaction.guild.id)
-    
-    if guild_id not in painel_config:
-        painel_config[guild_id] = {}
-    
-    if 'equipe' not in painel_config[guild_id]:
-        painel_config[guild_id]['equipe'] = []
-    
-    if usuario.id not in painel_config[guild_id]['equipe']:
-        painel_config[guild_id]['equipe'].append(usuario.id)
-        save_config(painel_config)
-        
+    if painel_config.add_staff(interaction.guild.id, usuario.id):
         embed = discord.Embed(
             title="✅ Membro Adicionado",
             description=f"{usuario.mention} foi adicionado à equipe de suporte!",
@@ -719,26 +2064,27 @@ async def adicionar_equipe(interaction: discord.Interaction, usuario: discord.Us
         )
         await interaction.response.send_message(embed=embed, ephemeral=True)
     else:
-        await interaction.response.send_message(f"⚠️ {usuario.mention} já está na equipe!", ephemeral=True)
+        await interaction.response.send_message(
+            f"⚠️ {usuario.mention} já está na equipe!", ephemeral=True
+        )
 
-@bot.tree.command(name="remover_equipe", description="Remove um membro da equipe de suporte")
+@bot.tree.command(
+    name="remover_equipe", description="Remove um membro da equipe de suporte"
+)
+@structured_log.handler('remover_equipe')
 async def remover_equipe(interaction: discord.Interaction, usuario: discord.User):
     """Remove um usuário da equipe de suporte"""
     if not interaction.user.guild_permissions.administrator:
         await interaction.response.send_message("❌ Apenas administradores!")
         return
     
-    global painel_config
-    guild_id = str(interaction.guild.id)
-    
-    if guild_id not in painel_config or 'equipe' not in painel_config[guild_id]:
-        await interaction.response.send_message("❌ Nenhuma equipe configurada!", ephemeral=True)
+    if not painel_config.get(interaction.guild.id).equipe:
+        await interaction.response.send_message(
+            "❌ Nenhuma equipe configurada!", ephemeral=True
+        )
         return
     
-    if usuario.id in painel_config[guild_id]['equipe']:
-        painel_config[guild_id]['equipe'].remove(usuario.id)
-        save_config(painel_config)
-        
+    if painel_config.remove_staff(interaction.guild.id, usuario.id):
         embed = discord.Embed(
             title="✅ Membro Removido",
             description=f"{usuario.mention} foi removido da equipe de suporte!",
@@ -746,27 +2092,43 @@ async def remover_equipe(interaction: discord.Interaction, usuario: discord.User
         )
         await interaction.response.send_message(embed=embed, ephemeral=True)
     else:
-        await interaction.response.send_message(f"⚠️ {usuario.mention} não está na equipe!", ephemeral=True)
+        await interaction.response.send_message(
+            f"⚠️ {usuario.mention} não está na equipe!", ephemeral=True
+        )
 
-@bot.tree.command(name="listar_equipe", description="Lista os membros da equipe de suporte")
+@bot.tree.command(
+    name="listar_equipe", description="Lista os membros da equipe de suporte"
+)
+@structured_log.handler('listar_equipe')
 async def listar_equipe(interaction: discord.Interaction):
     """Lista todos os membros da equipe de suporte"""
-    global painel_config
-    guild_id = str(interaction.guild.id)
-    
-    if guild_id not in painel_config or 'equipe' not in painel_config[guild_id] or not painel_config[guild_id]['equipe']:
-        await interaction.response.send_message("❌ Nenhuma equipe configurada!", ephemeral=True)
+    equipe = painel_config.get(interaction.guild.id).equipe
+    if not equipe:
+        await interaction.response.send_message(
+            "❌ Nenhuma equipe configurada!", ephemeral=True
+        )
         return
     
-    equipe_list = painel_config[guild_id]['equipe']
+    equipe_list = sorted(equipe)
     guild = interaction.guild
+    await reconhecer(
+        interaction, 'listar_equipe', lambda: montar_lista_equipe(guild, equipe_list)
+    )
+
+async def montar_lista_equipe(guild, equipe_list):
+    """Resolve os membros da equipe e monta o embed da listagem"""
+    try:
+        usuarios = await resolver.resolve_many(equipe_list, guild)
+    except Exception:
+        log.exception("Erro ao buscar equipe")
+        usuarios = {}
     
     membros = []
     for user_id in equipe_list:
-        try:
-            user = await interaction.client.fetch_user(user_id)
+        user = usuarios.get(user_id)
+        if user:
             membros.append(f"• {user.mention} ({user.name})")
-        except:
+        else:
             membros.append(f"• ID: {user_id} (Usuário não encontrado)")
     
     embed = discord.Embed(
@@ -775,9 +2137,18 @@ async def listar_equipe(interaction: discord.Interaction):
         color=discord.Color.blue()
     )
     embed.set_footer(text=f"Total: {len(membros)} membros")
-    
-    await interaction.response.send_message(embed=embed, ephemeral=True)
+    return {'embed': embed}
 
-# Token do bot
-TOKEN = os.getenv('DISCORD_TOKEN')
-bot.run(TOKEN)
+if __name__ == "__main__":
+    # Token do bot
+    TOKEN = os.getenv('DISCORD_TOKEN')
+    # Logs em JSON, escritos por uma thread; o discord.py usa a mesma fila
+    structured_log.configurar(LOG_NIVEL)
+    try:
+        bot.run(TOKEN, log_handler=None)
+    finally:
+        config_writer.flush_sync()
+        estatisticas.flush()
+        transcricoes.close()
+        journal.close()
+        state.close()
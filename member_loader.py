@@ -0,0 +1,75 @@
+"""Membros específicos buscados pelo gateway, sob demanda
+
+Sem o intent de membros o discord.py não guarda a lista do servidor.
+Quem precisa de membros (a equipe nas permissões do ticket, os
+compradores na aprovação) pede só os ids que faltam no cache, pelo
+opcode REQUEST_GUILD_MEMBERS com `user_ids` (até 100 por pedido, não
+exige o intent privilegiado). Pedidos simultâneos iguais compartilham a
+mesma consulta, e ids que não estão no servidor ficam lembrados por um
+tempo para não repetir a consulta.
+"""
+import functools
+import time
+
+import metrics
+from single_flight import SingleFlight
+
+LOTE = 100
+MAX_AUSENTES = 10_000
+
+class MemberLoader:
+    """Completa o cache de membros com consultas pontuais ao gateway"""
+
+    def __init__(self, ttl_ausentes=600):
+        self.ttl_ausentes = ttl_ausentes
+        self._consultas = SingleFlight()
+        # (guild_id, user_id) -> instante em que o id não foi encontrado
+        self._ausentes = {}
+
+    async def get_many(self, guild, user_ids, cache=True):
+        """Devolve {user_id: Member} dos ids que estão no servidor
+
+        Com `cache=True` os membros buscados ficam no cache do servidor
+        (`guild.get_member` passa a achá-los); use para grupos pequenos e
+        estáveis, como a equipe.
+        """
+        agora = time.monotonic()
+        encontrados = {}
+        faltando = []
+        for user_id in dict.fromkeys(user_ids):
+            member = guild.get_member(user_id)
+            if member is not None:
+                encontrados[user_id] = member
+            elif agora - self._ausentes.get((guild.id, user_id), -self.ttl_ausentes) \
+                    >= self.ttl_ausentes:
+                faltando.append(user_id)
+        metrics.inc('member_loader_total', len(encontrados), origem='cache')
+
+        for inicio in range(0, len(faltando), LOTE):
+            lote = tuple(sorted(faltando[inicio:inicio + LOTE]))
+            membros, _ = await self._consultas.run(
+                (guild.id, lote, cache),
+                functools.partial(
+                    guild.query_members,
+                    user_ids=list(lote), limit=len(lote), cache=cache
+                )
+            )
+            achados = {member.id: member for member in membros}
+            encontrados.update(achados)
+            metrics.inc('member_loader_total', len(achados), origem='gateway')
+            for user_id in lote:
+                if user_id not in achados:
+                    self._lembrar_ausente(guild.id, user_id, agora)
+        return encontrados
+
+    def _lembrar_ausente(self, guild_id, user_id, agora):
+        if len(self._ausentes) >= MAX_AUSENTES:
+            # Descarta as entradas vencidas (ou todas, se nenhuma venceu)
+            vencidas = [
+                chave for chave, quando in self._ausentes.items()
+                if agora - quando >= self.ttl_ausentes
+            ]
+            for chave in vencidas or list(self._ausentes):
+                del self._ausentes[chave]
+        self._ausentes[(guild_id, user_id)] = agora
+        metrics.inc('member_loader_total', origem='ausente')
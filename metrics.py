@@ -0,0 +1,167 @@
+"""Métricas em memória do bot
+
+Tudo roda na thread do event loop, inclusive as rotas /metrics e /health
+do servidor aiohttp (keep_alive), então contadores e histogramas são
+dicionários simples, sem locks. `snapshot` copia os valores (e roda os
+coletores) e `render_prometheus` formata essa cópia no formato texto do
+Prometheus.
+"""
+import bisect
+import functools
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+BUCKETS_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+contadores = {}
+gauges = {}
+histogramas = {}
+coletores = []
+
+class Histogram:
+    """Histograma cumulativo com buckets fixos"""
+    __slots__ = ('buckets', 'contagens', 'soma', 'total')
+
+    def __init__(self, buckets=BUCKETS_PADRAO):
+        self.buckets = buckets
+        self.contagens = [0] * (len(buckets) + 1)
+        self.soma = 0.0
+        self.total = 0
+
+    def observe(self, valor):
+        self.contagens[bisect.bisect_left(self.buckets, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+    def quantile(self, q):
+        """Estimativa do quantil pelo limite superior do bucket"""
+        if not self.total:
+            return 0.0
+        alvo = q * self.total
+        acumulado = 0
+        for i, n in enumerate(self.contagens):
+            acumulado += n
+            if acumulado >= alvo:
+                return self.buckets[i] if i < len(self.buckets) else float('inf')
+        return float('inf')
+
+def _chave(nome, labels):
+    return (nome, tuple(sorted(labels.items()))) if labels else (nome, ())
+
+def inc(nome, valor=1, **labels):
+    chave = _chave(nome, labels)
+    contadores[chave] = contadores.get(chave, 0) + valor
+
+def set_gauge(nome, valor, **labels):
+    gauges[_chave(nome, labels)] = valor
+
+def observe(nome, valor, buckets=BUCKETS_PADRAO, **labels):
+    chave = _chave(nome, labels)
+    hist = histogramas.get(chave)
+    if hist is None:
+        hist = histogramas[chave] = Histogram(buckets)
+    hist.observe(valor)
+
+def timed(nome, **labels):
+    """Decorador que mede a duração de uma corrotina e conta o resultado
+
+    Gera o histograma `<nome>_seconds` e o contador `<nome>_total` com o
+    label `resultado` (ok/erro).
+    """
+    def decorador(func):
+        @functools.wraps(func)
+        async def medido(*args, **kwargs):
+            inicio = time.perf_counter()
+            resultado = 'erro'
+            try:
+                retorno = await func(*args, **kwargs)
+                resultado = 'ok'
+                return retorno
+            finally:
+                observe(f"{nome}_seconds", time.perf_counter() - inicio, **labels)
+                inc(f"{nome}_total", resultado=resultado, **labels)
+        return medido
+    return decorador
+
+def collector(func):
+    """Registra uma função chamada na leitura que devolve gauges calculados
+
+    A função devolve pares (nome, valor) ou trios (nome, valor, labels);
+    serve para valores que já existem em outro lugar (como contagens de
+    tickets) e não precisam ser atualizados no caminho quente.
+    """
+    coletores.append(func)
+    return func
+
+def get(nome, **labels):
+    """Valor atual de um contador ou gauge"""
+    chave = _chave(nome, labels)
+    return contadores.get(chave, gauges.get(chave, 0))
+
+def snapshot():
+    """Cópia dos valores atuais, com os gauges dos coletores"""
+    copia_gauges = dict(gauges)
+    for func in coletores:
+        try:
+            for item in func():
+                nome, valor = item[0], item[1]
+                copia_gauges[_chave(nome, item[2] if len(item) > 2 else {})] = valor
+        except Exception:
+            log.exception("Erro no coletor de métricas %s", func.__name__)
+    return {
+        'contadores': dict(contadores),
+        'gauges': copia_gauges,
+        'histogramas': {
+            chave: (h.buckets, list(h.contagens), h.soma, h.total)
+            for chave, h in list(histogramas.items())
+        },
+    }
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(pares, extra=()):
+    pares = tuple(pares) + tuple(extra)
+    if not pares:
+        return ''
+    corpo = ','.join(f'{chave}="{_escapar(valor)}"' for chave, valor in pares)
+    return '{' + corpo + '}'
+
+def _ordem(item):
+    (nome, pares), _ = item
+    return nome, str(pares)
+
+def _numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+def render_prometheus(dados=None):
+    """Formata um snapshot no formato de exposição texto do Prometheus"""
+    dados = dados or snapshot()
+    linhas = []
+    tipos = (('counter', dados['contadores']), ('gauge', dados['gauges']))
+    for tipo, valores in tipos:
+        anterior = None
+        for (nome, pares), valor in sorted(valores.items(), key=_ordem):
+            if nome != anterior:
+                linhas.append(f"# TYPE {nome} {tipo}")
+                anterior = nome
+            linhas.append(f"{nome}{_labels(pares)} {_numero(valor)}")
+
+    anterior = None
+    histogramas = sorted(dados['histogramas'].items(), key=_ordem)
+    for (nome, pares), (buckets, contagens, soma, total) in histogramas:
+        if nome != anterior:
+            linhas.append(f"# TYPE {nome} histogram")
+            anterior = nome
+        acumulado = 0
+        for limite, n in zip(tuple(buckets) + (float('inf'),), contagens):
+            acumulado += n
+            rotulos = _labels(pares, (('le', _numero(limite)),))
+            linhas.append(f"{nome}_bucket{rotulos} {acumulado}")
+        linhas.append(f"{nome}_sum{_labels(pares)} {_numero(soma)}")
+        linhas.append(f"{nome}_count{_labels(pares)} {total}")
+    return "\n".join(linhas) + "\n"
@@ -0,0 +1,140 @@
+"""Fila de pagamentos PIX aguardando a decisão do dono
+
+Cada "Já Comprei" vira uma entrada da fila do servidor (uma por ticket,
+então cliques repetidos não duplicam nada), gravada no journal. O dono
+recebe uma única mensagem de resumo por servidor, reeditada de tempos em
+tempos, e decide os pagamentos em lote. Uma entrada sai da fila quando um
+lote a pega (`take`) e só some do journal quando é concluída (`done`); se
+o processo cair no meio do lote, ela volta como pendente no próximo boot.
+"""
+import time
+
+import metrics
+
+POR_PAGINA = 10
+
+class PaymentQueue:
+    """Pagamentos pendentes por servidor, em ordem de chegada"""
+
+    def __init__(self, journal, por_pagina=POR_PAGINA):
+        self.journal = journal
+        self.por_pagina = por_pagina
+        # guild_id -> {channel_id: pagamento}; dicts mantêm a ordem de inserção
+        self._filas = {}
+        self._em_lote = set()
+        # guild_id -> (owner_id, channel_id, message_id) do resumo enviado
+        self._resumos = {}
+        self._paginas = {}
+        self._sujos = set()
+
+    def __len__(self):
+        return sum(len(fila) for fila in self._filas.values())
+
+    def __contains__(self, channel_id):
+        if channel_id in self._em_lote:
+            return True
+        return any(channel_id in fila for fila in self._filas.values())
+
+    def load(self, pagamentos, resumos):
+        """Carrega as linhas do journal (`payments` e `payment_summaries`)"""
+        ordenados = sorted(pagamentos, key=lambda linha: linha[2].get('pedido_ms', 0))
+        for channel_id, guild_id, pagamento in ordenados:
+            self._filas.setdefault(guild_id, {})[channel_id] = pagamento
+            self._sujos.add(guild_id)
+        for guild_id, owner_id, channel_id, message_id in resumos:
+            self._resumos[guild_id] = (owner_id, channel_id, message_id)
+        self._atualizar_metricas()
+
+    def add(self, guild_id, channel_id, pagamento):
+        """Enfileira o pagamento do ticket; False se ele já estava na fila"""
+        fila = self._filas.setdefault(guild_id, {})
+        if channel_id in fila or channel_id in self._em_lote:
+            metrics.inc('payments_queued_total', resultado='duplicado')
+            return False
+        pagamento = dict(pagamento, pedido_ms=int(time.time() * 1000))
+        fila[channel_id] = pagamento
+        self.journal.save_payment(channel_id, guild_id, pagamento)
+        self._sujos.add(guild_id)
+        metrics.inc('payments_queued_total', resultado='ok')
+        self._atualizar_metricas()
+        return True
+
+    def count(self, guild_id):
+        return len(self._filas.get(guild_id, ()))
+
+    def pending(self, guild_id):
+        """Lista (channel_id, pagamento) do servidor, do mais antigo ao mais novo"""
+        return list(self._filas.get(guild_id, {}).items())
+
+    def page(self, guild_id, pagina=None):
+        """(itens, página, total de páginas); sem `pagina`, a última exibida"""
+        itens = self.pending(guild_id)
+        total = max(1, -(-len(itens) // self.por_pagina))
+        pagina = self._paginas.get(guild_id, 0) if pagina is None else pagina
+        pagina = min(max(pagina, 0), total - 1)
+        self._paginas[guild_id] = pagina
+        inicio = pagina * self.por_pagina
+        return itens[inicio:inicio + self.por_pagina], pagina, total
+
+    def take(self, guild_id, channel_ids=None, de=None, ate=None):
+        """Retira da fila os pagamentos escolhidos para um lote
+
+        Seleciona por `channel_ids` ou pelo intervalo `de <= pedido_ms <= ate`
+        (uma página do resumo). Quem já foi pego por outro lote não volta,
+        então dois cliques no mesmo botão não processam nada duas vezes.
+        """
+        fila = self._filas.get(guild_id, {})
+        if channel_ids is not None:
+            escolhidos = [
+                channel_id for channel_id in channel_ids if channel_id in fila
+            ]
+        else:
+            escolhidos = [
+                channel_id for channel_id, pagamento in fila.items()
+                if de <= pagamento.get('pedido_ms', 0) <= ate
+            ]
+        itens = [(channel_id, fila.pop(channel_id)) for channel_id in escolhidos]
+        self._em_lote.update(escolhidos)
+        if itens:
+            self._sujos.add(guild_id)
+        self._atualizar_metricas()
+        return itens
+
+    def done(self, channel_id):
+        """Conclui um pagamento do lote (aprovado ou rejeitado)"""
+        self._em_lote.discard(channel_id)
+        self.journal.delete_payment(channel_id)
+
+    def restore(self, guild_id, channel_id, pagamento):
+        """Devolve à fila um pagamento cujo lote falhou (ou que ainda não estava)"""
+        self._em_lote.discard(channel_id)
+        pagamento.setdefault('pedido_ms', int(time.time() * 1000))
+        fila = self._filas.setdefault(guild_id, {})
+        fila[channel_id] = pagamento
+        self.journal.save_payment(channel_id, guild_id, pagamento)
+        # Mantém a ordem de chegada depois de reinserir
+        self._filas[guild_id] = dict(
+            sorted(fila.items(), key=lambda item: item[1].get('pedido_ms', 0))
+        )
+        self._sujos.add(guild_id)
+        self._atualizar_metricas()
+
+    def summary_message(self, guild_id):
+        """(owner_id, channel_id, message_id) do resumo do servidor, ou None"""
+        return self._resumos.get(guild_id)
+
+    def set_summary_message(self, guild_id, owner_id, channel_id, message_id):
+        self._resumos[guild_id] = (owner_id, channel_id, message_id)
+        self.journal.save_payment_summary(guild_id, owner_id, channel_id, message_id)
+
+    def mark_dirty(self, guild_id):
+        self._sujos.add(guild_id)
+
+    def dirty(self):
+        """Servidores cujo resumo precisa ser reeditado (e limpa a marca)"""
+        sujos, self._sujos = self._sujos, set()
+        return sujos
+
+    def _atualizar_metricas(self):
+        metrics.set_gauge('payments_pending', len(self))
+        metrics.set_gauge('payments_in_batch', len(self._em_lote))
@@ -0,0 +1,86 @@
+"""Resolução de usuários com cache, evitando `fetch_user` repetidos"""
+import asyncio
+import collections
+import time
+
+import discord
+
+import metrics
+from single_flight import SingleFlight
+
+class UserResolver:
+    """Resolve ids de usuário em objetos do Discord
+
+    Ordem de busca: membro no cache do servidor, usuário no cache do
+    gateway, cache LRU local com TTL e, por último, `fetch_user` com
+    concorrência limitada. Ids inexistentes também ficam no cache local
+    para não repetir a requisição.
+    """
+
+    def __init__(self, client, maxsize=2000, ttl=300.0, concorrencia=5):
+        self.client = client
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._cache = collections.OrderedDict()
+        self.concorrencia = concorrencia
+        self._semaforo = None
+        self._em_andamento = SingleFlight()
+
+    def get_cached(self, user_id, guild=None):
+        """Busca sem fazer requisições; retorna (encontrado, usuário)"""
+        if guild is not None:
+            member = guild.get_member(user_id)
+            if member is not None:
+                metrics.inc('user_resolver_total', origem='guild')
+                return True, member
+        user = self.client.get_user(user_id)
+        if user is not None:
+            metrics.inc('user_resolver_total', origem='gateway')
+            return True, user
+
+        item = self._cache.get(user_id)
+        if item is not None:
+            expira, user = item
+            if expira > time.monotonic():
+                self._cache.move_to_end(user_id)
+                metrics.inc('user_resolver_total', origem='lru')
+                return True, user
+            del self._cache[user_id]
+        return False, None
+
+    async def resolve(self, user_id, guild=None):
+        """Resolve um usuário; retorna None se ele não existir"""
+        encontrado, user = self.get_cached(user_id, guild)
+        if encontrado:
+            return user
+
+        # Cliques simultâneos para o mesmo id compartilham o mesmo fetch
+        user, _ = await self._em_andamento.run(user_id, lambda: self._buscar(user_id))
+        return user
+
+    async def resolve_many(self, user_ids, guild=None):
+        """Resolve vários usuários em paralelo; retorna {id: usuário ou None}"""
+        user_ids = list(dict.fromkeys(user_ids))
+        resultados = await asyncio.gather(
+            *(self.resolve(uid, guild) for uid in user_ids)
+        )
+        return dict(zip(user_ids, resultados))
+
+    async def _buscar(self, user_id):
+        metrics.inc('user_resolver_total', origem='fetch')
+        if self._semaforo is None:
+            # Criado sob demanda para ficar preso ao loop que está rodando
+            self._semaforo = asyncio.Semaphore(self.concorrencia)
+        async with self._semaforo:
+            try:
+                user = await self.client.fetch_user(user_id)
+            except discord.NotFound:
+                user = None
+        self._guardar(user_id, user)
+        return user
+
+    def _guardar(self, user_id, user):
+        self._cache[user_id] = (time.monotonic() + self.ttl, user)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
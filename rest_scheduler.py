@@ -0,0 +1,242 @@
+"""Agendador central das chamadas REST de saída
+
+Cada chamada entra na fila de um bucket (tipo de rota + id principal, como
+o Discord agrupa os rate limits) e é liberada por um token bucket local.
+Trabalho de interação passa na frente de trabalho normal, que passa na
+frente de trabalho em segundo plano (DMs, reabastecimento do pool). Quando
+o orçamento do bucket está baixo, o segundo plano espera; quando a fila de
+segundo plano enche, novos jobs são descartados.
+
+O rate limit de verdade continua com o discord.py, que lê os cabeçalhos
+de cada resposta. Os orçamentos daqui são só consultivos: servem para
+ordenar as filas e guardar reserva para o trabalho interativo, e vêm
+folgados para não empilhar uma segunda espera sobre a da biblioteca. Um
+429 que chegue até aqui (com `retry_after`) corta o orçamento do bucket
+pela metade e pausa a rota; cada sucesso devolve aos poucos o orçamento
+configurado. Os valores são ajustáveis por `limites` (em `main.py`, pela
+variável REST_LIMITES).
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+import discord
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+INTERACAO = 0
+NORMAL = 1
+SEGUNDO_PLANO = 2
+
+NOMES_PRIORIDADE = {
+    INTERACAO: 'interacao', NORMAL: 'normal', SEGUNDO_PLANO: 'segundo_plano',
+}
+
+# (requisições, janela em segundos) por tipo de rota; consultivos, não os do Discord.
+# Só o envio de mensagens segue o limite conhecido (5 a cada 5 s por canal)
+LIMITES = {
+    'channel.send': (5, 5.0),
+    'message.edit': (5, 5.0),
+}
+LIMITE_PADRAO = (50, 5.0)
+# Espera usada quando um 429 não informa `retry_after`
+RETRY_AFTER_PADRAO = 1.0
+MAX_BUCKETS = 1000
+
+def parse_limites(texto):
+    """Converte 'member.add_roles=10/10,channel.send=5/5' em {rota: (limite, janela)}"""
+    limites = {}
+    for parte in texto.split(','):
+        if not parte.strip():
+            continue
+        tipo, _, valor = parte.partition('=')
+        requisicoes, _, janela = valor.partition('/')
+        limites[tipo.strip()] = (int(requisicoes), float(janela or 1.0))
+    return limites
+
+class Descartado(Exception):
+    """Job de baixa prioridade descartado por falta de orçamento"""
+
+class _Job:
+    __slots__ = ('prioridade', 'seq', 'factory', 'future', 'criado')
+
+    def __init__(self, prioridade, seq, factory, future):
+        self.prioridade = prioridade
+        self.seq = seq
+        self.factory = factory
+        self.future = future
+        self.criado = time.perf_counter()
+
+    def __lt__(self, outro):
+        return (self.prioridade, self.seq) < (outro.prioridade, outro.seq)
+
+class _Bucket:
+    __slots__ = ('tipo', 'limite', 'janela', 'capacidade', 'taxa', 'tokens',
+                 'atualizado', 'fila', 'workers', 'segundo_plano')
+
+    def __init__(self, tipo, limite, janela):
+        self.tipo = tipo
+        self.limite = limite
+        self.janela = janela
+        self.capacidade = float(limite)
+        self.taxa = limite / janela
+        self.tokens = float(limite)
+        self.atualizado = time.monotonic()
+        self.fila = []
+        self.workers = 0
+        self.segundo_plano = 0
+
+    def espera(self, prioridade, reserva):
+        """Segundos até poder liberar um job dessa prioridade"""
+        agora = time.monotonic()
+        recompostos = (agora - self.atualizado) * self.taxa
+        self.tokens = min(self.capacidade, self.tokens + recompostos)
+        self.atualizado = agora
+        necessario = 1 + (reserva if prioridade == SEGUNDO_PLANO else 0)
+        if self.tokens >= necessario:
+            return 0.0
+        return (necessario - self.tokens) / self.taxa
+
+    def penalizar(self, retry_after):
+        """429 observado: metade do orçamento e nada liberado por `retry_after` s"""
+        self.capacidade = max(1.0, self.capacidade / 2)
+        self.taxa = self.capacidade / self.janela
+        self.tokens = min(self.tokens, 0.0) - retry_after * self.taxa
+
+    def recuperar(self):
+        """Sucesso: o orçamento volta ao configurado, cerca de uma janela por unidade"""
+        if self.capacidade < self.limite:
+            self.capacidade = min(
+                float(self.limite), self.capacidade + 1 / self.capacidade
+            )
+            self.taxa = self.capacidade / self.janela
+
+class RestScheduler:
+    """Filas por rota com prioridade, orçamento e métricas"""
+
+    def __init__(self, limites=None, concorrencia=2, reserva=1, max_segundo_plano=50):
+        self.limites = dict(LIMITES, **(limites or {}))
+        self.concorrencia = concorrencia
+        self.reserva = reserva
+        self.max_segundo_plano = max_segundo_plano
+        self._buckets = {}
+        self._profundidade = {}
+        self._seq = itertools.count()
+
+    def submit(self, tipo, chave, factory, prioridade=NORMAL):
+        """Enfileira `factory()` e devolve um Future com o resultado"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        bucket = self._buckets.get((tipo, chave))
+        if bucket is None:
+            if len(self._buckets) >= MAX_BUCKETS:
+                self._limpar_ociosos()
+            limite, janela = self.limites.get(tipo, LIMITE_PADRAO)
+            bucket = self._buckets[(tipo, chave)] = _Bucket(tipo, limite, janela)
+
+        if prioridade == SEGUNDO_PLANO:
+            if bucket.segundo_plano >= self.max_segundo_plano:
+                metrics.inc('rest_shed_total', rota=tipo)
+                future.set_exception(Descartado(tipo))
+                return future
+            bucket.segundo_plano += 1
+
+        heapq.heappush(bucket.fila, _Job(prioridade, next(self._seq), factory, future))
+        self._alterar_profundidade(tipo, 1)
+        if bucket.workers < self.concorrencia:
+            bucket.workers += 1
+            loop.create_task(self._worker(bucket))
+        return future
+
+    async def run(self, tipo, chave, factory, prioridade=NORMAL):
+        """Enfileira `factory()` e espera o resultado"""
+        return await self.submit(tipo, chave, factory, prioridade)
+
+    def fire(self, tipo, chave, factory, prioridade=SEGUNDO_PLANO, contexto=""):
+        """Enfileira sem esperar; erros são apenas reportados"""
+        future = self.submit(tipo, chave, factory, prioridade)
+        future.add_done_callback(lambda f: _reportar_erro(f, contexto or tipo))
+        return future
+
+    def depth(self, tipo=None):
+        """Jobs aguardando na fila (de um tipo de rota ou de todos)"""
+        if tipo is None:
+            return sum(self._profundidade.values())
+        return self._profundidade.get(tipo, 0)
+
+    def _limpar_ociosos(self):
+        # Um bucket ocioso, sem 429 recente e com orçamento cheio equivale a um novo
+        for chave, bucket in list(self._buckets.items()):
+            if bucket.fila or bucket.workers or bucket.espera(NORMAL, 0) > 0:
+                continue
+            cheio = bucket.tokens >= bucket.capacidade
+            if cheio and bucket.capacidade >= bucket.limite:
+                del self._buckets[chave]
+
+    def _alterar_profundidade(self, tipo, delta):
+        self._profundidade[tipo] = self._profundidade.get(tipo, 0) + delta
+        metrics.set_gauge('rest_queue_depth', self._profundidade[tipo], rota=tipo)
+
+    async def _worker(self, bucket):
+        try:
+            while bucket.fila:
+                espera = bucket.espera(bucket.fila[0].prioridade, self.reserva)
+                if espera > 0:
+                    await asyncio.sleep(espera)
+                    continue
+
+                job = heapq.heappop(bucket.fila)
+                self._alterar_profundidade(bucket.tipo, -1)
+                if job.prioridade == SEGUNDO_PLANO:
+                    bucket.segundo_plano -= 1
+                if job.future.cancelled():
+                    continue
+
+                bucket.tokens -= 1
+                metrics.observe('rest_queue_wait_seconds',
+                                time.perf_counter() - job.criado,
+                                prioridade=NOMES_PRIORIDADE[job.prioridade])
+                metrics.inc('rest_calls_total', rota=bucket.tipo)
+                try:
+                    resultado = await job.factory()
+                except Exception as e:
+                    retry_after = _retry_after(e)
+                    if retry_after is not None:
+                        metrics.inc('rest_429_total', rota=bucket.tipo)
+                        bucket.penalizar(retry_after)
+                        metrics.set_gauge('rest_bucket_capacity', bucket.capacidade,
+                                          rota=bucket.tipo)
+                        log.warning("429 em %s: orçamento reduzido para %.1f/%gs, "
+                                    "pausa de %.1fs", bucket.tipo, bucket.capacidade,
+                                    bucket.janela, retry_after)
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                else:
+                    if bucket.capacidade < bucket.limite:
+                        bucket.recuperar()
+                        metrics.set_gauge('rest_bucket_capacity', bucket.capacidade,
+                                          rota=bucket.tipo)
+                    if not job.future.done():
+                        job.future.set_result(resultado)
+        finally:
+            bucket.workers -= 1
+
+def _retry_after(erro):
+    """Segundos de espera pedidos por um 429 (None se o erro não for 429)"""
+    if isinstance(erro, discord.RateLimited):
+        return erro.retry_after
+    if not isinstance(erro, discord.HTTPException) or erro.status != 429:
+        return None
+    cabecalhos = getattr(erro.response, 'headers', None) or {}
+    try:
+        return float(cabecalhos.get('Retry-After', RETRY_AFTER_PADRAO))
+    except (TypeError, ValueError):
+        return RETRY_AFTER_PADRAO
+
+def _reportar_erro(future, contexto):
+    if not future.cancelled() and future.exception() is not None:
+        log.error("Erro em %s", contexto, exc_info=future.exception())
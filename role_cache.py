@@ -0,0 +1,119 @@
+"""Índice de cargos por nome, com criação única e aplicação em lote"""
+import asyncio
+
+import metrics
+from rest_scheduler import NORMAL
+from single_flight import SingleFlight
+
+class RoleCache:
+    """Mantém nome -> cargo por servidor, atualizado pelos eventos do gateway
+
+    O índice de um servidor é montado na primeira consulta (uma passada em
+    `guild.roles`) e depois só muda pelos eventos `on_guild_role_*`. Com
+    nomes repetidos vale o primeiro cargo de `guild.roles`, como em
+    `discord.utils.get`.
+    """
+
+    def __init__(self, rest, concorrencia=5):
+        self.rest = rest
+        self.concorrencia = concorrencia
+        self._indices = {}
+        self._criacoes = SingleFlight()
+
+    def get(self, guild, nome):
+        cargo = self._indice(guild).get(nome)
+        resultado = 'hit' if cargo is not None else 'miss'
+        metrics.inc('role_cache_total', resultado=resultado)
+        return cargo
+
+    async def get_or_create(self, guild, nome, **opcoes):
+        """Busca o cargo pelo nome ou cria; criações simultâneas viram uma só"""
+        cargo = self.get(guild, nome)
+        if cargo is not None:
+            return cargo
+        cargo, _ = await self._criacoes.run(
+            (guild.id, nome), lambda: self._criar(guild, nome, opcoes)
+        )
+        return cargo
+
+    async def add_to_members(self, guild, cargo, members, prioridade=NORMAL):
+        """Aplica o cargo a vários membros pela fila REST, com concorrência limitada
+
+        Devolve {member_id: None ou a exceção da falha}.
+        """
+        semaforo = asyncio.Semaphore(self.concorrencia)
+
+        async def aplicar(member):
+            async with semaforo:
+                try:
+                    if cargo not in member.roles:
+                        await self.rest.run(
+                            'member.add_roles', guild.id,
+                            lambda: member.add_roles(cargo), prioridade
+                        )
+                    return member.id, None
+                except Exception as e:
+                    return member.id, e
+
+        resultados = dict(
+            await asyncio.gather(*(aplicar(member) for member in members))
+        )
+        falhas = sum(1 for erro in resultados.values() if erro is not None)
+        metrics.inc('role_apply_total', len(resultados) - falhas, resultado='ok')
+        if falhas:
+            metrics.inc('role_apply_total', falhas, resultado='erro')
+        return resultados
+
+    def on_create(self, cargo):
+        indice = self._indices.get(cargo.guild.id)
+        if indice is not None:
+            indice.setdefault(cargo.name, cargo)
+
+    def on_update(self, antes, depois):
+        indice = self._indices.get(depois.guild.id)
+        if indice is None:
+            return
+        if antes.name != depois.name:
+            self._remover(depois.guild, indice, antes.name, depois.id)
+        if indice.get(depois.name) is None or indice[depois.name].id == depois.id:
+            indice[depois.name] = depois
+
+    def on_delete(self, cargo):
+        indice = self._indices.get(cargo.guild.id)
+        if indice is not None:
+            self._remover(cargo.guild, indice, cargo.name, cargo.id)
+
+    def forget(self, guild_id):
+        self._indices.pop(guild_id, None)
+
+    def _indice(self, guild):
+        indice = self._indices.get(guild.id)
+        if indice is None:
+            indice = self._indices[guild.id] = {}
+            for cargo in guild.roles:
+                indice.setdefault(cargo.name, cargo)
+        return indice
+
+    def _remover(self, guild, indice, nome, role_id):
+        atual = indice.get(nome)
+        if atual is None or atual.id != role_id:
+            return
+        del indice[nome]
+        # Outro cargo com o mesmo nome passa a valer (raro: só com nomes repetidos)
+        for cargo in guild.roles:
+            if cargo.name == nome and cargo.id != role_id:
+                indice[nome] = cargo
+                break
+
+    async def _criar(self, guild, nome, opcoes):
+        # Outro clique pode ter criado o cargo enquanto este esperava
+        cargo = self._indice(guild).get(nome)
+        if cargo is not None:
+            return cargo
+        cargo = await self.rest.run(
+            'guild.create_role', guild.id,
+            lambda: guild.create_role(name=nome, **opcoes), NORMAL
+        )
+        metrics.inc('role_created_total')
+        self._indice(guild).setdefault(nome, cargo)
+        return cargo
@@ -0,0 +1,160 @@
+"""Agenda de expiração dos cargos comprados via PIX
+
+O journal guarda todas as expirações (tabela `expiracoes`, indexada pela
+data) e é a fonte da verdade. Em memória fica só uma janela das próximas
+horas em um min-heap, recarregada por consulta de intervalo quando o
+tempo avança; então o custo de cada ciclo é O(k log n) para os k cargos
+vencidos, sem varrer as assinaturas ativas.
+
+Com vários processos, cada um carrega só os servidores dos seus shards.
+Um servidor que o bot deixou sai da memória, mas as linhas ficam no
+journal: se o bot voltar, `restore` as traz de volta.
+"""
+import heapq
+import time
+
+import metrics
+
+JANELA = 6 * 3600
+# Espera entre tentativas de remover um cargo (dobra a cada falha)
+REPETIR = 300
+REPETIR_MAX = 6 * 3600
+
+class RoleExpiry:
+    """Min-heap das expirações próximas, apoiado no journal"""
+
+    def __init__(self, journal, janela=JANELA):
+        self.journal = journal
+        self.janela = janela
+        self._heap = []
+        # (guild_id, user_id, role_id) -> expira_em das entradas válidas do heap
+        self._carregados = {}
+        self._carregado_ate = None
+        # Chaves alteradas e servidores esquecidos enquanto uma carga está em andamento
+        self._alterados = None
+        self._esquecidos = None
+        # Servidores que o bot deixou, e tentativas seguidas de cada chave
+        self._ausentes = set()
+        self._tentativas = {}
+        self._shards = (None, None)
+
+    def __len__(self):
+        return len(self._carregados)
+
+    async def load(self, agora=None, shard_count=None, shard_ids=None):
+        """Carrega as vencidas e as que vencem na janela (dos shards informados)"""
+        agora = agora or time.time()
+        self._shards = (shard_count, shard_ids)
+        self._heap = []
+        self._carregados = {}
+        self._carregado_ate = None
+        await self._carregar(agora + self.janela)
+
+    async def schedule(self, guild_id, user_id, role_id, expira_em):
+        """Grava (ou renova) a expiração de um cargo"""
+        chave = (guild_id, user_id, role_id)
+        self.journal.save_expiry(guild_id, user_id, role_id, expira_em)
+        self._tentativas.pop(chave, None)
+        if self._alterados is not None:
+            self._alterados.add(chave)
+        if self._carregado_ate is not None and expira_em <= self._carregado_ate:
+            self._empilhar(expira_em, chave)
+        else:
+            # Fora da janela: a entrada antiga no heap (se houver) vira lixo
+            self._carregados.pop(chave, None)
+        metrics.set_gauge('role_expiry_loaded', len(self._carregados))
+
+    async def expires_at(self, guild_id, user_id, role_id):
+        """Expiração atual do cargo (timestamp) ou None"""
+        expira_em = self._carregados.get((guild_id, user_id, role_id))
+        if expira_em is None:
+            expira_em = await self.journal.expiry(guild_id, user_id, role_id)
+        return expira_em
+
+    async def due(self, agora=None, limite=100):
+        """Retira do heap até `limite` expirações vencidas
+
+        Devolve uma lista de (expira_em, guild_id, user_id, role_id). Cada
+        uma deve terminar em `done` ou em `retry`.
+        """
+        agora = agora or time.time()
+        if self._carregado_ate is None or agora + self.janela / 2 > self._carregado_ate:
+            await self._carregar(agora + self.janela)
+
+        vencidos = []
+        while self._heap and self._heap[0][0] <= agora and len(vencidos) < limite:
+            expira_em, guild_id, user_id, role_id = heapq.heappop(self._heap)
+            chave = (guild_id, user_id, role_id)
+            if self._carregados.get(chave) != expira_em:
+                continue  # renovada ou cancelada depois de empilhada
+            del self._carregados[chave]
+            vencidos.append((expira_em, guild_id, user_id, role_id))
+        metrics.set_gauge('role_expiry_loaded', len(self._carregados))
+        return vencidos
+
+    def done(self, expira_em, guild_id, user_id, role_id):
+        """Remove a expiração processada (se não tiver sido renovada)"""
+        self._tentativas.pop((guild_id, user_id, role_id), None)
+        self.journal.delete_expiry(guild_id, user_id, role_id, expira_em)
+        metrics.inc('role_expiry_total', resultado='ok')
+
+    async def retry(self, guild_id, user_id, role_id):
+        """Tenta de novo mais tarde (espera crescente); a assinatura fica no journal"""
+        chave = (guild_id, user_id, role_id)
+        tentativas = self._tentativas.get(chave, 0)
+        metrics.inc('role_expiry_total', resultado='retry')
+        espera = min(REPETIR * 2 ** tentativas, REPETIR_MAX)
+        await self.schedule(guild_id, user_id, role_id, time.time() + espera)
+        self._tentativas[chave] = tentativas + 1
+
+    def forget(self, guild_id):
+        """Tira da memória as expirações de um servidor (o bot saiu dele)
+
+        As linhas continuam no journal; `restore` as recarrega se o bot voltar.
+        """
+        self._ausentes.add(guild_id)
+        if self._esquecidos is not None:
+            self._esquecidos.add(guild_id)
+        for chave in [chave for chave in self._carregados if chave[0] == guild_id]:
+            del self._carregados[chave]  # as entradas do heap viram lixo
+            self._tentativas.pop(chave, None)
+        metrics.set_gauge('role_expiry_loaded', len(self._carregados))
+
+    async def restore(self, guild_id):
+        """Recarrega da janela as expirações de um servidor (o bot voltou a ele)"""
+        if guild_id not in self._ausentes:
+            return
+        self._ausentes.discard(guild_id)
+        if self._carregado_ate is None:
+            return  # A carga inicial ainda vai ler o servidor
+        linhas = await self.journal.expiries(
+            None, self._carregado_ate, guild_id=guild_id
+        )
+        for expira_em, _, user_id, role_id in linhas:
+            chave = (guild_id, user_id, role_id)
+            if chave not in self._carregados and guild_id not in self._ausentes:
+                self._empilhar(expira_em, chave)
+        metrics.set_gauge('role_expiry_loaded', len(self._carregados))
+
+    async def _carregar(self, ate):
+        # A janela avança antes da consulta: o que for agendado durante a
+        # espera já entra direto no heap e não pode ser sobrescrito pelo
+        # valor antigo que a consulta devolver
+        depois, self._carregado_ate = self._carregado_ate, ate
+        self._alterados = set()
+        self._esquecidos = set()
+        try:
+            linhas = await self.journal.expiries(depois, ate, *self._shards)
+        finally:
+            alterados, self._alterados = self._alterados, None
+            esquecidos, self._esquecidos = self._esquecidos, None
+        for expira_em, guild_id, user_id, role_id in linhas:
+            chave = (guild_id, user_id, role_id)
+            if chave in alterados or guild_id in esquecidos:
+                continue
+            if guild_id not in self._ausentes:
+                self._empilhar(expira_em, chave)
+
+    def _empilhar(self, expira_em, chave):
+        self._carregados[chave] = expira_em
+        heapq.heappush(self._heap, (expira_em, *chave))
@@ -0,0 +1,33 @@
+"""Agrupamento de chamadas concorrentes com a mesma chave"""
+import asyncio
+
+class SingleFlight:
+    """Garante uma única execução em andamento por chave
+
+    Quem chama `run` enquanto já existe uma execução para a mesma chave
+    apenas espera o resultado dela, em vez de repetir o trabalho.
+    """
+
+    def __init__(self):
+        self._voos = {}
+
+    def __contains__(self, chave):
+        return chave in self._voos
+
+    def __len__(self):
+        return len(self._voos)
+
+    async def run(self, chave, factory):
+        """Executa `factory()` ou espera a execução em andamento
+
+        Retorna (resultado, compartilhado); `compartilhado` é True para quem
+        reaproveitou a execução de outra chamada.
+        """
+        futuro = self._voos.get(chave)
+        compartilhado = futuro is not None
+        if futuro is None:
+            futuro = asyncio.ensure_future(factory())
+            self._voos[chave] = futuro
+            futuro.add_done_callback(lambda _: self._voos.pop(chave, None))
+        # shield: cancelar quem espera não cancela a execução dos outros
+        return await asyncio.shield(futuro), compartilhado
@@ -0,0 +1,177 @@
+"""Estado compartilhado entre shards/processos
+
+A interface usa só primitivas de chave-valor atômicas (como INCR e SETNX
+do Redis), então qualquer armazenamento com essas operações pode ser
+plugado. `SQLiteBackend` é o padrão (arquivo compartilhado entre
+processos) e `MemoryBackend` serve para um único processo e para testes.
+"""
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+class StateBackend:
+    """Interface do estado compartilhado"""
+
+    async def incr(self, chave):
+        """Incrementa atomicamente um contador e devolve o novo valor"""
+        raise NotImplementedError
+
+    async def claim(self, chave, valor):
+        """Grava `valor` se a chave não existir; devolve True se gravou"""
+        raise NotImplementedError
+
+    async def get(self, chave):
+        """Valor atual da chave (ou None)"""
+        raise NotImplementedError
+
+    async def set(self, chave, valor):
+        """Grava `valor` incondicionalmente"""
+        raise NotImplementedError
+
+    async def release(self, chave, valor=None):
+        """Apaga a chave; com `valor`, só apaga se ela ainda tiver esse valor"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class MemoryBackend(StateBackend):
+    """Estado em memória do próprio processo"""
+
+    def __init__(self):
+        self._dados = {}
+
+    async def incr(self, chave):
+        valor = int(self._dados.get(chave, 0)) + 1
+        self._dados[chave] = str(valor)
+        return valor
+
+    async def claim(self, chave, valor):
+        if chave in self._dados:
+            return False
+        self._dados[chave] = str(valor)
+        return True
+
+    async def get(self, chave):
+        return self._dados.get(chave)
+
+    async def set(self, chave, valor):
+        self._dados[chave] = str(valor)
+
+    async def release(self, chave, valor=None):
+        if valor is None or self._dados.get(chave) == str(valor):
+            self._dados.pop(chave, None)
+
+class SQLiteBackend(StateBackend):
+    """Estado em uma tabela SQLite compartilhada entre processos
+
+    Cada operação é uma transação `BEGIN IMMEDIATE`, que serializa os
+    escritores de todos os processos no mesmo arquivo.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="state-backend"
+        )
+
+    def _conexao(self):
+        if self._conn is None:
+            conn = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None, timeout=30
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS estado "
+                "(chave TEXT PRIMARY KEY, valor TEXT NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    async def _rodar(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _transacao(self, func, *args):
+        conn = self._conexao()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            resultado = func(conn, *args)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return resultado
+
+    @staticmethod
+    def _incr(conn, chave):
+        row = conn.execute(
+            "SELECT valor FROM estado WHERE chave = ?", (chave,)
+        ).fetchone()
+        valor = int(row[0]) + 1 if row else 1
+        conn.execute(
+            "INSERT OR REPLACE INTO estado (chave, valor) VALUES (?, ?)",
+            (chave, str(valor))
+        )
+        return valor
+
+    @staticmethod
+    def _claim(conn, chave, valor):
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO estado (chave, valor) VALUES (?, ?)",
+            (chave, str(valor))
+        )
+        return cursor.rowcount == 1
+
+    @staticmethod
+    def _get(conn, chave):
+        row = conn.execute(
+            "SELECT valor FROM estado WHERE chave = ?", (chave,)
+        ).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _set(conn, chave, valor):
+        conn.execute(
+            "INSERT OR REPLACE INTO estado (chave, valor) VALUES (?, ?)",
+            (chave, str(valor))
+        )
+
+    @staticmethod
+    def _release(conn, chave, valor):
+        if valor is None:
+            conn.execute("DELETE FROM estado WHERE chave = ?", (chave,))
+        else:
+            conn.execute(
+                "DELETE FROM estado WHERE chave = ? AND valor = ?", (chave, str(valor))
+            )
+
+    async def incr(self, chave):
+        return await self._rodar(self._transacao, self._incr, chave)
+
+    async def claim(self, chave, valor):
+        return await self._rodar(self._transacao, self._claim, chave, valor)
+
+    async def get(self, chave):
+        return await self._rodar(self._transacao, self._get, chave)
+
+    async def set(self, chave, valor):
+        await self._rodar(self._transacao, self._set, chave, valor)
+
+    async def release(self, chave, valor=None):
+        await self._rodar(self._transacao, self._release, chave, valor)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+def criar_backend(tipo, path):
+    """Cria o backend pelo nome ('sqlite' ou 'memoria')"""
+    if tipo == 'memoria':
+        return MemoryBackend()
+    if tipo == 'sqlite':
+        return SQLiteBackend(path)
+    raise ValueError(f"Backend de estado desconhecido: {tipo}")
@@ -0,0 +1,212 @@
+"""Logs estruturados (JSON por linha) com a escrita fora do event loop
+
+O handler da raiz é um `QueueHandler`: no loop, cada registro só ganha o
+contexto da interação e entra em uma fila; a formatação (inclusive do
+traceback) e a escrita no stdout acontecem na thread do `QueueListener`.
+O contexto (servidor, usuário, canal, custom_id, handler) fica em um
+`ContextVar`, então as tarefas criadas durante a interação (como o
+trabalho de `reconhecer`) herdam os campos sem recebê-los por parâmetro.
+
+Erros repetidos são amostrados: cada combinação de logger, mensagem
+(o modelo, antes dos argumentos) e classe da exceção passa no máximo
+`limite` vezes por janela; o próximo registro que passar informa quantos
+foram suprimidos.
+"""
+import atexit
+import contextvars
+import functools
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+import traceback
+import types
+
+import metrics
+
+# Só é trocado (set/reset), nunca alterado: o padrão vazio é somente leitura
+contexto = contextvars.ContextVar('contexto_log', default=types.MappingProxyType({}))
+
+# Atributos padrão de LogRecord: o resto (passado em `extra`) vira campo do JSON
+_PADRAO = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {
+    'message', 'asctime', 'contexto', 'suprimidos',
+}
+
+def campos_interacao(interaction):
+    """Campos de contexto de uma interação (real ou falsa)"""
+    channel = getattr(interaction, 'channel', None)
+    user = getattr(interaction, 'user', None)
+    dados = getattr(interaction, 'data', None) or {}
+    campos = {
+        'guild_id': getattr(interaction, 'guild_id', None),
+        'user_id': getattr(user, 'id', None),
+        'channel_id': (
+            getattr(interaction, 'channel_id', None) or getattr(channel, 'id', None)
+        ),
+        'custom_id': dados.get('custom_id'),
+    }
+    return {chave: valor for chave, valor in campos.items() if valor is not None}
+
+def _interacao(args):
+    for arg in args:
+        if hasattr(arg, 'response') and hasattr(arg, 'user'):
+            return arg
+    return None
+
+def handler(nome, log=None):
+    """Decorador dos handlers de interação: contexto, latência e métricas
+
+    Inclui `metrics.timed('handler', handler=nome)` e registra uma linha
+    por execução com a latência do handler; falhas saem com a exceção.
+    """
+    log = log or logging.getLogger('handler')
+
+    def decorador(func):
+        medido = metrics.timed('handler', handler=nome)(func)
+
+        @functools.wraps(func)
+        async def registrado(*args, **kwargs):
+            interaction = _interacao(args)
+            campos = dict(contexto.get(), handler=nome)
+            if interaction is not None:
+                campos.update(campos_interacao(interaction))
+            token = contexto.set(campos)
+            inicio = time.perf_counter()
+            try:
+                retorno = await medido(*args, **kwargs)
+            except Exception:
+                latencia = round((time.perf_counter() - inicio) * 1000, 3)
+                log.exception("Erro no handler %s", nome,
+                              extra={'latencia_ms': latencia})
+                raise
+            else:
+                latencia = round((time.perf_counter() - inicio) * 1000, 3)
+                log.info("Handler %s concluído", nome,
+                         extra={'latencia_ms': latencia})
+                return retorno
+            finally:
+                contexto.reset(token)
+        return registrado
+    return decorador
+
+class ContextoFilter(logging.Filter):
+    """Copia o contexto atual para o registro (roda no loop, antes da fila)"""
+
+    def filter(self, record):
+        record.contexto = contexto.get()
+        return True
+
+class Amostragem(logging.Filter):
+    """Deixa passar `limite` registros iguais por janela; conta o resto
+
+    Só amostra a partir de `nivel` (por padrão, WARNING): logs informativos
+    passam sempre.
+    """
+
+    def __init__(self, limite=5, janela=60.0, nivel=logging.WARNING):
+        super().__init__()
+        self.limite = limite
+        self.janela = janela
+        self.nivel = nivel
+        # chave -> [início da janela, registros na janela, suprimidos]
+        self._janelas = {}
+
+    def filter(self, record):
+        if record.levelno < self.nivel:
+            return True
+        excecao = None
+        if record.exc_info and record.exc_info[0]:
+            excecao = record.exc_info[0].__name__
+        mensagem = record.msg if isinstance(record.msg, str) else repr(record.msg)
+        chave = (record.name, mensagem, excecao)
+        agora = time.monotonic()
+        estado = self._janelas.get(chave)
+        if estado is None or agora - estado[0] >= self.janela:
+            if len(self._janelas) >= 1000:
+                self._esquecer(agora)
+            suprimidos = estado[2] if estado is not None else 0
+            estado = self._janelas[chave] = [agora, 0, 0]
+            if suprimidos:
+                record.suprimidos = suprimidos
+        estado[1] += 1
+        if estado[1] <= self.limite:
+            return True
+        estado[2] += 1
+        metrics.inc('log_suppressed_total', logger=record.name)
+        return False
+
+    def _esquecer(self, agora):
+        vencidas = [
+            chave for chave, estado in self._janelas.items()
+            if agora - estado[0] >= self.janela
+        ]
+        for chave in vencidas:
+            del self._janelas[chave]
+
+class _FilaHandler(logging.handlers.QueueHandler):
+    """QueueHandler que não formata no loop
+
+    O padrão formata a mensagem e o traceback antes de enfileirar; aqui só
+    a mensagem é resolvida (os argumentos podem mudar depois) e a exceção
+    segue para ser formatada na thread do listener.
+    """
+
+    def prepare(self, record):
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro"""
+
+    def format(self, record):
+        dados = {
+            'ts': round(record.created, 3),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        dados.update(getattr(record, 'contexto', None) or {})
+        for chave, valor in vars(record).items():
+            if chave not in _PADRAO:
+                dados[chave] = valor
+        if getattr(record, 'suprimidos', 0):
+            dados['suprimidos'] = record.suprimidos
+        if record.exc_info and record.exc_info[0] is not None:
+            dados['excecao'] = record.exc_info[0].__name__
+            dados['erro'] = str(record.exc_info[1])
+            linhas = traceback.format_exception(*record.exc_info)
+            dados['traceback'] = ''.join(linhas).rstrip()
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+def configurar(nivel='INFO', stream=None, limite=5, janela=60.0):
+    """Instala a fila na raiz e inicia o listener; devolve o listener
+
+    Os logs do discord.py passam pela mesma fila (use
+    `bot.run(..., log_handler=None)` para ele não instalar o próprio).
+    """
+    fila = queue.SimpleQueue()
+    saida = logging.StreamHandler(stream or sys.stdout)
+    saida.setFormatter(JsonFormatter())
+    listener = logging.handlers.QueueListener(fila, saida, respect_handler_level=True)
+
+    entrada = _FilaHandler(fila)
+    entrada.addFilter(ContextoFilter())
+    entrada.addFilter(Amostragem(limite, janela))
+    raiz = logging.getLogger()
+    for antigo in list(raiz.handlers):
+        raiz.removeHandler(antigo)
+    raiz.addHandler(entrada)
+    raiz.setLevel(nivel)
+
+    listener.start()
+    atexit.register(_parar, listener)
+    return listener
+
+def _parar(listener):
+    # Esvazia a fila na saída, se ninguém tiver parado o listener antes
+    if listener._thread is not None:
+        listener.stop()
@@ -0,0 +1,595 @@
+"""Persistência durável dos tickets em SQLite (modo WAL)
+
+O WAL do SQLite funciona como log append-only: cada mutação vira um commit
+sequencial no arquivo -wal e o checkpoint periódico compacta o log no
+banco principal (o snapshot). Todas as operações de escrita rodam em uma
+única thread dedicada, então a ordem das mutações é preservada sem travar
+o event loop.
+"""
+import asyncio
+import functools
+import json
+import logging
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+_TABELA = re.compile(r"\b(?:INTO|FROM|UPDATE)\s+(\w+)", re.IGNORECASE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    channel_id INTEGER PRIMARY KEY,
+    guild_id INTEGER,
+    user_id INTEGER,
+    status TEXT NOT NULL,
+    dados TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tickets_status ON tickets (status);
+CREATE TABLE IF NOT EXISTS meta (
+    chave TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ofertas (
+    oferta_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild_id INTEGER,
+    dados TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS estatisticas (
+    guild_id INTEGER PRIMARY KEY,
+    dados TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS expiracoes (
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    role_id INTEGER NOT NULL,
+    expira_em REAL NOT NULL,
+    PRIMARY KEY (guild_id, user_id, role_id)
+);
+CREATE INDEX IF NOT EXISTS expiracoes_expira_em ON expiracoes (expira_em);
+CREATE TABLE IF NOT EXISTS pagamentos (
+    channel_id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    dados TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS prazos (
+    channel_id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    tipo TEXT NOT NULL,
+    prazo REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS prazos_prazo ON prazos (prazo);
+CREATE TABLE IF NOT EXISTS numeracao (
+    guild_id INTEGER PRIMARY KEY,
+    ultimo INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS tickets_numero AFTER INSERT ON tickets
+WHEN json_extract(NEW.dados, '$.numero') IS NOT NULL
+BEGIN
+    INSERT INTO numeracao (guild_id, ultimo)
+    VALUES (NEW.guild_id, json_extract(NEW.dados, '$.numero'))
+    ON CONFLICT (guild_id) DO UPDATE SET ultimo = MAX(ultimo, excluded.ultimo);
+END;
+CREATE TABLE IF NOT EXISTS contagens (
+    guild_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    quantidade INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, status)
+);
+CREATE TRIGGER IF NOT EXISTS tickets_contagem_insert AFTER INSERT ON tickets
+BEGIN
+    INSERT INTO contagens (guild_id, status, quantidade)
+    VALUES (IFNULL(NEW.guild_id, 0), NEW.status, 1)
+    ON CONFLICT (guild_id, status) DO UPDATE SET quantidade = quantidade + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS tickets_contagem_delete AFTER DELETE ON tickets
+BEGIN
+    UPDATE contagens SET quantidade = quantidade - 1
+    WHERE guild_id = IFNULL(OLD.guild_id, 0) AND status = OLD.status;
+END;
+CREATE TRIGGER IF NOT EXISTS tickets_contagem_update
+AFTER UPDATE OF guild_id, status ON tickets
+WHEN IFNULL(OLD.guild_id, 0) != IFNULL(NEW.guild_id, 0) OR OLD.status != NEW.status
+BEGIN
+    UPDATE contagens SET quantidade = quantidade - 1
+    WHERE guild_id = IFNULL(OLD.guild_id, 0) AND status = OLD.status;
+    INSERT INTO contagens (guild_id, status, quantidade)
+    VALUES (IFNULL(NEW.guild_id, 0), NEW.status, 1)
+    ON CONFLICT (guild_id, status) DO UPDATE SET quantidade = quantidade + 1;
+END;
+CREATE TABLE IF NOT EXISTS decisoes (
+    decisao_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild_id INTEGER NOT NULL,
+    dados TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS resumos_pagamento (
+    guild_id INTEGER PRIMARY KEY,
+    owner_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    message_id INTEGER NOT NULL
+);
+"""
+
+# Prazo para cada ticket: os abertos podem expirar, os fechados podem ser apagados
+_REAGENDAR = (
+    "INSERT OR {} INTO prazos (channel_id, guild_id, tipo, prazo) "
+    "SELECT channel_id, guild_id, "
+    "CASE status WHEN 'aberto' THEN 'inativo' ELSE 'apagar' END, ? "
+    "FROM tickets WHERE guild_id IS NOT NULL"
+)
+# Retenção dos fechados de um servidor a partir do fechamento (str(datetime) local),
+# nunca antes de ?1; sem data legível, a partir de ?2
+_REAGENDAR_FECHADOS = (
+    "INSERT OR REPLACE INTO prazos (channel_id, guild_id, tipo, prazo) "
+    "SELECT channel_id, guild_id, 'apagar', MAX(COALESCE("
+    "(julianday(json_extract(dados, '$.fechado_em'), 'utc') - 2440587.5) * 86400, "
+    "?2), ?1) + ?3 "
+    "FROM tickets WHERE guild_id = ?4 AND status = 'fechado'"
+)
+
+# Contagens por (servidor, status) refeitas do zero; o servidor NULL vira 0
+_RECONTAR = (
+    "INSERT INTO contagens (guild_id, status, quantidade) "
+    "SELECT IFNULL(guild_id, 0), status, COUNT(*) FROM tickets GROUP BY 1, 2"
+)
+
+class TicketJournal:
+    """Log durável de tickets com carregamento preguiçoso
+
+    As gravações rodam na thread do journal; as consultas pontuais feitas
+    pelo event loop rodam em outra thread, na conexão de leitura, e não
+    esperam a fila de gravações.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._leitor = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="ticket-journal"
+        )
+        self._leituras = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="ticket-journal-leitura"
+        )
+
+    def _conectar(self):
+        conn = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def load(self):
+        """Abre o banco e devolve apenas o necessário para o boot
+
+        Retorna (tickets_abertos, contagens). Tickets fechados não são lidos
+        aqui; eles são buscados sob demanda por `lookup`. As contagens vêm da
+        tabela `contagens`, mantida por triggers a cada gravação, então o
+        boot lê os tickets abertos e uma linha por (servidor, status), não o
+        histórico. Só no primeiro boot com a tabela ela é preenchida a partir
+        dos tickets, uma única vez.
+        """
+        if self._conn is None:
+            self._conn = self._conectar()
+        self._preencher_contagens()
+        if self._leitor is None:
+            self._leitor = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None
+            )
+        conn = self._leitor
+        abertos = {
+            channel_id: json.loads(dados)
+            for channel_id, dados in conn.execute(
+                "SELECT channel_id, dados FROM tickets WHERE status = 'aberto'"
+            )
+        }
+        contagens = conn.execute(
+            "SELECT NULLIF(guild_id, 0), status, quantidade FROM contagens "
+            "WHERE quantidade > 0"
+        ).fetchall()
+        return abertos, contagens
+
+    def _preencher_contagens(self):
+        conn = self._conn
+        preenchida = "SELECT 1 FROM meta WHERE chave = 'contagens'"
+        if conn.execute(preenchida).fetchone():
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if not conn.execute(preenchida).fetchone():
+                conn.execute("DELETE FROM contagens")
+                conn.execute(_RECONTAR)
+                conn.execute("INSERT INTO meta (chave, valor) VALUES ('contagens', 1)")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    async def open(self):
+        """Versão assíncrona de `load`, executada fora do event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.load)
+
+    async def lookup(self, channel_id):
+        """Busca um ticket pelo canal (consulta por chave primária)
+
+        Roda na thread de leitura: no modo WAL ela não espera as gravações
+        em andamento na thread do journal (e pode não ver as ainda na fila).
+        """
+        row = await self._ler(
+            "SELECT dados FROM tickets WHERE channel_id = ?", (channel_id,)
+        )
+        return json.loads(row[0]) if row else None
+
+    def record(self, channel_id, ticket):
+        """Agenda a gravação de um ticket sem bloquear o event loop
+
+        É um UPSERT, não um REPLACE: o REPLACE apaga a linha antiga sem
+        disparar o trigger de remoção e dobraria as contagens.
+        """
+        dados = json.dumps(ticket, ensure_ascii=False, default=str)
+        return self._agendar(
+            self._executar,
+            "INSERT INTO tickets (channel_id, guild_id, user_id, status, dados) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (channel_id) DO UPDATE SET guild_id = excluded.guild_id, "
+            "user_id = excluded.user_id, status = excluded.status, "
+            "dados = excluded.dados",
+            (channel_id, ticket.get('guild_id'), ticket.get('user_id'),
+             ticket.get('status'), dados),
+        )
+
+    async def last_ticket_number(self, guild_id):
+        """Maior número de ticket já gravado no servidor (0 se nenhum)
+
+        A tabela `numeracao` é mantida por trigger junto de cada gravação e
+        não diminui quando o ticket é apagado. Roda na thread do journal,
+        depois das gravações já agendadas.
+        """
+        linhas = await self._agendar(
+            self._consultar,
+            "SELECT ultimo FROM numeracao WHERE guild_id = ?", (guild_id,)
+        )
+        return linhas[0][0] if linhas else 0
+
+    def forget(self, channel_id):
+        """Agenda a remoção de um ticket"""
+        return self._agendar(
+            self._executar, "DELETE FROM tickets WHERE channel_id = ?", (channel_id,)
+        )
+
+    async def add_offer(self, guild_id, oferta):
+        """Grava uma oferta da loja e devolve o id usado no botão Comprar"""
+        dados = json.dumps(oferta, ensure_ascii=False)
+        return await self._agendar(
+            self._executar,
+            "INSERT INTO ofertas (guild_id, dados) VALUES (?, ?)",
+            (guild_id, dados),
+        )
+
+    async def offer(self, oferta_id):
+        """Busca uma oferta da loja pelo id"""
+        row = await self._ler(
+            "SELECT dados FROM ofertas WHERE oferta_id = ?", (oferta_id,)
+        )
+        return json.loads(row[0]) if row else None
+
+    async def stats(self):
+        """Lista (guild_id, dados) das estatísticas salvas por servidor"""
+        linhas = await self._ler(
+            "SELECT guild_id, dados FROM estatisticas", (), todas=True
+        )
+        return [(guild_id, json.loads(dados)) for guild_id, dados in linhas]
+
+    def save_stats(self, guild_id, dados):
+        """Agenda a gravação das estatísticas de um servidor"""
+        return self._agendar(
+            self._executar,
+            "INSERT OR REPLACE INTO estatisticas (guild_id, dados) VALUES (?, ?)",
+            (guild_id, json.dumps(dados, separators=(',', ':'))),
+        )
+
+    async def expiries(self, depois, ate, shard_count=None, shard_ids=None,
+                       guild_id=None):
+        """Expirações com `depois < expira_em <= ate` (sem `depois`, até `ate`)
+
+        Filtra pelos shards (como `deadlines`) ou por um servidor. Roda na
+        thread do journal, depois das gravações já agendadas.
+        """
+        sql = (
+            "SELECT expira_em, guild_id, user_id, role_id FROM expiracoes "
+            "WHERE expira_em <= ?"
+        )
+        params = [ate]
+        if depois is not None:
+            sql += " AND expira_em > ?"
+            params.append(depois)
+        if guild_id is not None:
+            sql += " AND guild_id = ?"
+            params.append(guild_id)
+        filtro, params_filtro = _filtro_shards(shard_count, shard_ids)
+        return await self._agendar(
+            self._consultar, sql + filtro, (*params, *params_filtro)
+        )
+
+    async def expiry(self, guild_id, user_id, role_id):
+        """Data de expiração (timestamp) de um cargo, ou None"""
+        row = await self._ler(
+            "SELECT expira_em FROM expiracoes "
+            "WHERE guild_id = ? AND user_id = ? AND role_id = ?",
+            (guild_id, user_id, role_id),
+        )
+        return row[0] if row else None
+
+    def save_expiry(self, guild_id, user_id, role_id, expira_em):
+        """Agenda a gravação da expiração de um cargo"""
+        return self._agendar(
+            self._executar,
+            "INSERT OR REPLACE INTO expiracoes (guild_id, user_id, role_id, expira_em) "
+            "VALUES (?, ?, ?, ?)",
+            (guild_id, user_id, role_id, expira_em),
+        )
+
+    def delete_expiry(self, guild_id, user_id, role_id, expira_em):
+        """Agenda a remoção de uma expiração, se ela não foi renovada"""
+        return self._agendar(
+            self._executar,
+            "DELETE FROM expiracoes "
+            "WHERE guild_id = ? AND user_id = ? AND role_id = ? AND expira_em = ?",
+            (guild_id, user_id, role_id, expira_em),
+        )
+
+    async def payments(self, shard_count=None, shard_ids=None, guild_id=None):
+        """Lista (channel_id, guild_id, dados) dos pagamentos aguardando o dono
+
+        Filtra pelos shards (como `deadlines`) ou por um servidor.
+        """
+        sql = "SELECT channel_id, guild_id, dados FROM pagamentos WHERE 1"
+        params = ()
+        if guild_id is not None:
+            sql, params = sql + " AND guild_id = ?", (guild_id,)
+        filtro, params_filtro = _filtro_shards(shard_count, shard_ids)
+        linhas = await self._ler(sql + filtro, (*params, *params_filtro), todas=True)
+        return [
+            (channel_id, guild_id, json.loads(dados))
+            for channel_id, guild_id, dados in linhas
+        ]
+
+    def save_payment(self, channel_id, guild_id, pagamento):
+        """Agenda a gravação de um pagamento pendente"""
+        return self._agendar(
+            self._executar,
+            "INSERT OR REPLACE INTO pagamentos (channel_id, guild_id, dados) "
+            "VALUES (?, ?, ?)",
+            (channel_id, guild_id, json.dumps(pagamento, ensure_ascii=False)),
+        )
+
+    def delete_payment(self, channel_id):
+        """Agenda a remoção de um pagamento já decidido"""
+        return self._agendar(
+            self._executar, "DELETE FROM pagamentos WHERE channel_id = ?", (channel_id,)
+        )
+
+    async def payment_summaries(self, shard_count=None, shard_ids=None):
+        """Lista (guild_id, owner_id, channel_id, message_id) das mensagens de resumo"""
+        filtro, params = _filtro_shards(shard_count, shard_ids)
+        return await self._ler(
+            "SELECT guild_id, owner_id, channel_id, message_id "
+            f"FROM resumos_pagamento WHERE 1{filtro}",
+            params, todas=True
+        )
+
+    def save_payment_summary(self, guild_id, owner_id, channel_id, message_id):
+        """Agenda a gravação da mensagem de resumo enviada ao dono"""
+        return self._agendar(
+            self._executar,
+            "INSERT OR REPLACE INTO resumos_pagamento "
+            "(guild_id, owner_id, channel_id, message_id) VALUES (?, ?, ?, ?)",
+            (guild_id, owner_id, channel_id, message_id),
+        )
+
+    async def save_decision(self, guild_id, decisao):
+        """Grava a decisão do dono para o processo que tem o servidor aplicar
+
+        Espera a gravação: quando retorna, a decisão já está no banco.
+        """
+        return await self._agendar(
+            self._executar,
+            "INSERT INTO decisoes (guild_id, dados) VALUES (?, ?)",
+            (guild_id, json.dumps(decisao, ensure_ascii=False)),
+        )
+
+    async def take_decisions(self, shard_count=None, shard_ids=None, limite=50):
+        """Retira (guild_id, dados) das decisões dos servidores destes shards
+
+        Lê e apaga na mesma transação: com vários processos, cada decisão é
+        entregue a um só.
+        """
+        return await self._agendar(
+            self._retirar_decisoes, shard_count, shard_ids, limite
+        )
+
+    def _retirar_decisoes(self, shard_count, shard_ids, limite):
+        if self._conn is None:
+            self._conn = self._conectar()
+        conn = self._conn
+        filtro, params = _filtro_shards(shard_count, shard_ids)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            linhas = conn.execute(
+                "SELECT decisao_id, guild_id, dados FROM decisoes "
+                f"WHERE 1{filtro} ORDER BY decisao_id LIMIT ?",
+                (*params, limite),
+            ).fetchall()
+            conn.executemany(
+                "DELETE FROM decisoes WHERE decisao_id = ?",
+                [(linha[0],) for linha in linhas]
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return [(guild_id, json.loads(dados)) for _, guild_id, dados in linhas]
+
+    async def deadlines(self, ate, limite, shard_count=None, shard_ids=None):
+        """Até `limite` prazos vencidos até `ate`, do mais antigo ao mais novo
+
+        Com `shard_count`/`shard_ids`, só os servidores desses shards (a
+        fórmula do Discord: `(guild_id >> 22) % shard_count`). Roda na thread
+        do journal, depois das gravações já agendadas.
+        """
+        filtro, params = _filtro_shards(shard_count, shard_ids)
+        sql = (
+            "SELECT channel_id, guild_id, tipo, prazo FROM prazos "
+            f"WHERE prazo <= ?{filtro} ORDER BY prazo LIMIT ?"
+        )
+        return await self._agendar(self._consultar, sql, (ate, *params, limite))
+
+    def save_deadline(self, channel_id, guild_id, tipo, prazo):
+        """Agenda a gravação do prazo de um ticket (um por canal)"""
+        return self._agendar(
+            self._executar,
+            "INSERT OR REPLACE INTO prazos (channel_id, guild_id, tipo, prazo) "
+            "VALUES (?, ?, ?, ?)",
+            (channel_id, guild_id, tipo, prazo),
+        )
+
+    def delete_deadline(self, channel_id):
+        """Agenda a remoção do prazo de um ticket"""
+        return self._agendar(
+            self._executar, "DELETE FROM prazos WHERE channel_id = ?", (channel_id,)
+        )
+
+    def requeue_deadlines(self, guild_id, abertos, retencao, desde, agora):
+        """Refaz, em uma transação, os prazos do servidor com a política nova
+
+        `abertos` traz (channel_id, prazo) dos tickets abertos com prazo; os
+        fechados ganham `retencao` segundos a partir do fechamento (0 não
+        cria prazo). Os prazos antigos do servidor são apagados.
+        """
+        return self._agendar(
+            self._reagendar, guild_id, list(abertos), retencao, desde, agora
+        )
+
+    def _reagendar(self, guild_id, abertos, retencao, desde, agora):
+        if self._conn is None:
+            self._conn = self._conectar()
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM prazos WHERE guild_id = ?", (guild_id,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO prazos (channel_id, guild_id, tipo, prazo) "
+                "VALUES (?, ?, 'inativo', ?)",
+                [(channel_id, guild_id, prazo) for channel_id, prazo in abertos],
+            )
+            if retencao > 0:
+                conn.execute(_REAGENDAR_FECHADOS, (desde, agora, retencao, guild_id))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def seed_deadlines(self, prazo):
+        """Cria (uma única vez) prazos para os tickets anteriores à coleta
+
+        O resultado é (prazos criados, instante da primeira semeadura); o
+        instante fica em `meta` e é devolvido também nos boots seguintes.
+        """
+        return self._agendar(self._semear_prazos, prazo)
+
+    def _semear_prazos(self, prazo):
+        if self._conn is None:
+            self._conn = self._conectar()
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT valor FROM meta WHERE chave = 'prazos_semeados'"
+            ).fetchone()
+            if row:
+                criados, semeado_em = 0, row[0]
+            else:
+                semeado_em = int(prazo)
+                criados = conn.execute(_REAGENDAR.format("IGNORE"), (prazo,)).rowcount
+                conn.execute(
+                    "INSERT INTO meta (chave, valor) VALUES ('prazos_semeados', ?)",
+                    (semeado_em,)
+                )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return criados, semeado_em
+
+    def checkpoint(self):
+        """Agenda a compactação do WAL no banco principal"""
+        return self._agendar(self._executar, "PRAGMA wal_checkpoint(TRUNCATE)", ())
+
+    def close(self):
+        """Espera as gravações pendentes e fecha o banco"""
+        self._executor.shutdown(wait=True)
+        self._leituras.shutdown(wait=True)
+        for conn in (self._conn, self._leitor):
+            if conn is not None:
+                conn.close()
+        self._conn = None
+        self._leitor = None
+
+    def _executar(self, sql, params):
+        if self._conn is None:
+            self._conn = self._conectar()
+        return self._conn.execute(sql, params).lastrowid
+
+    def _consultar(self, sql, params):
+        if self._conn is None:
+            self._conn = self._conectar()
+        return self._conn.execute(sql, params).fetchall()
+
+    def _consultar_leitor(self, sql, params, todas):
+        if self._leitor is None:
+            return [] if todas else None
+        cursor = self._leitor.execute(sql, params)
+        return cursor.fetchall() if todas else cursor.fetchone()
+
+    def _ler(self, sql, params, todas=False):
+        """Consulta na thread de leitura: uma linha (ou None), ou todas com `todas`"""
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(
+            self._leituras, self._consultar_leitor, sql, params, todas
+        )
+
+    def _agendar(self, func, *args):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return self._executor.submit(func, *args)
+        future = loop.run_in_executor(self._executor, func, *args)
+        future.add_done_callback(
+            functools.partial(_reportar_erro, _operacao(func, args))
+        )
+        return future
+
+def _filtro_shards(shard_count, shard_ids):
+    """Condição SQL (e parâmetros) para só os servidores dos shards informados"""
+    if not shard_count or not shard_ids:
+        return "", ()
+    marcadores = ', '.join('?' * len(shard_ids))
+    return f" AND ((guild_id >> 22) % ?) IN ({marcadores})", (shard_count, *shard_ids)
+
+def _operacao(func, args):
+    """Nome da operação para o log: a tabela do SQL ou o método agendado"""
+    nome = func.__name__.lstrip('_')
+    if args and isinstance(args[0], str):
+        tabela = _TABELA.search(args[0])
+        comando = args[0].split(None, 1)[0].upper()
+        return f"{nome} {comando} {tabela.group(1)}" if tabela else f"{nome} {comando}"
+    return nome
+
+def _reportar_erro(operacao, future):
+    if not future.cancelled() and future.exception() is not None:
+        log.error("Erro no journal (%s)", operacao, exc_info=future.exception(),
+                  extra={'operacao': operacao})
@@ -0,0 +1,111 @@
+"""Coleta de tickets parados e dos canais de tickets fechados
+
+Cada ticket tem no máximo um prazo no journal (tabela `prazos`, indexada
+pela data): os abertos com prazo de inatividade, os fechados com prazo de
+retenção. O loop de coleta lê só os prazos vencidos, em ordem e em lotes,
+sem varrer canais. Tickets anteriores à coleta contam a partir da
+primeira semeadura (`TicketReaper.desde`): o deploy não apaga nem fecha
+de uma vez o que já existia. Os prazos podem ser otimistas: ao vencer, cada um é
+reavaliado com a política atual do servidor e a atividade real do canal,
+e pode ser adiado em vez de executado. Assim uma mensagem nova no ticket
+não custa nenhuma gravação.
+"""
+import metrics
+from ticket_store import ABERTO, FECHADO
+
+INATIVO = 'inativo'
+APAGAR = 'apagar'
+RETENCAO_PADRAO = 0
+REPETIR = 300
+
+class Politica:
+    """Política de coleta de um servidor (segundos; 0 desliga)"""
+    __slots__ = ('inatividade', 'retencao', 'transcrever')
+
+    def __init__(self, inatividade=0, retencao=RETENCAO_PADRAO, transcrever=True):
+        self.inatividade = inatividade
+        self.retencao = retencao
+        self.transcrever = transcrever
+
+    @classmethod
+    def from_config(cls, config):
+        """Lê os campos de coleta de um `GuildConfig`"""
+        return cls(
+            inatividade=config.inatividade_horas * 3600,
+            retencao=config.retencao_horas * 3600,
+            transcrever=config.transcrever_antes,
+        )
+
+    def deadline(self, tipo, referencia):
+        """Prazo do tipo a partir da referência (timestamp), ou None se desligado"""
+        duracao = self.inatividade if tipo == INATIVO else self.retencao
+        return referencia + duracao if duracao > 0 else None
+
+def decidir(tipo, ticket, politica, referencia, agora):
+    """O que fazer com um prazo vencido
+
+    `referencia` é a última atividade do canal (INATIVO) ou o fechamento
+    (APAGAR). Devolve (acao, novo_prazo), com acao em 'fechar', 'apagar',
+    'adiar' ou 'descartar'.
+    """
+    esperado = ABERTO if tipo == INATIVO else FECHADO
+    if ticket is None or ticket.get('status') != esperado:
+        return 'descartar', None
+    prazo = politica.deadline(tipo, referencia)
+    if prazo is None:
+        return 'descartar', None
+    if prazo > agora:
+        return 'adiar', prazo
+    return ('fechar' if tipo == INATIVO else 'apagar'), None
+
+class TicketReaper:
+    """Prazos de coleta dos tickets, guardados no journal"""
+
+    def __init__(self, journal):
+        self.journal = journal
+        # Instante em que a coleta passou a existir; nenhuma referência é anterior a ele
+        self.desde = 0
+
+    def schedule(self, channel_id, guild_id, tipo, prazo):
+        """Grava o prazo do ticket; sem prazo, remove o que houver"""
+        if prazo is None:
+            return self.cancel(channel_id)
+        return self.journal.save_deadline(channel_id, guild_id, tipo, prazo)
+
+    def cancel(self, channel_id):
+        return self.journal.delete_deadline(channel_id)
+
+    def retry(self, channel_id, guild_id, tipo, agora, atraso=REPETIR):
+        metrics.inc('ticket_reaper_total', acao=tipo, resultado='retry')
+        return self.journal.save_deadline(channel_id, guild_id, tipo, agora + atraso)
+
+    async def due(self, agora, limite, shard_count=None, shard_ids=None):
+        """Lista (channel_id, guild_id, tipo, prazo) dos prazos vencidos"""
+        vencidos = await self.journal.deadlines(agora, limite, shard_count, shard_ids)
+        metrics.set_gauge('ticket_reaper_due', len(vencidos))
+        return vencidos
+
+    def requeue(self, guild_id, politica, abertos, agora):
+        """Refaz os prazos do servidor com a política nova (sem prazo, se desligada)
+
+        `abertos` traz (channel_id, última atividade) dos tickets abertos.
+        Cada prazo sai da sua referência, não de agora: trocar a política não
+        vence o servidor inteiro de uma vez na frente dos outros.
+        """
+        prazos = []
+        for channel_id, referencia in abertos:
+            prazo = politica.deadline(INATIVO, self.reference(referencia))
+            if prazo is not None:
+                prazos.append((channel_id, prazo))
+        return self.journal.requeue_deadlines(
+            guild_id, prazos, politica.retencao, self.desde, agora
+        )
+
+    async def seed(self, agora):
+        """Cria prazos para tickets anteriores à coleta (só na primeira vez)"""
+        criados, self.desde = await self.journal.seed_deadlines(agora)
+        return criados
+
+    def reference(self, referencia):
+        """Referência do prazo, nunca anterior à chegada da coleta"""
+        return max(referencia, self.desde)
@@ -0,0 +1,195 @@
+"""Estatísticas de tickets por servidor, mantidas incrementalmente
+
+Cada evento (abertura, fechamento, reabertura, aprovação ou rejeição de
+PIX) atualiza contadores e buckets de tempo do servidor na hora, então a
+leitura do `/stats` não percorre tickets. O tempo até o fechamento fica em
+um histograma de buckets fixos, do qual sai a mediana. O estado de cada
+servidor é serializado em uma linha JSON pequena no journal.
+"""
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+HORAS = 72
+DIAS = 60
+# Limites (em segundos) dos buckets do tempo até o fechamento
+LIMITES_FECHAMENTO = (
+    60, 300, 900, 1800, 3600, 2 * 3600, 4 * 3600, 8 * 3600, 12 * 3600,
+    86400, 2 * 86400, 4 * 86400, 7 * 86400, 14 * 86400, 30 * 86400,
+)
+
+class GuildStats:
+    """Contadores e rollups de um servidor"""
+    __slots__ = ('abertos', 'fechados', 'reabertos', 'aprovados', 'rejeitados',
+                 'por_hora', 'por_dia', 'fechamento')
+
+    def __init__(self):
+        self.abertos = 0
+        self.fechados = 0
+        self.reabertos = 0
+        self.aprovados = 0
+        self.rejeitados = 0
+        # bucket -> [abertos, fechados]
+        self.por_hora = {}
+        self.por_dia = {}
+        self.fechamento = [0] * (len(LIMITES_FECHAMENTO) + 1)
+
+    def registrar(self, agora, indice):
+        """Soma 1 na posição `indice` (0 = aberto, 1 = fechado) dos buckets"""
+        periodos = ((self.por_hora, 3600, HORAS), (self.por_dia, 86400, DIAS))
+        for buckets, largura, manter in periodos:
+            chave = int(agora // largura)
+            contagem = buckets.get(chave)
+            if contagem is None:
+                contagem = buckets[chave] = [0, 0]
+                # Só há poda quando um bucket novo nasce (no máximo uma vez por hora)
+                for antiga in [c for c in buckets if c <= chave - manter]:
+                    del buckets[antiga]
+            contagem[indice] += 1
+
+    def janela(self, agora, horas, deslocamento=0):
+        """(abertos, fechados) nas últimas `horas`, até `deslocamento` horas atrás"""
+        fim = int(agora // 3600) - deslocamento
+        abertos = fechados = 0
+        for hora in range(fim - horas + 1, fim + 1):
+            contagem = self.por_hora.get(hora)
+            if contagem:
+                abertos += contagem[0]
+                fechados += contagem[1]
+        return abertos, fechados
+
+    def dias(self, agora, dias):
+        fim = int(agora // 86400)
+        return [
+            tuple(self.por_dia.get(dia, (0, 0)))
+            for dia in range(fim - dias + 1, fim + 1)
+        ]
+
+    def mediana_fechamento(self):
+        """Mediana estimada do tempo até fechar (segundos), ou None sem dados"""
+        total = sum(self.fechamento)
+        if not total:
+            return None
+        metade = total / 2
+        acumulado = 0
+        for i, n in enumerate(self.fechamento):
+            if n and acumulado + n >= metade:
+                inicio = LIMITES_FECHAMENTO[i - 1] if i else 0
+                if i < len(LIMITES_FECHAMENTO):
+                    fim = LIMITES_FECHAMENTO[i]
+                else:
+                    fim = inicio * 2
+                # Interpolação linear dentro do bucket
+                return inicio + (fim - inicio) * (metade - acumulado) / n
+            acumulado += n
+        return None
+
+    def taxa_aprovacao(self):
+        decididos = self.aprovados + self.rejeitados
+        return self.aprovados / decididos if decididos else None
+
+    def to_dict(self):
+        return {
+            'c': [
+                self.abertos, self.fechados, self.reabertos,
+                self.aprovados, self.rejeitados,
+            ],
+            'h': [[chave, *contagem] for chave, contagem in self.por_hora.items()],
+            'd': [[chave, *contagem] for chave, contagem in self.por_dia.items()],
+            'f': self.fechamento,
+        }
+
+    @classmethod
+    def from_dict(cls, dados):
+        stats = cls()
+        (stats.abertos, stats.fechados, stats.reabertos,
+         stats.aprovados, stats.rejeitados) = dados['c']
+        stats.por_hora = {chave: [a, f] for chave, a, f in dados.get('h', ())}
+        stats.por_dia = {chave: [a, f] for chave, a, f in dados.get('d', ())}
+        fechamento = list(dados.get('f', ()))
+        if len(fechamento) == len(stats.fechamento):
+            stats.fechamento = fechamento
+        return stats
+
+class TicketStats:
+    """Estatísticas de todos os servidores, gravadas no journal em lote
+
+    Os eventos só marcam o servidor como alterado; `flush` grava as linhas
+    alteradas de uma vez.
+    """
+
+    def __init__(self, journal=None):
+        self.journal = journal
+        self._guilds = {}
+        self._sujos = set()
+
+    def load(self, linhas):
+        """Carrega as linhas (guild_id, dados) salvas no journal"""
+        for guild_id, dados in linhas:
+            try:
+                self._guilds[guild_id] = GuildStats.from_dict(dados)
+            except (KeyError, TypeError, ValueError):
+                log.exception("Erro ao carregar estatísticas do servidor %s", guild_id)
+
+    def get(self, guild_id):
+        stats = self._guilds.get(guild_id)
+        if stats is None:
+            stats = self._guilds[guild_id] = GuildStats()
+        return stats
+
+    def opened(self, guild_id, agora=None):
+        stats = self.get(guild_id)
+        stats.abertos += 1
+        stats.registrar(agora or time.time(), 0)
+        self._sujos.add(guild_id)
+
+    def closed(self, guild_id, duracao=None, agora=None):
+        """Registra um fechamento; `duracao` é o tempo desde a abertura (s)"""
+        stats = self.get(guild_id)
+        stats.fechados += 1
+        stats.registrar(agora or time.time(), 1)
+        if duracao is not None and duracao >= 0:
+            indice = 0
+            limites = LIMITES_FECHAMENTO
+            while indice < len(limites) and duracao > limites[indice]:
+                indice += 1
+            stats.fechamento[indice] += 1
+        self._sujos.add(guild_id)
+
+    def reopened(self, guild_id):
+        self.get(guild_id).reabertos += 1
+        self._sujos.add(guild_id)
+
+    def payment(self, guild_id, aprovado):
+        stats = self.get(guild_id)
+        if aprovado:
+            stats.aprovados += 1
+        else:
+            stats.rejeitados += 1
+        self._sujos.add(guild_id)
+
+    def summary(self, guild_id, agora=None):
+        """Resumo do servidor para o /stats"""
+        agora = agora or time.time()
+        stats = self.get(guild_id)
+        return {
+            'abertos_total': stats.abertos,
+            'fechados_total': stats.fechados,
+            'reabertos_total': stats.reabertos,
+            'ultimas_24h': stats.janela(agora, 24),
+            '24h_anteriores': stats.janela(agora, 24, deslocamento=24),
+            'ultimos_7_dias': stats.dias(agora, 7),
+            'mediana_fechamento': stats.mediana_fechamento(),
+            'aprovacao_pix': stats.taxa_aprovacao(),
+            'pix_decididos': stats.aprovados + stats.rejeitados,
+        }
+
+    def flush(self):
+        """Grava no journal os servidores alterados desde o último flush"""
+        if self.journal is None or not self._sujos:
+            return 0
+        sujos, self._sujos = self._sujos, set()
+        for guild_id in sujos:
+            self.journal.save_stats(guild_id, self._guilds[guild_id].to_dict())
+        return len(sujos)
@@ -0,0 +1,191 @@
+"""Armazenamento de tickets em memória com índices secundários"""
+
+ABERTO = 'aberto'
+FECHADO = 'fechado'
+# Canais sabidamente sem ticket guardados para não repetir a consulta ao journal
+MAX_AUSENTES = 50_000
+
+class TicketStore:
+    """Guarda tickets por canal e mantém índices para consultas O(1)
+
+    Índices mantidos:
+    - (guild_id, user_id, status) -> canais do usuário naquele status
+    - (guild_id, status) -> quantidade de tickets (status None = total)
+    - status -> quantidade global de tickets
+
+    Com um `journal`, toda mutação é gravada nele. As consultas síncronas
+    (`in`, `get`, `[]`) só olham a memória; tickets que não estão nela (os
+    fechados, após um restart) são carregados sob demanda por `fetch`.
+    Depois do `hydrate`, a ausência também fica em memória: um canal sem
+    ticket (ou cujo ticket foi removido, com o DELETE ainda na fila do
+    journal) não volta a ser consultado.
+    """
+
+    def __init__(self, journal=None):
+        self.journal = journal
+        self._tickets = {}
+        self._por_usuario = {}
+        self._por_guild = {}
+        self._por_status = {}
+        self._total = 0
+        # channel_id -> None, na ordem de chegada (os mais antigos saem primeiro)
+        self._ausentes = {}
+        self._hidratado = False
+
+    def __contains__(self, channel_id):
+        return self._buscar(channel_id) is not None
+
+    def __getitem__(self, channel_id):
+        ticket = self._buscar(channel_id)
+        if ticket is None:
+            raise KeyError(channel_id)
+        return ticket
+
+    def __len__(self):
+        return self._total
+
+    def get(self, channel_id, default=None):
+        ticket = self._buscar(channel_id)
+        return default if ticket is None else ticket
+
+    async def fetch(self, channel_id):
+        """Como `get`, mas busca no journal o ticket que não está em memória"""
+        ticket = self._tickets.get(channel_id)
+        if ticket is not None or self.journal is None or channel_id in self._ausentes:
+            return ticket
+        ticket = await self.journal.lookup(channel_id)
+        # Durante a consulta o canal pode ter ganhado (ou perdido) o ticket em memória
+        atual = self._tickets.get(channel_id)
+        if atual is not None or channel_id in self._ausentes:
+            return atual
+        if ticket is not None:
+            # Já está nas contagens carregadas por hydrate
+            self._tickets[channel_id] = ticket
+            self._indexar(channel_id, ticket, contar=False)
+        elif self._hidratado:
+            self._ausente(channel_id)
+        return ticket
+
+    def values(self):
+        """Tickets em memória (não inclui os fechados ainda não carregados)"""
+        return self._tickets.values()
+
+    def items(self):
+        """(canal, ticket) em memória (não inclui os fechados ainda não carregados)"""
+        return self._tickets.items()
+
+    def hydrate(self, abertos, contagens):
+        """Carrega o estado salvo: tickets abertos e contagens por (guild, status)"""
+        for guild_id, status, quantidade in contagens:
+            for chave in ((guild_id, status), (guild_id, None)):
+                self._por_guild[chave] = self._por_guild.get(chave, 0) + quantidade
+            self._por_status[status] = self._por_status.get(status, 0) + quantidade
+            self._total += quantidade
+        for channel_id, ticket in abertos.items():
+            self._tickets[channel_id] = ticket
+            self._indexar(channel_id, ticket, contar=False)
+        self._hidratado = True
+
+    def add(self, channel_id, ticket):
+        """Registra um ticket novo (ou substitui o existente no mesmo canal)"""
+        if self._buscar(channel_id) is not None:
+            self._desindexar(channel_id, self._tickets[channel_id])
+        ticket.setdefault('status', ABERTO)
+        self._ausentes.pop(channel_id, None)
+        self._tickets[channel_id] = ticket
+        self._indexar(channel_id, ticket)
+        self._persistir(channel_id, ticket)
+        return ticket
+
+    def remove(self, channel_id):
+        """Remove um ticket e seus índices"""
+        ticket = self._buscar(channel_id)
+        if ticket is not None:
+            del self._tickets[channel_id]
+            self._desindexar(channel_id, ticket)
+            if self.journal is not None:
+                self.journal.forget(channel_id)
+                self._ausente(channel_id)
+        return ticket
+
+    def set_status(self, channel_id, status):
+        """Altera o status de um ticket atualizando os índices"""
+        ticket = self._buscar(channel_id)
+        if ticket is None:
+            return None
+        if ticket.get('status') != status:
+            self._desindexar(channel_id, ticket)
+            ticket['status'] = status
+            self._indexar(channel_id, ticket)
+            self._persistir(channel_id, ticket)
+        return ticket
+
+    def update(self, channel_id, **campos):
+        """Altera campos não indexados (não use para status, servidor ou usuário)"""
+        ticket = self._buscar(channel_id)
+        if ticket is not None:
+            ticket.update(campos)
+            self._persistir(channel_id, ticket)
+        return ticket
+
+    def has_open(self, guild_id, user_id):
+        """Verifica se o usuário já tem ticket aberto no servidor"""
+        return bool(self._por_usuario.get((guild_id, user_id, ABERTO)))
+
+    def count(self, status=None, guild_id=None):
+        """Conta tickets, opcionalmente filtrando por status e/ou servidor"""
+        if guild_id is None:
+            if status is None:
+                return self._total
+            return self._por_status.get(status, 0)
+        return self._por_guild.get((guild_id, status), 0)
+
+    def counts_by_guild(self):
+        """Lista (guild_id, status, quantidade) de todos os servidores"""
+        return [
+            (guild_id, status, quantidade)
+            for (guild_id, status), quantidade in list(self._por_guild.items())
+            if status is not None
+        ]
+
+    def _buscar(self, channel_id):
+        return self._tickets.get(channel_id)
+
+    def _ausente(self, channel_id):
+        self._ausentes[channel_id] = None
+        if len(self._ausentes) > MAX_AUSENTES:
+            del self._ausentes[next(iter(self._ausentes))]
+
+    def _persistir(self, channel_id, ticket):
+        if self.journal is not None:
+            self.journal.record(channel_id, ticket)
+
+    def _indexar(self, channel_id, ticket, contar=True):
+        guild_id = ticket.get('guild_id')
+        status = ticket.get('status')
+        chave_usuario = (guild_id, ticket.get('user_id'), status)
+        self._por_usuario.setdefault(chave_usuario, set()).add(channel_id)
+        if not contar:
+            return
+        self._total += 1
+        for chave in ((guild_id, status), (guild_id, None)):
+            self._por_guild[chave] = self._por_guild.get(chave, 0) + 1
+        self._por_status[status] = self._por_status.get(status, 0) + 1
+
+    def _desindexar(self, channel_id, ticket):
+        guild_id = ticket.get('guild_id')
+        status = ticket.get('status')
+        chave_usuario = (guild_id, ticket.get('user_id'), status)
+        canais = self._por_usuario.get(chave_usuario)
+        if canais is not None:
+            canais.discard(channel_id)
+            if not canais:
+                del self._por_usuario[chave_usuario]
+        self._total -= 1
+        for chave in ((guild_id, status), (guild_id, None)):
+            self._por_guild[chave] -= 1
+            if not self._por_guild[chave]:
+                del self._por_guild[chave]
+        self._por_status[status] -= 1
+        if not self._por_status[status]:
+            del self._por_status[status]
@@ -0,0 +1,133 @@
+"""Exportação de transcrições de tickets em JSONL comprimido
+
+O histórico é lido em páginas pelo agendador REST (prioridade de segundo
+plano) e cada página é gravada no arquivo assim que chega, então a memória
+usada não depende do tamanho do canal. A compressão e a escrita rodam em
+uma thread própria para não travar o event loop.
+"""
+import asyncio
+import functools
+import gzip
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import discord
+
+import metrics
+from rest_scheduler import SEGUNDO_PLANO
+
+log = logging.getLogger(__name__)
+
+TAMANHO_PAGINA = 100
+
+def serializar(message):
+    """Uma linha do JSONL com o essencial de uma mensagem"""
+    return json.dumps({
+        'id': message.id,
+        'autor_id': message.author.id,
+        'autor': message.author.name,
+        'data': message.created_at.isoformat(),
+        'conteudo': message.content,
+        'anexos': [anexo.url for anexo in message.attachments],
+        'embeds': len(message.embeds),
+    }, ensure_ascii=False) + "\n"
+
+class TranscriptExporter:
+    """Exporta canais de ticket em segundo plano, um job por canal"""
+
+    def __init__(self, rest, pasta="transcripts", pagina=TAMANHO_PAGINA):
+        self.rest = rest
+        self.pasta = pasta
+        self.pagina = pagina
+        self._jobs = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="transcripts"
+        )
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def schedule(self, channel):
+        """Inicia a exportação sem esperar; devolve a tarefa (ou a que já existe)"""
+        tarefa = self._jobs.get(channel.id)
+        if tarefa is None:
+            tarefa = asyncio.ensure_future(self._exportar_e_reportar(channel))
+            self._jobs[channel.id] = tarefa
+            tarefa.add_done_callback(lambda _: self._jobs.pop(channel.id, None))
+        return tarefa
+
+    async def export(self, channel):
+        """Exporta o histórico inteiro do canal; devolve um relatório"""
+        inicio = time.perf_counter()
+        pasta = os.path.join(self.pasta, str(channel.guild.id))
+        path = os.path.join(pasta, f"{channel.id}-{int(time.time())}.jsonl.gz")
+        loop = asyncio.get_running_loop()
+        arquivo = await loop.run_in_executor(self._executor, self._abrir, pasta, path)
+
+        mensagens = 0
+        ultimo = None
+        try:
+            while True:
+                linhas, ultimo = await self.rest.run(
+                    'channel.history', channel.id,
+                    functools.partial(self._pagina, channel, ultimo),
+                    SEGUNDO_PLANO
+                )
+                if not linhas:
+                    break
+                await loop.run_in_executor(self._executor, arquivo.writelines, linhas)
+                mensagens += len(linhas)
+                metrics.inc('transcript_messages_total', len(linhas))
+                if len(linhas) < self.pagina:
+                    break
+        finally:
+            await loop.run_in_executor(self._executor, arquivo.close)
+
+        segundos = time.perf_counter() - inicio
+        metrics.observe(
+            'transcript_export_seconds', segundos,
+            buckets=(1, 5, 15, 60, 300, 900, 3600)
+        )
+        return {
+            'path': path,
+            'mensagens': mensagens,
+            'bytes': os.path.getsize(path),
+            'segundos': segundos,
+            'mensagens_por_segundo': mensagens / segundos if segundos else 0.0,
+        }
+
+    async def _pagina(self, channel, ultimo):
+        # Uma página em ordem cronológica, a partir da última mensagem gravada
+        depois = discord.Object(id=ultimo) if ultimo else None
+        linhas = []
+        historico = channel.history(limit=self.pagina, after=depois, oldest_first=True)
+        async for message in historico:
+            linhas.append(serializar(message))
+            ultimo = message.id
+        return linhas, ultimo
+
+    async def _exportar_e_reportar(self, channel):
+        try:
+            relatorio = await self.export(channel)
+        except Exception:
+            metrics.inc('transcript_exports_total', resultado='erro')
+            log.exception("Erro ao exportar transcrição do canal %s", channel.id)
+            return None
+        metrics.inc('transcript_exports_total', resultado='ok')
+        log.info(
+            "📝 Transcrição de %s: %s mensagens, %.0f msg/s -> %s",
+            channel.id, relatorio['mensagens'], relatorio['mensagens_por_segundo'],
+            relatorio['path']
+        )
+        return relatorio
+
+    @staticmethod
+    def _abrir(pasta, path):
+        os.makedirs(pasta, exist_ok=True)
+        return gzip.open(path, 'wt', encoding='utf-8')
+
+    def close(self):
+        self._executor.shutdown(wait=True)